@@ -0,0 +1,136 @@
+"""
+Capacity-aware admission control for stream detection.
+
+Each stream's CPU cost is measured live by the detection worker (decode,
+inference and ASR busy time per wall-clock second, see StreamCostTracker in
+detection.py) and reported on its lease. A new stream is admitted at full
+rate if the cluster's free CPU budget covers the estimated cost, degraded to
+a lower sampling rate or video-only if only that fits, and queued otherwise.
+Queued streams are promoted by the supervisors as capacity frees up.
+"""
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+
+from config import app
+from extensions import db
+from models import DetectionNode, StreamLease
+from leasing import LEASE_TTL_SECONDS
+
+# Detection settings per mode: process every Nth video frame, and whether audio/ASR runs.
+MODES = {
+    "full": {"sample_every": 1, "audio": True},
+    "reduced": {"sample_every": 5, "audio": True},
+    "video_only": {"sample_every": 5, "audio": False},
+}
+MODE_ORDER = ["full", "reduced", "video_only"]
+
+# Full-rate cost estimate (CPU cores) used until streams have been measured.
+DEFAULT_STREAM_COST = {
+    "decode": float(os.getenv("DEFAULT_DECODE_COST", "0.15")),
+    "inference": float(os.getenv("DEFAULT_INFERENCE_COST", "0.6")),
+    "asr": float(os.getenv("DEFAULT_ASR_COST", "0.25")),
+}
+
+
+def _component(components, key):
+    return components.get(key, DEFAULT_STREAM_COST[key])
+
+
+def mode_cost(components, mode):
+    """CPU cores a stream with full-rate cost `components` needs when run in `mode`."""
+    settings = MODES[mode]
+    cost = _component(components, "decode") + _component(components, "inference") / settings["sample_every"]
+    if settings["audio"]:
+        cost += _component(components, "asr")
+    return cost
+
+
+def estimated_components():
+    """Average full-rate cost of the streams measured so far, or the defaults."""
+    measured = [lease.cost for lease in StreamLease.query.filter(StreamLease.cost.isnot(None)).all()]
+    if not measured:
+        return dict(DEFAULT_STREAM_COST)
+    return {
+        key: sum(c.get(key, DEFAULT_STREAM_COST[key]) for c in measured) / len(measured)
+        for key in DEFAULT_STREAM_COST
+    }
+
+
+def free_capacity(components):
+    """
+    Free CPU cores across live nodes, after measured load and the estimated
+    cost of admitted streams that have not reported a measurement yet.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=LEASE_TTL_SECONDS)
+    nodes = DetectionNode.query.filter(DetectionNode.last_heartbeat >= cutoff).all()
+    budget = sum(node.cpu_budget for node in nodes)
+    load = sum(node.load for node in nodes)
+    pending = StreamLease.query.filter(StreamLease.status == "active", StreamLease.cost.is_(None)).all()
+    load += sum(mode_cost(components, lease.mode) for lease in pending)
+    return budget - load
+
+
+def choose_mode(components, free):
+    for mode in MODE_ORDER:
+        if mode_cost(components, mode) <= free:
+            return mode
+    return None
+
+
+def admit(stream_url):
+    """
+    Decide whether stream_url is admitted, degraded or queued and record the
+    lease accordingly. Returns a dict describing the decision for the API caller.
+    """
+    with app.app_context():
+        existing = StreamLease.query.filter_by(stream_url=stream_url).first()
+        if existing:
+            return {"decision": "existing", "status": existing.status, "mode": existing.mode}
+
+        components = estimated_components()
+        free = free_capacity(components)
+        mode = choose_mode(components, free)
+        if mode is None:
+            lease = StreamLease(stream_url=stream_url, status="queued", mode="full")
+            decision = "queued"
+        else:
+            lease = StreamLease(stream_url=stream_url, status="active", mode=mode)
+            decision = "admitted" if mode == "full" else "degraded"
+        db.session.add(lease)
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            existing = StreamLease.query.filter_by(stream_url=stream_url).first()
+            return {"decision": "existing", "status": existing.status, "mode": existing.mode}
+
+        logging.info("Admission for %s: %s (mode=%s, free=%.2f cores)", stream_url, decision, lease.mode, free)
+        return {
+            "decision": decision,
+            "status": lease.status,
+            "mode": lease.mode,
+            "estimated_cost": round(mode_cost(components, lease.mode), 3),
+            "free_capacity": round(free, 3),
+        }
+
+
+def promote_queued():
+    """Admit queued streams, oldest first, while the cluster has capacity for them."""
+    with app.app_context():
+        queued = StreamLease.query.filter_by(status="queued").order_by(StreamLease.requested_at.asc()).all()
+        if not queued:
+            return
+        components = estimated_components()
+        free = free_capacity(components)
+        for lease in queued:
+            mode = choose_mode(components, free)
+            if mode is None:
+                break
+            promoted = StreamLease.query.filter_by(id=lease.id, status="queued").update(
+                {"status": "active", "mode": mode}, synchronize_session=False
+            )
+            db.session.commit()
+            if promoted:
+                free -= mode_cost(components, mode)
+                logging.info("Promoted queued stream %s (mode=%s)", lease.stream_url, mode)
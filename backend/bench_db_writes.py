@@ -0,0 +1,156 @@
+"""
+Benchmark: concurrent detection-log writes under each database profile.
+
+Starts a number of threads that insert DetectionLog rows the way detection
+threads do (through db_writer) and reports throughput, per-write
+latency and "database is locked" failures for:
+
+  * SQLite with the rollback journal and every thread committing itself
+    (the old default),
+  * SQLite in WAL mode with every thread committing itself,
+  * SQLite in WAL mode with every write waiting on the single writer thread,
+  * the same with write-behind inserts (what detection threads do), where
+    latency is the time a detection thread is blocked enqueueing the row,
+  * PostgreSQL with pooled concurrent writers, if a URL is given.
+
+    python bench_db_writes.py [threads] [writes_per_thread] [postgres_url]
+
+Each scenario runs in a fresh interpreter because the profile is read from
+the environment when config.py is imported.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import statistics
+import subprocess
+
+
+def run_scenario(threads, writes):
+    """Runs inside the child process configured through the environment."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.exc import OperationalError
+    import config
+    from config import app
+    from extensions import db
+    from models import DetectionLog
+    from db_writer import insert_behind, get_db_writer
+
+    if os.getenv("BENCH_ROLLBACK_JOURNAL") == "1":
+        event.remove(Engine, "connect", config.set_sqlite_pragmas)
+    with app.app_context():
+        db.create_all()
+
+    latencies = []
+    errors = {"locked": 0, "other": 0}
+    lock = threading.Lock()
+
+    mode = os.getenv("BENCH_MODE", "direct")  # direct / writer / behind
+    futures = []
+
+    def write_directly(job):
+        with app.app_context():
+            try:
+                job(db.session)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def record():
+        return DetectionLog(
+            room_url="https://example.com/hls/bench/playlist.m3u8",
+            event_type="bench_write",
+            details={"detections": [{"class": "knife", "confidence": 0.9}]},
+            read=False,
+        )
+
+    def worker():
+        for _ in range(writes):
+            started = time.perf_counter()
+            try:
+                if mode == "behind":
+                    future = insert_behind(record())
+                    with lock:
+                        futures.append(future)
+                elif mode == "writer":
+                    get_db_writer().submit(lambda session: session.add(record())).result()
+                else:
+                    write_directly(lambda session: session.add(record()))
+            except OperationalError as e:
+                with lock:
+                    errors["locked" if "locked" in str(e) else "other"] += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    for future in futures:
+        try:
+            future.result()
+        except OperationalError as e:
+            errors["locked" if "locked" in str(e) else "other"] += 1
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(json.dumps({
+        "written": len(latencies),
+        "elapsed_s": elapsed,
+        "rows_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0,
+        "locked_errors": errors["locked"],
+        "other_errors": errors["other"],
+        "avg_batch": get_db_writer().stats()["avg_batch"] if mode != "direct" else 1.0,
+    }))
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    scratch = tempfile.mkdtemp()
+    scenarios = [
+        ("sqlite rollback journal, direct", {
+            "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'journal.db')}",
+            "BENCH_ROLLBACK_JOURNAL": "1",
+        }),
+        ("sqlite WAL, direct", {
+            "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'wal.db')}",
+        }),
+        ("sqlite WAL, single writer", {
+            "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'writer.db')}", "BENCH_MODE": "writer",
+        }),
+        ("sqlite WAL, write-behind", {
+            "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'behind.db')}", "BENCH_MODE": "behind",
+        }),
+    ]
+    if len(sys.argv) > 3:
+        scenarios.append(("postgres, pooled", {"DATABASE_URL": sys.argv[3], "DB_PROFILE": "postgres"}))
+
+    print(f"{threads} threads x {writes} writes")
+    print(f"{'scenario':<34} {'rows/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'locked':>7} {'failed':>7} {'batch':>6}")
+    for name, env in scenarios:
+        child = subprocess.run(
+            [sys.executable, __file__, "--scenario", str(threads), str(writes)],
+            env={**os.environ, **env}, capture_output=True, text=True
+        )
+        if child.returncode != 0:
+            print(f"{name:<34} failed: {child.stderr.strip().splitlines()[-1] if child.stderr else child.returncode}")
+            continue
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{name:<34} {result['rows_per_s']:>9.0f} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+              f"{result['locked_errors']:>7} {result['other_errors']:>7} {result['avg_batch']:>6.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--scenario":
+        run_scenario(int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: decoding N streams with threads in one process vs the decode
+process pool (decode_pool.py).
+
+A synthetic 720p H.264 clip is generated once and symlinked N times so every
+"stream" is an independent file that is decoded in a loop. Reports aggregate
+decoded frames/s and sampled (bgr24-converted) frames/s at 10, 30 and 60 streams.
+
+    python bench_decode.py [seconds_per_run]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+import av
+import numpy as np
+
+from decode_pool import DecodePool
+
+STREAM_COUNTS = (10, 30, 60)
+SAMPLE_EVERY = 5
+
+
+def make_sample_video(path, seconds=10, fps=25, width=1280, height=720):
+    container = av.open(path, mode="w")
+    stream = container.add_stream("h264", rate=fps)
+    stream.width, stream.height, stream.pix_fmt = width, height, "yuv420p"
+    x = np.linspace(0, 255, width, dtype=np.uint8)
+    for i in range(seconds * fps):
+        img = np.empty((height, width, 3), dtype=np.uint8)
+        img[:] = np.roll(x, i * 8)[None, :, None]
+        for packet in stream.encode(av.VideoFrame.from_ndarray(img, format="bgr24")):
+            container.mux(packet)
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+
+
+def make_streams(source, count, directory):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"stream_{i}.mp4")
+        if not os.path.exists(path):
+            os.symlink(source, path)
+        paths.append(path)
+    return paths
+
+
+def bench_threads(paths, seconds):
+    stop = threading.Event()
+    counts = {"decoded": 0, "sampled": 0}
+    lock = threading.Lock()
+
+    def decode(path):
+        frame_index = 0
+        while not stop.is_set():
+            with av.open(path) as container:
+                for frame in container.decode(video=0):
+                    if stop.is_set():
+                        break
+                    frame_index += 1
+                    sampled = (frame_index - 1) % SAMPLE_EVERY == 0
+                    if sampled:
+                        frame.to_ndarray(format="bgr24")
+                    with lock:
+                        counts["decoded"] += 1
+                        counts["sampled"] += sampled
+
+    threads = [threading.Thread(target=decode, args=(path,), daemon=True) for path in paths]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=10)
+    return counts["decoded"] / seconds, counts["sampled"] / seconds
+
+
+def bench_processes(pool, paths, seconds):
+    counts = {"decoded": 0, "sampled": 0}
+    lock = threading.Lock()
+
+    def on_frame(img, frames_decoded, decode_seconds, release):
+        with lock:
+            counts["decoded"] += frames_decoded
+            counts["sampled"] += 1
+        release()
+
+    for path in paths:
+        pool.add_stream(path, SAMPLE_EVERY, on_frame)
+    time.sleep(seconds)
+    for path in paths:
+        pool.remove_stream(path)
+    return counts["decoded"] / seconds, counts["sampled"] / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    directory = tempfile.mkdtemp()
+    source = os.path.join(directory, "source.mp4")
+    make_sample_video(source)
+    pool = DecodePool(reconnect_delay=0)
+    print(f"CPUs: {os.cpu_count()}, decode processes: {len(pool.workers)}, sample every {SAMPLE_EVERY} frames")
+    print(f"{'streams':>8} {'mode':>10} {'decoded fps':>12} {'sampled fps':>12}")
+    for count in STREAM_COUNTS:
+        paths = make_streams(source, count, directory)
+        for mode, run in (("threads", lambda: bench_threads(paths, seconds)),
+                          ("processes", lambda: bench_processes(pool, paths, seconds))):
+            decoded, sampled = run()
+            print(f"{count:>8} {mode:>10} {decoded:>12.1f} {sampled:>12.1f}")
+        time.sleep(2)  # Let removed streams drain from the pool.
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: hot detection_logs queries with and without the composite indexes.
+
+Fills a scratch database with synthetic notifications (one million by
+default), times each query the notifications API and dashboards issue,
+then creates the DetectionLog indexes and times them again. Prints the
+median latency of each query before and after, and the new query plan.
+
+    python bench_detection_queries.py [rows] [database_url]
+
+database_url defaults to a temporary SQLite file; pass a throwaway
+PostgreSQL database to measure that instead.
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import statistics
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, select, func, and_, or_, text
+
+from models import DetectionLog
+
+EVENT_TYPES = ("object_detection", "audio_detection", "chat_detection", "stream_created")
+AGENTS = [f"agent{i}" for i in range(20)] + [None]
+ROOMS = [f"https://example.com/hls/room{i}/playlist.m3u8" for i in range(500)]
+BATCH_SIZE = 10000
+RUNS = 5
+
+table = DetectionLog.__table__
+c = table.c
+
+
+def fill(engine, rows):
+    now = datetime.now(timezone.utc)
+    random.seed(0)
+    with engine.begin() as conn:
+        for start in range(0, rows, BATCH_SIZE):
+            batch = []
+            for i in range(start, min(start + BATCH_SIZE, rows)):
+                timestamp = now - timedelta(seconds=(rows - i) * 3)
+                agent = random.choice(AGENTS)
+                batch.append({
+                    "room_url": random.choice(ROOMS),
+                    "event_type": random.choice(EVENT_TYPES),
+                    "details": {"streamer_name": f"streamer{i % 500}", "assigned_agent": agent or "Unassigned"},
+                    "assigned_agent": agent,
+                    "timestamp": timestamp,
+                    "updated_at": timestamp,
+                    "read": random.random() < 0.9,
+                })
+            conn.execute(table.insert(), batch)
+
+
+def hot_queries(now):
+    middle = now - timedelta(days=30)
+    page = [c.timestamp.desc(), c.id.desc()]
+    return {
+        "latest page": select(c.id).order_by(*page).limit(51),
+        "keyset page (30d back)": select(c.id).where(or_(
+            c.timestamp < middle, and_(c.timestamp == middle, c.id < 10 ** 9)
+        )).order_by(*page).limit(51),
+        "event_type filter": select(c.id).where(c.event_type == "audio_detection").order_by(*page).limit(51),
+        "unread filter": select(c.id).where(c.read.is_(False)).order_by(*page).limit(51),
+        "agent filter": select(c.id).where(c.assigned_agent == "agent7").order_by(*page).limit(51),
+        "forwarded": select(c.id).where(c.assigned_agent.isnot(None)).order_by(c.timestamp.desc()).limit(100),
+        "room recent (priority)": select(func.count()).select_from(
+            select(c.id).where(c.room_url == ROOMS[7], c.timestamp >= now - timedelta(minutes=10)).limit(10).subquery()
+        ),
+        "change feed": select(c.id).where(or_(
+            c.updated_at > now - timedelta(minutes=1),
+            and_(c.updated_at == now - timedelta(minutes=1), c.id > 0)
+        )).order_by(c.updated_at, c.id).limit(200),
+        "unread count (mark-all)": select(func.count()).where(c.read.is_(False)),
+    }
+
+
+def time_queries(engine, queries):
+    results = {}
+    with engine.connect() as conn:
+        for name, query in queries.items():
+            samples = []
+            for _ in range(RUNS):
+                started = time.perf_counter()
+                conn.execute(query).fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(samples)
+    return results
+
+
+def explain(engine, query):
+    compiled = query.compile(engine)
+    params = compiled.params
+    if compiled.positiontup:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        return " | ".join(str(row[-1]) for row in conn.exec_driver_sql(prefix + str(compiled), params))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    if len(sys.argv) > 2:
+        url = sys.argv[2]
+    else:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+    table.drop(engine, checkfirst=True)
+    # Create the bare table (and the tables it references); the indexes are added after the first timing pass.
+    indexes = set(table.indexes)
+    table.indexes.clear()
+    table.metadata.create_all(engine)
+    table.indexes.update(indexes)
+
+    started = time.perf_counter()
+    fill(engine, rows)
+    print(f"Inserted {rows} rows in {time.perf_counter() - started:.1f}s ({engine.dialect.name})")
+    queries = hot_queries(datetime.now(timezone.utc))
+    before = time_queries(engine, queries)
+
+    started = time.perf_counter()
+    for index in indexes:
+        index.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"Created {len(indexes)} indexes in {time.perf_counter() - started:.1f}s")
+    after = time_queries(engine, queries)
+
+    print(f"{'query':<26} {'no index ms':>12} {'indexed ms':>12} {'speedup':>9}")
+    for name in queries:
+        print(f"{name:<26} {before[name]:>12.2f} {after[name]:>12.2f} {before[name] / max(after[name], 1e-6):>8.0f}x")
+    print()
+    for name, query in queries.items():
+        print(f"{name}: {explain(engine, query)}")
+
+
+if __name__ == "__main__":
+    main()
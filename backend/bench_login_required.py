@@ -0,0 +1,84 @@
+"""
+Benchmark: per-request overhead of utils.login_required.
+
+Calls a trivial admin-only view through the decorator in a request context,
+first with the principal cache disabled (one users query per request, as
+before) and then enabled. Prints the mean and p99 overhead per request and
+the number of SQL statements issued.
+
+    python bench_login_required.py [requests] [database_url]
+
+database_url defaults to a temporary SQLite file.
+"""
+import os
+import sys
+import tempfile
+import time
+import statistics
+
+if len(sys.argv) > 2:
+    os.environ["DATABASE_URL"] = sys.argv[2]
+else:
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("EVENT_BUS_REDIS_URL", "")
+
+from flask import session
+from sqlalchemy import event
+
+import utils
+from config import app
+from extensions import db
+from models import User
+
+
+def run(requests, ttl, view, user_id):
+    utils.PRINCIPAL_CACHE_TTL = ttl
+    utils.clear_principal_cache()
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    samples = []
+    try:
+        for _ in range(requests):
+            with app.test_request_context("/api/bench"):
+                session["user_id"] = user_id
+                started = time.perf_counter()
+                view()
+                samples.append((time.perf_counter() - started) * 1e6)
+                db.session.remove()  # What teardown_appcontext does after every request.
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.99) - 1], statements[0]
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with app.app_context():
+        db.create_all()
+        admin = User.query.filter_by(username="bench_admin").first()
+        if admin is None:
+            admin = User(username="bench_admin", email="bench_admin@example.com", firstname="Bench",
+                         lastname="Admin", phonenumber="0", password="x", role="admin")
+            db.session.add(admin)
+            db.session.commit()
+        user_id = admin.id
+
+    @utils.login_required(role="admin")
+    def view():
+        return "ok"
+
+    print(f"{requests} requests against {os.environ['DATABASE_URL']}")
+    print(f"{'principal cache':<16} {'mean us':>9} {'p99 us':>9} {'SQL statements':>15}")
+    for name, ttl in (("off", 0), ("on", 30)):
+        mean, p99, statements = run(requests, ttl, view, user_id)
+        print(f"{name:<16} {mean:>9.1f} {p99:>9.1f} {statements:>15}")
+
+
+if __name__ == "__main__":
+    main()
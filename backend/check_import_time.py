@@ -0,0 +1,79 @@
+"""
+Startup budget check for web workers.
+
+Imports a module (the web worker's `routes` by default) in a fresh
+interpreter under `python -X importtime`, prints the slowest imports and
+fails if the total exceeds the budget or if any detection-only library was
+pulled in. Web workers should never load the ML, media or browser stacks;
+those belong to the detection supervisor (supervisor.py / detection.py).
+
+    python check_import_time.py [module] [budget_ms]
+
+The budget defaults to IMPORT_BUDGET_MS (1500 ms). Exit status is 1 when the
+check fails, so it can run in CI.
+"""
+import os
+import re
+import sys
+import subprocess
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+TOP_IMPORTS = 15
+# Top-level packages only the detection supervisor (or a scrape run) may import.
+FORBIDDEN = {
+    "ultralytics", "torch", "whisper", "cv2", "av", "pytesseract", "speech_recognition",
+    "scipy", "vaderSentiment", "seleniumwire", "selenium", "PIL", "bs4",
+}
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def profile(module):
+    """Return [(self_us, cumulative_us, depth, name)] for every import made by `import module`."""
+    env = {**os.environ, "EVENT_BUS_REDIS_URL": os.getenv("EVENT_BUS_REDIS_URL", "")}
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True
+    )
+    if child.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{child.stderr[-2000:]}")
+    entries = []
+    for line in child.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((int(self_us), int(cumulative_us), (len(indent) - 1) // 2, name))
+    return entries
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "routes"
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUDGET_MS
+    entries = profile(module)
+
+    # Top-level entries (depth 0) partition the whole import; their cumulative times add up to the total.
+    total_ms = sum(cumulative for _, cumulative, depth, _ in entries if depth == 0) / 1000
+    top_level = {}
+    for self_us, _, _, name in entries:
+        root = name.split(".")[0]
+        top_level[root] = top_level.get(root, 0) + self_us
+
+    print(f"import {module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms), {len(entries)} modules")
+    print(f"{'package':<32} {'self ms':>9}")
+    for root, self_us in sorted(top_level.items(), key=lambda item: -item[1])[:TOP_IMPORTS]:
+        print(f"{root:<32} {self_us / 1000:>9.1f}")
+
+    failures = []
+    loaded = sorted(FORBIDDEN & set(top_level))
+    if loaded:
+        failures.append(f"detection-only packages imported: {', '.join(loaded)}")
+    if total_ms > budget_ms:
+        failures.append(f"import took {total_ms:.0f} ms, over the {budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,87 @@
 import os
 import logging
+import sqlite3
 from datetime import timedelta
 from flask import Flask
 from flask_cors import CORS
 from extensions import db
 from flask_caching import Cache
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "http://127.0.0.1:3000"}}, supports_credentials=True)
 
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///stream_monitor.db"
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_size": 20,
-    "max_overflow": 40,
-    "pool_timeout": 30,
-    "pool_recycle": 3600,
-}
+app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///stream_monitor.db")
+# Database profile: "sqlite" (WAL) or "postgres" (pooled concurrent connections). Detection writes go
+# through the write-behind writer thread (db_writer.py) under both.
+# Inferred from DATABASE_URL unless DB_PROFILE is set.
+app.config["DB_PROFILE"] = os.getenv(
+    "DB_PROFILE", "sqlite" if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite") else "postgres"
+)
+if app.config["DB_PROFILE"] == "sqlite":
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "connect_args": {"timeout": 30, "check_same_thread": False},
+        "pool_size": 10,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+    }
+else:
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "40")),
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SECRET_KEY"] = "supersecretkey"
 app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(days=1)
 app.config["UPLOAD_FOLDER"] = "uploads"
 app.config["CHAT_IMAGES_FOLDER"] = os.path.join(app.config["UPLOAD_FOLDER"], "chat_images")
 app.config["FLAGGED_CHAT_IMAGES_FOLDER"] = os.path.join(app.config["UPLOAD_FOLDER"], "flagged_chat_images")
+app.config["DETECTION_IMAGES_FOLDER"] = os.path.join(app.config["UPLOAD_FOLDER"], "detection_images")
 
 # Redis caching
 app.config["CACHE_TYPE"] = "RedisCache"
-app.config["CACHE_REDIS_URL"] = "redis://localhost:6379/0"
+app.config["CACHE_REDIS_URL"] = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
 cache = Cache(app)
 
+# Detection supervisor command channel (see supervisor.py)
+app.config["DETECTION_REDIS_URL"] = os.getenv("DETECTION_REDIS_URL", "redis://localhost:6379/1")
+# Cross-process event bus (see events.py); set EVENT_BUS_REDIS_URL="" to keep events in-process.
+# With several pods it must be one Redis shared by all of them: detection's stream metadata cache
+# (stream_cache.py) only learns about reassignments made through another pod from this bus.
+app.config["EVENT_BUS_REDIS_URL"] = os.getenv("EVENT_BUS_REDIS_URL", app.config["DETECTION_REDIS_URL"])
+# Flask-SocketIO message queue: lets every worker, and the detection supervisor, emit to any browser
+# socket whichever worker holds it. Set SOCKETIO_MESSAGE_QUEUE="" for a single process.
+app.config["SOCKETIO_MESSAGE_QUEUE"] = os.getenv("SOCKETIO_MESSAGE_QUEUE", app.config["EVENT_BUS_REDIS_URL"]) or None
+# Gunicorn preload mode (see gunicorn.conf.py): the master imports the app once before forking, and
+# background tasks start in each worker after the fork.
+app.config["PRELOAD_APP"] = os.getenv("PRELOAD_APP", "0") == "1"
+
 os.makedirs(app.config["CHAT_IMAGES_FOLDER"], exist_ok=True)
 os.makedirs(app.config["FLAGGED_CHAT_IMAGES_FOLDER"], exist_ok=True)
+os.makedirs(app.config["DETECTION_IMAGES_FOLDER"], exist_ok=True)
 
 db.init_app(app)
 
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers proceed while the writer commits, busy_timeout makes a
+    blocked writer wait instead of failing with "database is locked", and
+    synchronous=NORMAL is durable under WAL without an fsync per commit.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
 @app.after_request
 def add_csp(response):
     response.headers['Content-Security-Policy'] = \
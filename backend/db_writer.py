@@ -0,0 +1,166 @@
+"""
+Serialized, write-behind database writes.
+
+Detection threads must not wait on the database: a slow commit (or, with
+SQLite, a writer queued on the database lock) would stall frame processing.
+They hand their writes to one DatabaseWriter thread instead and carry on.
+The writer collects whatever has queued for up to DB_WRITE_BATCH_MS (or
+DB_WRITE_BATCH_ROWS items), inserts the new rows in one bulk flush and
+commits the whole batch at once, so one fsync covers many inserts and SQLite
+never sees two writers. Callers that need the new row id (or a job's result)
+get it from the returned future.
+
+The queue holds at most DB_WRITE_QUEUE_SIZE items. When the database is
+slow or down and the queue fills up, new writes are dropped (their future
+fails with queue.Full and stats() counts them) rather than growing memory
+without bound or blocking the detection threads.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from config import app
+from extensions import db
+
+MAX_BATCH = int(os.getenv("DB_WRITE_BATCH_ROWS", "200"))
+MAX_DELAY_SECONDS = int(os.getenv("DB_WRITE_BATCH_MS", "50")) / 1000.0
+QUEUE_SIZE = int(os.getenv("DB_WRITE_QUEUE_SIZE", "10000"))
+
+
+class DatabaseWriter:
+    """
+    Runs queued work on one thread. Each item is either a new ORM object to
+    insert (future resolves to its id) or a job, job(session) -> result.
+    Items queued within max_delay of each other (up to max_batch) share one
+    transaction; if it fails each item is retried in its own, so one bad row
+    only fails its own future.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, max_delay=MAX_DELAY_SECONDS, queue_size=QUEUE_SIZE):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.items = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.metrics = {
+            "batches": 0, "rows": 0, "jobs": 0, "failed": 0, "dropped": 0,
+            "flush_total_ms": 0.0, "flush_max_ms": 0.0,
+        }
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def _put(self, job, record):
+        future = Future()
+        try:
+            self.items.put_nowait((job, record, future))
+        except queue.Full:
+            with self.lock:
+                self.metrics["dropped"] += 1
+            logging.error("Database write queue full (%d); dropping write", self.items.maxsize)
+            future.set_exception(queue.Full("database write queue is full"))
+        return future
+
+    def submit(self, job):
+        """Queue job(session); returns a Future with its result once committed."""
+        return self._put(job, None)
+
+    def insert(self, record):
+        """Queue a new ORM object; returns a Future with its primary key once committed."""
+        return self._put(None, record)
+
+    def _take_batch(self):
+        batch = [self.items.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.items.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _apply(self, batch):
+        """Run a batch in the current transaction and return each item's result."""
+        session = db.session
+        results = [job(session) if job is not None else None for job, _, _ in batch]
+        records = [record for _, record, _ in batch if record is not None]
+        if records:
+            # One flush inserts all rows of a table together (executemany / multi-row INSERT).
+            session.add_all(records)
+            session.flush()
+        results = [record.id if record is not None else result for (_, record, _), result in zip(batch, results)]
+        session.commit()
+        return results
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            started = time.perf_counter()
+            with app.app_context():
+                try:
+                    results = self._apply(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    db.session.expunge_all()
+                    results = None
+                    logging.warning("Batched write of %d items failed (%s); retrying one by one", len(batch), e)
+                    for item in batch:
+                        self._run_single(item)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.metrics["batches"] += 1
+                self.metrics["rows"] += sum(1 for _, record, _ in batch if record is not None)
+                self.metrics["jobs"] += sum(1 for job, _, _ in batch if job is not None)
+                self.metrics["flush_total_ms"] += elapsed_ms
+                self.metrics["flush_max_ms"] = max(self.metrics["flush_max_ms"], elapsed_ms)
+            if results is not None:
+                for (_, _, future), result in zip(batch, results):
+                    future.set_result(result)
+
+    def _run_single(self, item):
+        try:
+            item[2].set_result(self._apply([item])[0])
+        except Exception as e:
+            db.session.rollback()
+            # Drop the failed object so it is not re-added with the next batch.
+            db.session.expunge_all()
+            with self.lock:
+                self.metrics["failed"] += 1
+            logging.error("Database write failed: %s", e)
+            item[2].set_exception(e)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.metrics)
+        stats["queue_depth"] = self.items.qsize()
+        stats["avg_batch"] = (stats["rows"] + stats["jobs"]) / stats["batches"] if stats["batches"] else 0.0
+        stats["flush_avg_ms"] = stats["flush_total_ms"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_db_writer():
+    """Return the process-wide writer thread, starting it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DatabaseWriter()
+    return _writer
+
+
+def insert_behind(record):
+    """Queue a new row without waiting; returns a Future with its id."""
+    return get_db_writer().insert(record)
+
+
+def write_behind(job):
+    """Queue job(session) without waiting; returns a Future with its result."""
+    return get_db_writer().submit(job)
+
@@ -0,0 +1,219 @@
+"""
+Process-pool video decoding.
+
+With dozens of streams decoded by threads in one interpreter, PyAV decode and
+the bgr24 conversion are serialized by the GIL. In the "processes" execution
+mode each decode worker process owns a group of streams (one thread per
+stream inside the process), decodes them and converts every Nth frame
+straight into a slot of the stream's shared-memory FrameRing (frame_ring.py).
+A dispatcher thread in the parent hands zero-copy slot views to the
+registered callback (normally the inference scheduler, see
+detection.process_pooled_detection), which releases the slot when done.
+
+Worker processes import only av/numpy/requests, never the Flask app or models.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing as mp
+
+from frame_ring import FrameRing
+
+EXECUTION_MODE = os.getenv("DETECTION_EXECUTION_MODE", "threads")  # threads / processes
+
+
+def _stream_online(stream_url):
+    if not stream_url.startswith("http"):
+        return os.path.exists(stream_url)
+    import requests
+    try:
+        return requests.get(stream_url, timeout=10).status_code == 200
+    except Exception:
+        return False
+
+
+def _decode_stream(stream_url, sample_every, stop_event, frame_queue, reconnect_delay, ring_spec):
+    """Decode one stream inside a worker process until stopped or the stream goes offline."""
+    import av
+
+    ring = FrameRing.attach(*ring_spec)
+    frame_index = 0
+    while not stop_event.is_set():
+        if not _stream_online(stream_url):
+            break
+        try:
+            container = av.open(stream_url)
+        except Exception as e:
+            logging.error("Decode worker failed to open %s: %s", stream_url, e)
+            time.sleep(reconnect_delay)
+            continue
+        try:
+            video_stream = next((s for s in container.streams if s.type == "video"), None)
+            if video_stream is None:
+                break
+            decoded, busy = 0, 0.0
+            for packet in container.demux(video_stream):
+                if stop_event.is_set():
+                    break
+                started = time.monotonic()
+                frames = packet.decode()
+                busy += time.monotonic() - started
+                for frame in frames:
+                    decoded += 1
+                    frame_index += 1
+                    if (frame_index - 1) % sample_every:
+                        continue
+                    # Every slot still held by the detector: skip this frame before converting it.
+                    slot = ring.acquire()
+                    if slot is None:
+                        continue
+                    started = time.monotonic()
+                    ring.write_frame(slot, frame)
+                    busy += time.monotonic() - started
+                    frame_queue.put(("frame", stream_url, slot, decoded, busy))
+                    decoded, busy = 0, 0.0
+        except Exception as e:
+            logging.error("Decode worker error on %s: %s", stream_url, e)
+        finally:
+            container.close()
+        if not stop_event.is_set():
+            time.sleep(reconnect_delay)
+    ring.close()
+    frame_queue.put(("ended", stream_url))
+
+
+def _decode_process_main(command_queue, frame_queue, reconnect_delay):
+    """Entry point of a decode worker process: start/stop stream threads on command."""
+    streams = {}  # Key: stream_url, Value: (thread, stop_event)
+    while True:
+        command = command_queue.get()
+        action, stream_url = command[0], command[1]
+        if action == "add" and stream_url not in streams:
+            stop_event = threading.Event()
+            thread = threading.Thread(
+                target=_decode_stream,
+                args=(stream_url, command[2], stop_event, frame_queue, reconnect_delay, command[3]),
+                daemon=True
+            )
+            thread.start()
+            streams[stream_url] = (thread, stop_event)
+        elif action == "remove" and stream_url in streams:
+            thread, stop_event = streams.pop(stream_url)
+            stop_event.set()
+        elif action == "shutdown":
+            for thread, stop_event in streams.values():
+                stop_event.set()
+            return
+
+
+class DecodePool:
+    """Spreads streams over a fixed set of decode worker processes."""
+
+    def __init__(self, processes=None, reconnect_delay=5):
+        self.ctx = mp.get_context("spawn")
+        self.frame_queue = self.ctx.Queue(maxsize=256)
+        self.workers = []  # (process, command_queue)
+        self.assignments = {}  # Key: stream_url, Value: worker index
+        self.callbacks = {}  # Key: stream_url, Value: callback(img, frames_decoded, decode_seconds, release)
+        self.rings = {}  # Key: stream_url, Value: FrameRing owned by this (parent) process
+        self.retired_rings = []  # Rings of removed streams, closed once no slot view is left
+        self.lock = threading.Lock()
+        for _ in range(processes or max((os.cpu_count() or 2) - 1, 1)):
+            command_queue = self.ctx.Queue()
+            process = self.ctx.Process(
+                target=_decode_process_main,
+                args=(command_queue, self.frame_queue, reconnect_delay),
+                daemon=True
+            )
+            process.start()
+            self.workers.append((process, command_queue))
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def add_stream(self, stream_url, sample_every, callback):
+        with self.lock:
+            if stream_url in self.assignments:
+                return
+            load = [0] * len(self.workers)
+            for index in self.assignments.values():
+                load[index] += 1
+            index = load.index(min(load))
+            ring = FrameRing.create()
+            self.assignments[stream_url] = index
+            self.callbacks[stream_url] = callback
+            self.rings[stream_url] = ring
+        self.workers[index][1].put(("add", stream_url, sample_every, ring.spec()))
+
+    def remove_stream(self, stream_url):
+        with self.lock:
+            index = self.assignments.pop(stream_url, None)
+            self.callbacks.pop(stream_url, None)
+            ring = self.rings.pop(stream_url, None)
+            if ring is not None:
+                self.retired_rings.append(ring)
+        if index is not None:
+            self.workers[index][1].put(("remove", stream_url))
+
+    def is_active(self, stream_url):
+        with self.lock:
+            return stream_url in self.assignments
+
+    def shutdown(self):
+        for process, command_queue in self.workers:
+            command_queue.put(("shutdown", None))
+        for process, _ in self.workers:
+            process.join(timeout=5)
+
+    def _dispatch(self):
+        while True:
+            try:
+                message = self.frame_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            if message[0] == "ended":
+                with self.lock:
+                    self.assignments.pop(message[1], None)
+                    self.callbacks.pop(message[1], None)
+                    ring = self.rings.pop(message[1], None)
+                    if ring is not None:
+                        self.retired_rings.append(ring)
+                self._close_retired_rings()
+                continue
+            _, stream_url, slot, decoded, busy = message
+            with self.lock:
+                callback = self.callbacks.get(stream_url)
+                ring = self.rings.get(stream_url)
+            if callback is None or ring is None:
+                continue
+            img = ring.read_view(slot)
+            try:
+                callback(img, decoded, busy, lambda ring=ring, slot=slot: ring.release(slot))
+            except Exception as e:
+                logging.error("Frame callback error for %s: %s", stream_url, e)
+                ring.release(slot)
+
+    def _close_retired_rings(self):
+        with self.lock:
+            retired, self.retired_rings = self.retired_rings, []
+        for ring in retired:
+            try:
+                ring.close()
+            except BufferError:
+                # A slot view is still held by the detector; retry on the next stream end.
+                with self.lock:
+                    self.retired_rings.append(ring)
+
+
+_decode_pool = None
+_decode_pool_lock = threading.Lock()
+
+
+def get_decode_pool():
+    """Return the process-wide decode pool, starting the worker processes on first use."""
+    global _decode_pool
+    with _decode_pool_lock:
+        if _decode_pool is None:
+            processes = os.getenv("DECODE_PROCESSES")
+            _decode_pool = DecodePool(int(processes) if processes else None)
+    return _decode_pool
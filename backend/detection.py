@@ -1,11 +1,13 @@
+import os
 import time
 import cv2
+import queue
 import threading
 import logging
 import numpy as np
 import json
-import base64
 import subprocess
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import av  # PyAV for handling HLS streams
 from ultralytics import YOLO
@@ -22,13 +24,25 @@ from scipy import signal
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer  # Added for sentiment analysis
 
 from config import app
-from models import FlaggedObject, Log, ChatKeyword, DetectionLog, Stream, ChaturbateStream, StripchatStream, TelegramRecipient
+from models import FlaggedObject, Log, ChatKeyword, DetectionLog, Stream, ChaturbateStream, StripchatStream
 from extensions import db
-from notifications import send_notifications, send_text_message
+from scheduler import InferenceScheduler
+from image_store import store_image, image_url
+from db_writer import insert_behind, write_behind
+from stream_cache import get_stream_info
+
+try:
+    # Optional: libjpeg-turbo bindings encode alert images several times faster than cv2.imencode.
+    from turbojpeg import TurboJPEG
+    _turbo_jpeg = TurboJPEG()
+except Exception:
+    _turbo_jpeg = None
 
 # Global variables and locks
 _yolo_model = None
 _yolo_lock = threading.Lock()
+_inference_scheduler = None
+_scheduler_lock = threading.Lock()
 
 # Global dictionaries to store stream info and last alerted objects to avoid duplicate alerts.
 stream_info = {}
@@ -41,17 +55,75 @@ ALERT_COOLDOWN_SECONDS = 60  # Cooldown period in seconds for audio alerts
 # New global for per-stream rate limiting of audio alerts.
 audio_alert_timestamps = {}  # Key: stream_url, Value: list of datetime objects for recent alerts
 
+# Alert images are annotated and encoded only once an alert passes deduplication.
+ALERT_JPEG_QUALITY = int(os.getenv("ALERT_JPEG_QUALITY", "80"))
+ALERT_IMAGE_MAX_WIDTH = int(os.getenv("ALERT_IMAGE_MAX_WIDTH", "960"))
+# Whisper models per process; at most this many audio chunks are transcribed at once.
+WHISPER_POOL_SIZE = int(os.getenv("WHISPER_POOL_SIZE", "1"))  # Each base model is ~300 MB of weights
+alert_encode_stats = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+_alert_encode_lock = threading.Lock()
+
+# Live per-stream cost measurements, reported by the supervisor for admission control.
+stream_costs = {}  # Key: stream_url, Value: StreamCostTracker
+
+class StreamCostTracker:
+    """
+    Accumulates busy time of the decode, inference and ASR stages of one stream
+    and reports it as CPU cores used at full rate (inference is scaled up by the
+    sampling interval so degraded streams are comparable to full-rate ones).
+    """
+    def __init__(self, sample_every=1, min_window=10):
+        self.sample_every = sample_every
+        self.min_window = min_window
+        self.lock = threading.Lock()
+        self.last = None
+        self._reset()
+
+    def _reset(self):
+        self.window_start = time.monotonic()
+        self.busy = {"decode": 0.0, "inference": 0.0, "asr": 0.0}
+        self.frames = 0
+        self.inferences = 0
+        self.audio_seconds = 0.0
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.busy[stage] += seconds
+            if stage == "inference":
+                self.inferences += 1
+
+    def count_frame(self, count=1):
+        with self.lock:
+            self.frames += count
+
+    def add_audio(self, seconds):
+        with self.lock:
+            self.audio_seconds += seconds
+
+    def snapshot(self):
+        """Return the latest measurement window, or None before any frame was decoded."""
+        with self.lock:
+            elapsed = time.monotonic() - self.window_start
+            if self.frames and (elapsed >= self.min_window or self.last is None):
+                cost = {
+                    "decode": self.busy["decode"] / elapsed,
+                    "inference": self.busy["inference"] * self.sample_every / elapsed,
+                    "decode_fps": self.frames / elapsed,
+                    "inference_ms": 1000 * self.busy["inference"] / self.inferences if self.inferences else None,
+                }
+                # Only report ASR cost when audio actually ran, so video-only streams don't read as free.
+                if self.audio_seconds:
+                    cost["asr"] = self.busy["asr"] / elapsed
+                    cost["asr_rtf"] = self.busy["asr"] / self.audio_seconds
+                self.last = cost
+                self._reset()
+            return self.last
+
 def extract_stream_info_from_db(stream_url):
-    with app.app_context():
-        chaturbate_stream = ChaturbateStream.query.filter_by(chaturbate_m3u8_url=stream_url).first()
-        if chaturbate_stream:
-            return chaturbate_stream.type, chaturbate_stream.streamer_username
-        stripchat_stream = StripchatStream.query.filter_by(stripchat_m3u8_url=stream_url).first()
-        if stripchat_stream:
-            return stripchat_stream.type, stripchat_stream.streamer_username
-        stream_record = Stream.query.filter_by(room_url=stream_url).first()
-        if stream_record:
-            return stream_record.type, stream_record.streamer_username
+    """Platform and streamer of the stream with this m3u8 or room URL, from the stream metadata cache."""
+    info = get_stream_info(stream_url)
+    if info:
+        return info.platform, info.streamer_name
     return None, None
 
 def update_stream_info(stream_url, platform, streamer_name):
@@ -72,6 +144,74 @@ def load_yolov8_model():
                 _yolo_model = None
     return _yolo_model
 
+class WhisperPool:
+    """
+    Up to `size` Whisper models shared by the stream threads of this process. A
+    decode borrows one model (whisper.decode installs kv-cache hooks on it, so
+    a model serves one decode at a time); models are loaded on demand until the
+    pool is full, after which a decode waits for a free one.
+    """
+
+    def __init__(self, size=WHISPER_POOL_SIZE, name="base"):
+        self.size = max(size, 1)
+        self.name = name
+        self.idle = queue.Queue()
+        self.loaded = 0
+        self.lock = threading.Lock()
+
+    def _grow(self):
+        with self.lock:
+            if self.loaded >= self.size:
+                return None
+            self.loaded += 1
+        try:
+            model = load_model(self.name)
+            logging.info("Whisper model %d/%d loaded.", self.loaded, self.size)
+            return model
+        except Exception:
+            with self.lock:
+                self.loaded -= 1
+            raise
+
+    def ready(self):
+        """True once at least one model is loaded (loading it if needed)."""
+        if self.loaded:
+            return True
+        try:
+            model = self._grow()
+        except Exception as e:
+            logging.error("Error loading Whisper model: %s", e)
+            return False
+        if model is not None:
+            self.idle.put(model)
+        return True
+
+    @contextmanager
+    def model(self):
+        try:
+            model = self.idle.get_nowait()
+        except queue.Empty:
+            model = self._grow() or self.idle.get()
+        try:
+            yield model
+        finally:
+            self.idle.put(model)
+
+whisper_pool = WhisperPool()
+
+def preload_models():
+    """Load the YOLO model and the first Whisper model before any stream starts (detection supervisor)."""
+    load_yolov8_model()
+    whisper_pool.ready()  # Further models load on demand, only under concurrent audio decodes
+
+def get_inference_scheduler():
+    """Return the process-wide weighted-fair inference scheduler, starting it on first use."""
+    global _inference_scheduler
+    with _scheduler_lock:
+        if _inference_scheduler is None:
+            _inference_scheduler = InferenceScheduler(detect_frame_yolov8).start()
+    return _inference_scheduler
+
 def update_flagged_objects():
     with app.app_context():
         objects = FlaggedObject.query.all()
@@ -155,8 +295,9 @@ def detect_frame_yolov8(frame):
     flagged = update_flagged_objects()
     return [det for det in all_detections if det["class"] in flagged and det["confidence"] >= flagged[det["class"]]]
 
-def annotate_frame(frame, detections):
-    annotated_frame = frame.copy()
+def annotate_frame(frame, detections, in_place=False):
+    # In-place annotation avoids a full-frame copy when the caller owns the buffer (e.g. a ring slot).
+    annotated_frame = frame if in_place else frame.copy()
     for det in detections:
         x, y, w, h = det["bbox"]
         label = f'{det["class"]} ({det["confidence"]*100:.1f}%)'
@@ -165,108 +306,164 @@ def annotate_frame(frame, detections):
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
     return annotated_frame
 
-def async_send_notifications(log_id, platform_name, streamer_name):
-    max_attempts = 3
-    for attempt in range(max_attempts):
-        try:
-            with app.app_context():
-                log_entry = DetectionLog.query.get(log_id)
-                if log_entry is None:
-                    logging.error("Log entry with id %s not found.", log_id)
-                    return
-                send_notifications(log_entry, platform_name, streamer_name)
-            logging.info("Notification sent for %s on %s", streamer_name, platform_name)
-            return
-        except Exception as e:
-            if "Timed out" in str(e):
-                logging.error("Timeout sending Telegram image, trying fallback text message.")
-                try:
-                    fallback_msg = f"🚨 Object Detection Alert\nPlatform: {platform_name}\nStreamer: {streamer_name}\nImage failed to send due to timeout."
-                    with app.app_context():
-                        recipients = TelegramRecipient.query.all()
-                    for recipient in recipients:
-                        send_text_message(fallback_msg, recipient.chat_id, None)
-                    logging.info("Fallback text notification sent for %s on %s", streamer_name, platform_name)
-                    return
-                except Exception as e2:
-                    logging.error("Fallback text notification failed: %s", e2)
-            logging.error("Notification attempt %d failed: %s", attempt+1, e)
-            time.sleep(2)
-    logging.error("Failed to send notification after %d attempts", max_attempts)
-
-def log_detection(detections, stream_url, annotated_image, platform_name, streamer_name):
+def encode_alert_image(frame, detections):
+    """
+    Annotate and JPEG-encode an alert frame. The frame is downscaled to
+    ALERT_IMAGE_MAX_WIDTH first so boxes are drawn on, and the encoder works on,
+    the small image; at full size the boxes are drawn on frame itself.
+    Returns the JPEG bytes or None.
+    """
+    started = time.monotonic()
+    height, width = frame.shape[:2]
+    scale = ALERT_IMAGE_MAX_WIDTH / width
+    if scale < 1.0:
+        image = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        detections = [{**det, "bbox": [int(v * scale) for v in det["bbox"]]} for det in detections]
+    else:
+        image = frame
+    annotate_frame(image, detections, in_place=True)
+
+    if _turbo_jpeg is not None:
+        image_data = _turbo_jpeg.encode(image, quality=ALERT_JPEG_QUALITY)
+    else:
+        ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, ALERT_JPEG_QUALITY])
+        image_data = buffer.tobytes() if ret else None
+
+    elapsed_ms = (time.monotonic() - started) * 1000
+    with _alert_encode_lock:
+        alert_encode_stats["count"] += 1
+        alert_encode_stats["total_ms"] += elapsed_ms
+        alert_encode_stats["max_ms"] = max(alert_encode_stats["max_ms"], elapsed_ms)
+    logging.info("Alert image encoded in %.1f ms (%d bytes)", elapsed_ms, len(image_data) if image_data else 0)
+    return image_data
+
+def log_detection(detections, stream_url, frame, platform_name, streamer_name):
     """
     Immediately log and send notifications for flagged object detections.
     Avoid sending duplicate alerts for the same set of objects.
+    frame is the raw decoded frame; it is only annotated and encoded once the
+    alert is confirmed (and may be drawn on in the process).
+    Returns a Future with the new log's id (None for duplicates).
     """
     detected_set = set(det["class"] for det in detections)
     last_set = last_video_alerted_objects.get(stream_url)
     if last_set is not None and detected_set == last_set:
         logging.info("Duplicate detection for %s; skipping alert.", streamer_name)
-        return
+        return None
 
     last_video_alerted_objects[stream_url] = detected_set
 
     timestamp = datetime.utcnow()
-    ret, buffer = cv2.imencode('.jpg', annotated_image)
-    image_data = buffer.tobytes() if ret else None
-
-    assigned_agent = "Unassigned"
-    assignment_id = None
+    image_data = encode_alert_image(frame, detections)
+    image_hash = store_image(image_data) if image_data else None
 
-    # Retrieve the stream from the database to extract its assignment and agent.
-    with app.app_context():
-        stream = Stream.query.filter_by(room_url=stream_url).first()
-        if stream and stream.assignments and len(stream.assignments) > 0:
-            assignment = stream.assignments[0]
-            if assignment.agent:
-                assigned_agent = assignment.agent.username
-                assignment_id = assignment.id
+    # The stream's assignment and agent come from the metadata cache, not the database.
+    info = get_stream_info(stream_url)
+    assigned_agent = info.agent if info and info.agent else "Unassigned"
+    assignment_id = info.assignment_id if info else None
 
     details = {
         "detections": detections,
         "timestamp": timestamp.isoformat(),
         "streamer_name": streamer_name,
         "platform": platform_name,
-        "annotated_image": base64.b64encode(image_data).decode('utf-8') if image_data else None,
+        "image_url": image_url(image_hash),
         "assigned_agent": assigned_agent
     }
 
-    with app.app_context():
-        log_entry = DetectionLog(
-            room_url=stream_url,
-            event_type="object_detection",
-            details=details,
-            detection_image=image_data,
-            timestamp=timestamp,
-            read=False,
-            assigned_agent=assigned_agent,
-            assignment_id=assignment_id
-        )
-        db.session.add(log_entry)
-        db.session.commit()
-        
-        threading.Thread(target=async_send_notifications, args=(log_entry.id, platform_name, streamer_name)).start()
-
-def update_latest_visual_log_with_audio(stream_url, transcript, detected_keywords):
-    """Check if there's a recent visual detection log (object_detection) for this stream and update it with audio info."""
-    with app.app_context():
-        latest_log = Log.query.filter_by(room_url=stream_url, event_type='object_detection').order_by(Log.timestamp.desc()).first()
+    # Written behind by the DB writer thread so the frame loop never waits on the database;
+    # the Telegram alert is queued in the same commit (see NotificationOutbox).
+    return insert_behind(DetectionLog(
+        room_url=stream_url,
+        event_type="object_detection",
+        details=details,
+        image_hash=image_hash,
+        timestamp=timestamp,
+        read=False,
+        assigned_agent=assigned_agent,
+        assignment_id=assignment_id
+    ))
+
+def update_latest_visual_log_with_audio(stream_url, transcript, detected_keywords, audio_log=None):
+    """
+    Check if there's a recent visual detection log (object_detection) for this stream and update it with audio info,
+    otherwise insert audio_log if given. Runs on the DB writer thread; returns a Future resolving to True if a visual
+    log was updated.
+    """
+    def update(session):
+        latest_log = session.query(Log).filter_by(room_url=stream_url, event_type='object_detection').order_by(Log.timestamp.desc()).first()
         if latest_log and (datetime.utcnow() - latest_log.timestamp) < timedelta(seconds=5):
-            details = latest_log.details or {}
+            details = dict(latest_log.details or {})
             details['audio_transcript'] = transcript
             details['audio_keywords'] = detected_keywords
             latest_log.details = details
-            db.session.commit()
             logging.info("Updated visual detection log with audio info for stream %s", stream_url)
             return True
-    return False
+        if audio_log is not None:
+            session.add(audio_log)
+        return False
+
+    return write_behind(update)
+
+def make_detection_callback(stream_url, img, tracker, platform_name, streamer_name):
+    """
+    Build the inference scheduler callback that logs detections for img.
+    img belongs to the callback (a fresh decode or a held ring slot), so log_detection may draw on it.
+    """
+    def on_detections(detections, seconds):
+        tracker.add("inference", seconds)
+        if detections:
+            log_detection(detections, stream_url, img, platform_name, streamer_name)
+    return on_detections
+
+def process_pooled_detection(stream_url, cancel_event, sample_every=1, audio_enabled=True):
+    """
+    Process-pool execution mode: video is decoded in a decode worker process
+    (decode_pool.py) and sampled frames arrive here as zero-copy views of the stream's
+    shared-memory frame ring; each slot is released once inference and logging are done.
+    Audio, when enabled, still runs in this thread via process_combined_detection.
+    """
+    from decode_pool import get_decode_pool
 
-def process_combined_detection(stream_url, cancel_event):
+    platform_name, streamer_name = extract_stream_info_from_db(stream_url)
+    if not platform_name or not streamer_name:
+        logging.error("Stream %s not found. Aborting pooled detection.", stream_url)
+        return
+
+    tracker = StreamCostTracker(sample_every)
+    stream_costs[stream_url] = tracker
+    scheduler = get_inference_scheduler()
+    pool = get_decode_pool()
+
+    def on_frame(img, frames_decoded, decode_seconds, release):
+        tracker.count_frame(frames_decoded)
+        tracker.add("decode", decode_seconds)
+        scheduler.submit(
+            stream_url, img,
+            make_detection_callback(stream_url, img, tracker, platform_name, streamer_name),
+            release
+        )
+
+    try:
+        pool.add_stream(stream_url, sample_every, on_frame)
+        if audio_enabled:
+            process_combined_detection(stream_url, cancel_event, audio_enabled=True, video_enabled=False)
+        # The decode worker drops the stream when it goes offline.
+        while not cancel_event.is_set() and pool.is_active(stream_url):
+            cancel_event.wait(5)
+    finally:
+        pool.remove_stream(stream_url)
+        stream_costs.pop(stream_url, None)
+        scheduler.remove_stream(stream_url)
+    logging.info("Pooled detection ended for %s", stream_url)
+
+def process_combined_detection(stream_url, cancel_event, sample_every=1, audio_enabled=True, video_enabled=True):
     """
     Use a single PyAV container to process both video and audio detection.
-    Video frames are processed immediately for object detection.
-    Audio packets are accumulated in a buffer and processed in 5-second chunks for faster transcription.
+    Every `sample_every`-th video frame is processed immediately for object detection.
+    Audio packets are accumulated in a buffer and processed in 5-second chunks for faster transcription;
+    audio is skipped entirely when audio_enabled is False (video-only mode), and video is skipped when
+    video_enabled is False (audio side of the process-pool mode).
     If the connection is lost or an error occurs during packet pull/decoding, attempt to reconnect.
     """
     platform_name, streamer_name = extract_stream_info_from_db(stream_url)
@@ -276,6 +473,13 @@ def process_combined_detection(stream_url, cancel_event):
 
     # Initialize sentiment analyzer (VADER)
     sentiment_analyzer = SentimentIntensityAnalyzer()
+    if video_enabled:
+        tracker = StreamCostTracker(sample_every)
+        stream_costs[stream_url] = tracker
+    else:
+        tracker = stream_costs.get(stream_url) or StreamCostTracker(sample_every)
+    frame_index = 0
+    scheduler = get_inference_scheduler()
 
     while not cancel_event.is_set():
         if not check_stream_online(stream_url):
@@ -290,50 +494,64 @@ def process_combined_detection(stream_url, cancel_event):
             time.sleep(5)
             continue
 
-        video_stream = next((s for s in container.streams if s.type == 'video'), None)
-        audio_stream = next((s for s in container.streams if s.type == 'audio'), None)
+        video_stream = next((s for s in container.streams if s.type == 'video'), None) if video_enabled else None
+        audio_stream = next((s for s in container.streams if s.type == 'audio'), None) if audio_enabled else None
 
-        if not video_stream:
+        if video_enabled and not video_stream:
             logging.error("No video stream in %s", stream_url)
             container.close()
             return
+        if not video_stream and not audio_stream:
+            logging.error("Nothing to process in %s", stream_url)
+            container.close()
+            return
 
         logging.info("Combined detection started for %s", stream_url)
         required_audio_bytes = 16000 * 2 * 10  # 5 seconds of audio (mono, 16-bit, 16kHz)
         audio_buffer = b""
 
-        try:
-            whisper_model = load_model("base")
-            logging.info("Whisper model loaded for combined detection.")
-        except Exception as e:
-            logging.error("Error loading Whisper model: %s", e)
-            whisper_model = None
+        # Whisper models come from the process-wide pool, borrowed per decode.
+        audio_ready = audio_stream is not None and whisper_pool.ready()
+
+        streams_to_demux = [s for s in (video_stream, audio_stream) if s is not None]
 
         try:
-            for packet in container.demux(video_stream, audio_stream):
+            for packet in container.demux(*streams_to_demux):
                 if cancel_event.is_set():
                     logging.info("Combined detection stopped for %s", stream_url)
                     break
                 try:
-                    for frame in packet.decode():
+                    decode_start = time.monotonic()
+                    frames = packet.decode()
+                    tracker.add("decode", time.monotonic() - decode_start)
+                    for frame in frames:
                         if cancel_event.is_set():
                             logging.info("Combined detection stopped for %s", stream_url)
                             break
                         if frame.__class__.__name__ == "VideoFrame":
+                            tracker.count_frame()
+                            frame_index += 1
+                            if (frame_index - 1) % sample_every:
+                                continue
+                            decode_start = time.monotonic()
                             img = frame.to_ndarray(format='bgr24')
-                            detections = detect_frame_yolov8(img)
-                            if detections:
-                                annotated = annotate_frame(img, detections)
-                                log_detection(detections, stream_url, annotated, platform_name, streamer_name)
-                        elif frame.__class__.__name__ == "AudioFrame" and whisper_model is not None:
+                            tracker.add("decode", time.monotonic() - decode_start)
+                            # Inference runs on the shared scheduler; under load older frames are dropped.
+                            scheduler.submit(
+                                stream_url, img,
+                                make_detection_callback(stream_url, img, tracker, platform_name, streamer_name)
+                            )
+                        elif frame.__class__.__name__ == "AudioFrame" and audio_ready:
                             try:
                                 audio_data = frame.to_ndarray().tobytes()
                                 audio_buffer += audio_data
+                                tracker.add_audio(frame.samples / frame.sample_rate)
                             except Exception as e:
                                 logging.error("Error converting audio frame: %s", e)
                                 continue
 
                             if len(audio_buffer) >= required_audio_bytes:
+                                asr_start = time.monotonic()
                                 try:
                                     # Convert audio to float32 and normalize
                                     audio_int16 = np.frombuffer(audio_buffer, dtype=np.int16)
@@ -351,7 +569,6 @@ def process_combined_detection(stream_url, cancel_event):
                                     audio_input = whisper.pad_or_trim(audio_float)
                                     # Improved Whisper decoding config:
                                     # Using beam search with best_of sampling and a fixed temperature to enhance transcription quality.
-                                    mel = whisper.log_mel_spectrogram(audio_input, n_mels=80).to(whisper_model.device)
                                     options = whisper.DecodingOptions(
                                         fp16=False,
                                         task="transcribe",  # Explicitly set transcription mode
@@ -359,7 +576,10 @@ def process_combined_detection(stream_url, cancel_event):
                                         beam_size=5,
                                         temperature=0.0
                                     )
-                                    result = whisper.decode(whisper_model, mel, options)
+                                    with whisper_pool.model() as whisper_model:
+                                        mel = whisper.log_mel_spectrogram(audio_input, n_mels=80).to(whisper_model.device)
+                                        result = whisper.decode(whisper_model, mel, options)
+                                    tracker.add("asr", time.monotonic() - asr_start)
                                     text = result.text.strip().lower()
                                     logging.info("Combined audio transcription: '%s'", text)
                                     
@@ -403,26 +623,21 @@ def process_combined_detection(stream_url, cancel_event):
                                     detected = [kw for kw in keywords if kw in text]
                                     if detected:
                                         logging.info("Combined flagged audio keywords detected: %s", detected)
-                                        # If there's a recent visual detection, update it with audio info.
-                                        if not update_latest_visual_log_with_audio(stream_url, text, detected):
-                                            with app.app_context():
-                                                # Log the audio detection in DetectionLog so it shows up in notifications.
-                                                log_entry = DetectionLog(
-                                                    room_url=stream_url,
-                                                    event_type='audio_detection',
-                                                    details={
-                                                        'keywords': detected,
-                                                        'transcript': text,
-                                                        'sentiment': sentiment,  # Sentiment analysis result included.
-                                                        'platform': platform_name,
-                                                        'streamer_name': streamer_name,
-                                                        'timestamp': datetime.utcnow().isoformat()
-                                                    },
-                                                    read=False
-                                                )
-                                                db.session.add(log_entry)
-                                                db.session.commit()
-                                                threading.Thread(target=async_send_notifications, args=(log_entry.id, platform_name, streamer_name)).start()
+                                        # If there's a recent visual detection, update it with audio info;
+                                        # otherwise log the audio detection in DetectionLog so it shows up in notifications.
+                                        update_latest_visual_log_with_audio(stream_url, text, detected, DetectionLog(
+                                            room_url=stream_url,
+                                            event_type='audio_detection',
+                                            details={
+                                                'keywords': detected,
+                                                'transcript': text,
+                                                'sentiment': sentiment,  # Sentiment analysis result included.
+                                                'platform': platform_name,
+                                                'streamer_name': streamer_name,
+                                                'timestamp': datetime.utcnow().isoformat()
+                                            },
+                                            read=False
+                                        ))
                                 except Exception as e:
                                     logging.error("Combined Whisper transcription error: %s", e)
                                 audio_buffer = b""
@@ -437,6 +652,9 @@ def process_combined_detection(stream_url, cancel_event):
             if cancel_event.is_set():
                 break
             time.sleep(5)
+    if video_enabled:
+        stream_costs.pop(stream_url, None)
+        scheduler.remove_stream(stream_url)
     logging.info("Combined detection ended for %s", stream_url)
 
 def check_stream_online(m3u8_url, timeout=10):
@@ -520,8 +738,7 @@ def detect_chat_stream(stream_url, cancel_event):
                 ocr_text = pytesseract.image_to_string(image)
                 if ocr_text.strip():
                     messages = [{"username": "Unknown", "message": ocr_text.strip()}]
-                    with app.app_context():
-                        log_entry = Log(
+                    insert_behind(Log(
                             room_url=chat_url,
                             event_type="chat_detection",
                             details={
@@ -532,9 +749,7 @@ def detect_chat_stream(stream_url, cancel_event):
                                 "platform": platform,
                             },
                             timestamp=datetime.utcnow()
-                        )
-                        db.session.add(log_entry)
-                        db.session.commit()
+                        ))
             except Exception as e:
                 logging.error("Error during screenshot processing: %s", e)
     finally:
@@ -548,8 +763,7 @@ def detect_chat_stream(stream_url, cancel_event):
             detected = [kw for kw in flagged_keywords if kw in text_lower]
             if detected:
                 logging.info("Flagged chat message detected from '%s': %s", msg["username"], msg["message"])
-                with app.app_context():
-                    log_entry = Log(
+                insert_behind(Log(
                         room_url=chat_url,
                         event_type="chat_detection",
                         details={
@@ -560,10 +774,7 @@ def detect_chat_stream(stream_url, cancel_event):
                             "platform": platform,
                         },
                         timestamp=datetime.utcnow()
-                    )
-                    db.session.add(log_entry)
-                    db.session.commit()
-                    send_notifications(log_entry)
+                    ))
     else:
         logging.info("No chat messages detected on %s", chat_url)
 
@@ -0,0 +1,191 @@
+"""
+In-process event bus with Redis pub/sub fan-out.
+
+publish(topic, payload, rooms) delivers an event to the handlers subscribed
+in this process and emits it to browser sessions in the given rooms
+("admin", "agent:<username>"). Socket delivery goes through Flask-SocketIO:
+the server attached by messaging.py, or in processes without one (the
+detection supervisor) a write-only emitter on SOCKETIO_MESSAGE_QUEUE. The
+message queue reaches every worker's sockets, so each event is emitted once,
+by the process that published it.
+
+When EVENT_BUS_REDIS_URL is reachable every event is also published on a
+Redis channel; each process runs a listener that replays events from other
+processes to its local subscribers (cache invalidation, the notification
+dispatcher), not to sockets.
+
+Changes to DetectionLog and Log rows, and to the streams, assignments and
+agents behind the cached dashboards, are published automatically once the
+transaction that wrote them commits (see track_model_changes).
+"""
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import defaultdict
+
+import redis
+from sqlalchemy import event, inspect
+
+from config import app
+
+EVENTS_CHANNEL = "events"
+ADMIN_ROOM = "admin"
+# User columns rewritten on every socket connect/heartbeat; they do not invalidate agent caches.
+PRESENCE_COLUMNS = {"online", "last_active"}
+
+_origin = uuid.uuid4().hex  # Identifies this process so its own events are not replayed.
+_subscribers = defaultdict(list)  # Key: topic, Value: list of handler(payload)
+_socketio = None
+_redis_client = None
+_listener_started = False
+_lock = threading.Lock()
+
+
+def agent_room(username):
+    return f"agent:{username}"
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None and app.config.get("EVENT_BUS_REDIS_URL"):
+        _redis_client = redis.Redis.from_url(app.config["EVENT_BUS_REDIS_URL"], decode_responses=True)
+    return _redis_client
+
+
+def attach_socketio(socketio):
+    """Deliver events to browser rooms through this process's Socket.IO server."""
+    global _socketio
+    _socketio = socketio
+
+
+def _get_socketio():
+    global _socketio
+    if _socketio is None and app.config.get("SOCKETIO_MESSAGE_QUEUE"):
+        from flask_socketio import SocketIO
+
+        with _lock:
+            if _socketio is None:
+                _socketio = SocketIO(message_queue=app.config["SOCKETIO_MESSAGE_QUEUE"])
+    return _socketio
+
+
+def subscribe(topic, handler):
+    with _lock:
+        _subscribers[topic].append(handler)
+
+
+def _deliver(topic, payload):
+    with _lock:
+        handlers = list(_subscribers[topic])
+    for handler in handlers:
+        try:
+            handler(payload)
+        except Exception as e:
+            logging.error("Event handler error for %s: %s", topic, e)
+
+
+def publish(topic, payload, rooms=()):
+    """Deliver an event locally and, best effort, to every other process."""
+    _deliver(topic, payload)
+    socketio = _get_socketio()
+    if socketio is not None:
+        for room in rooms:
+            try:
+                socketio.emit(topic, payload, to=room)
+            except Exception as e:
+                logging.warning("Could not emit %s event to %s: %s", topic, room, e)
+    client = _get_redis()
+    if client is None:
+        return
+    try:
+        client.publish(EVENTS_CHANNEL, json.dumps({
+            "origin": _origin, "topic": topic, "payload": payload
+        }, default=str))
+    except redis.exceptions.RedisError as e:
+        logging.warning("Could not publish %s event: %s", topic, e)
+
+
+def _listen():
+    while True:
+        try:
+            pubsub = _get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(EVENTS_CHANNEL)
+            for message in pubsub.listen():
+                event_data = json.loads(message["data"])
+                if event_data["origin"] != _origin:
+                    _deliver(event_data["topic"], event_data["payload"])
+        except redis.exceptions.RedisError as e:
+            logging.warning("Event bus listener disconnected: %s", e)
+            time.sleep(5)
+
+
+def start_listener():
+    """Start replaying events published by other processes (once per process)."""
+    global _listener_started
+    with _lock:
+        if _listener_started or _get_redis() is None:
+            return
+        _listener_started = True
+    threading.Thread(target=_listen, name="event-bus", daemon=True).start()
+
+
+def notification_rooms(summary):
+    rooms = [ADMIN_ROOM]
+    if summary.get("assigned_agent") and summary["assigned_agent"] != "Unassigned":
+        rooms.append(agent_room(summary["assigned_agent"]))
+    return rooms
+
+
+def _changed_columns(obj):
+    return {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+
+
+def track_model_changes(session_cls):
+    """
+    Publish notification_created / notification_updated / notification_deleted
+    and log_created events for rows written through session_cls, after commit.
+    Payloads are built at flush time, while the rows are still loaded.
+    Any change to a Stream or Assignment publishes one streams_changed, and
+    to a User (other than its presence columns) one agents_changed, per
+    transaction.
+    """
+    from models import DetectionLog, Log, Stream, Assignment, User
+
+    @event.listens_for(session_cls, "after_flush")
+    def collect(session, flush_context):
+        pending = session.info.setdefault("pending_events", [])
+        for obj in session.new:
+            if isinstance(obj, DetectionLog):
+                summary = obj.summary()
+                pending.append(("notification_created", summary, notification_rooms(summary)))
+            elif isinstance(obj, Log):
+                pending.append(("log_created", obj.serialize(), [ADMIN_ROOM]))
+        for obj in session.dirty:
+            if isinstance(obj, DetectionLog) and session.is_modified(obj):
+                summary = obj.summary()
+                pending.append(("notification_updated", summary, notification_rooms(summary)))
+        for obj in session.deleted:
+            if isinstance(obj, DetectionLog):
+                pending.append(("notification_deleted", {"id": obj.id}, [ADMIN_ROOM]))
+        changed = session.info.setdefault("changed_scopes", set())
+        touched = list(session.new) + list(session.deleted)
+        touched += [obj for obj in session.dirty if session.is_modified(obj)]
+        for obj in touched:
+            if isinstance(obj, (Stream, Assignment)):
+                changed.add("streams")
+            elif isinstance(obj, User) and (obj not in session.dirty or _changed_columns(obj) - PRESENCE_COLUMNS):
+                changed.add("agents")
+
+    @event.listens_for(session_cls, "after_commit")
+    def flush_events(session):
+        for topic, payload, rooms in session.info.pop("pending_events", []):
+            publish(topic, payload, rooms)
+        for scope in sorted(session.info.pop("changed_scopes", ())):
+            publish(f"{scope}_changed", {})
+
+    @event.listens_for(session_cls, "after_rollback")
+    def drop_events(session):
+        session.info.pop("pending_events", None)
+        session.info.pop("changed_scopes", None)
@@ -0,0 +1,146 @@
+"""
+Local fake of the Telegram Bot API for exercising telegram_dispatcher.py.
+
+Answers getMe, sendMessage and sendPhoto, records per-chat send times,
+client connections and photo uploads, and can answer every Nth send with a
+429 flood-control error. Run it to push a burst of text alerts and one
+image fan-out through the dispatcher and check pooling, rate limits,
+retries and file_id reuse:
+
+    python fake_telegram_server.py [messages] [chats] [flood_every]
+"""
+import os
+import re
+import sys
+import json
+import time
+import threading
+from collections import defaultdict
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram_dispatcher import get_telegram_dispatcher
+
+
+class FakeTelegramState:
+    def __init__(self, flood_every=0):
+        self.flood_every = flood_every
+        self.lock = threading.Lock()
+        self.sends = 0
+        self.floods = 0
+        self.connections = set()
+        self.sent_at = defaultdict(list)  # Key: chat_id, Value: send times
+        self.uploads = 0
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, so pooled connections are reused.
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _fields(self, raw):
+            if self.headers.get("Content-Type", "").startswith("multipart/form-data"):
+                text = raw.decode("latin-1")
+                return {name: value for name, value in re.findall(r'name="(\w+)"\r\n(?:[^\r\n]+\r\n)*\r\n([^\r]*)', text)}
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                return json.loads(raw or b"{}")
+            return {key: values[0] for key, values in parse_qs(raw.decode()).items()}
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            method = self.path.rsplit("/", 1)[-1]
+            with state.lock:
+                state.connections.add(self.client_address)
+            if method == "getMe":
+                return self._reply(200, {"ok": True, "result": {
+                    "id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"
+                }})
+            if method not in ("sendMessage", "sendPhoto"):
+                return self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            fields = self._fields(raw)
+            chat_id = int(fields.get("chat_id", 0))
+            with state.lock:
+                state.sends += 1
+                if state.flood_every and state.sends % state.flood_every == 0:
+                    state.floods += 1
+                    return self._reply(429, {
+                        "ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                        "parameters": {"retry_after": 1}
+                    })
+                state.sent_at[chat_id].append(time.monotonic())
+                message_id = state.sends
+            result = {"message_id": message_id, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"}}
+            if method == "sendPhoto":
+                photo = fields.get("photo", "")
+                if not photo.startswith("fake-file-"):
+                    with state.lock:
+                        state.uploads += 1
+                    photo = f"fake-file-{message_id}"
+                result["caption"] = fields.get("caption", "")
+                result["photo"] = [{"file_id": photo, "file_unique_id": photo, "width": 1280, "height": 720}]
+            else:
+                result["text"] = fields.get("text", "")
+            self._reply(200, {"ok": True, "result": result})
+
+    return Handler
+
+
+def start_fake_server(flood_every=0):
+    state = FakeTelegramState(flood_every)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def max_rate_per_chat(state, window=1.0):
+    """Highest number of messages any chat received within `window` seconds."""
+    worst = 0
+    for times in state.sent_at.values():
+        start = 0
+        for end in range(len(times)):
+            while times[end] - times[start] > window:
+                start += 1
+            worst = max(worst, end - start + 1)
+    return worst
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    flood_every = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+    server, state = start_fake_server(flood_every)
+    os.environ["TELEGRAM_TOKEN"] = "123:FAKE"
+    os.environ["TELEGRAM_API_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    dispatcher = get_telegram_dispatcher()
+
+    started = time.monotonic()
+    futures = [dispatcher.submit("send_message", 1000 + i % chats, text=f"alert {i}") for i in range(messages)]
+    results = [future.result(timeout=600) for future in futures]
+    elapsed = time.monotonic() - started
+
+    print(f"{messages} messages to {chats} chats in {elapsed:.1f}s ({messages / elapsed:.1f} msg/s)")
+    print(f"delivered: {sum(r is not None for r in results)}, 429s injected: {state.floods}")
+    print(f"client connections used: {len(state.connections)}")
+    print(f"max messages to one chat within 1s: {max_rate_per_chat(state)}")
+
+    from notifications import send_image_to_chats
+    image = os.urandom(200 * 1024)
+    photo_futures = send_image_to_chats(image, None, "fan-out test", [1000 + i for i in range(chats)])
+    delivered = sum(future.result(timeout=600) is not None for future in photo_futures)
+    print(f"image to {chats} chats: {delivered} delivered, {state.uploads} upload(s) of {len(image)} bytes")
+    print(f"dispatcher stats: {json.dumps(dispatcher.stats(), indent=2)}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
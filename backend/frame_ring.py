@@ -0,0 +1,165 @@
+"""
+Per-stream ring of preallocated frame buffers in shared memory.
+
+The parent (detector side) creates one ring per stream and the decode worker
+process attaches to it by name. The decoder writes each sampled frame straight
+into a free slot and announces the slot index; the detector and annotator
+work on a zero-copy view of the slot and release it when done. If every slot
+is still held by the detector the decoder skips the frame before converting
+it, so a lagging detector throttles sampling instead of piling up memory.
+
+Each slot's state is only ever advanced by one side (FREE -> WRITING -> READY
+by the decoder, READY -> READING -> FREE by the detector), so the aligned
+int64 state words need no cross-process lock.
+"""
+import os
+import time
+import errno
+from multiprocessing import shared_memory
+
+import numpy as np
+
+FREE, WRITING, READY, READING = 0, 1, 2, 3
+
+DEFAULT_SLOTS = int(os.getenv("FRAME_RING_SLOTS", "3"))
+MAX_WIDTH = int(os.getenv("FRAME_RING_MAX_WIDTH", "1280"))
+MAX_HEIGHT = int(os.getenv("FRAME_RING_MAX_HEIGHT", "720"))
+
+_HEADER_FIELDS = 3  # state, height, width
+_ALIGN = 64
+SHM_PATH = "/dev/shm"  # tmpfs backing SharedMemory on Linux; 64 MB by default in a container
+
+
+def shm_bytes(available=False):
+    """Size of SHM_PATH in bytes (free space if available), or None where it does not exist."""
+    try:
+        stat = os.statvfs(SHM_PATH)
+    except OSError:
+        return None
+    return (stat.f_bavail if available else stat.f_blocks) * stat.f_frsize
+
+
+def rings_that_fit(slots=DEFAULT_SLOTS, max_width=MAX_WIDTH, max_height=MAX_HEIGHT):
+    """How many default-sized rings SHM_PATH can hold, or None if unknown."""
+    total = shm_bytes()
+    return None if total is None else total // FrameRing.size_for(slots, max_width, max_height)
+
+
+class FrameRing:
+    def __init__(self, shm, slots, max_width, max_height, owner):
+        self.shm = shm
+        self.slots = slots
+        self.max_width = max_width
+        self.max_height = max_height
+        self.owner = owner
+        header_bytes = slots * _HEADER_FIELDS * 8
+        self.data_offset = -(-header_bytes // _ALIGN) * _ALIGN
+        self.slot_bytes = max_width * max_height * 3
+        self.header = np.ndarray((slots, _HEADER_FIELDS), dtype=np.int64, buffer=shm.buf)
+        self.next_slot = 0
+        self.dropped = 0
+
+    @classmethod
+    def size_for(cls, slots, max_width, max_height):
+        header_bytes = -(-(slots * _HEADER_FIELDS * 8) // _ALIGN) * _ALIGN
+        return header_bytes + slots * max_width * max_height * 3
+
+    @classmethod
+    def create(cls, slots=DEFAULT_SLOTS, max_width=MAX_WIDTH, max_height=MAX_HEIGHT):
+        size = cls.size_for(slots, max_width, max_height)
+        # tmpfs allocates pages on first write, so an oversubscribed ring would SIGBUS the decoder
+        # mid-frame; refuse it here instead.
+        available = shm_bytes(available=True)
+        if available is not None and available < size:
+            raise OSError(errno.ENOSPC, f"{SHM_PATH} has {available} bytes free, a frame ring needs {size}")
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        ring = cls(shm, slots, max_width, max_height, owner=True)
+        ring.header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, slots, max_width, max_height):
+        return cls(shared_memory.SharedMemory(name=name), slots, max_width, max_height, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def spec(self):
+        """Arguments a decoder process needs to attach to this ring."""
+        return (self.name, self.slots, self.max_width, self.max_height)
+
+    def _slot_buffer(self, slot):
+        offset = self.data_offset + slot * self.slot_bytes
+        return self.shm.buf[offset:offset + self.slot_bytes]
+
+    # Decoder side -------------------------------------------------------
+
+    def acquire(self, timeout=0.0):
+        """Claim a free slot for writing, or return None (frame dropped) if none frees up in time."""
+        deadline = time.monotonic() + timeout
+        while True:
+            for i in range(self.slots):
+                slot = (self.next_slot + i) % self.slots
+                if self.header[slot, 0] == FREE:
+                    self.header[slot, 0] = WRITING
+                    self.next_slot = (slot + 1) % self.slots
+                    return slot
+            if time.monotonic() >= deadline:
+                self.dropped += 1
+                return None
+            time.sleep(0.002)
+
+    def write_view(self, slot, height, width):
+        """Writable bgr24 view of the slot for a frame of the given size."""
+        self.header[slot, 1] = height
+        self.header[slot, 2] = width
+        return np.ndarray((height, width, 3), dtype=np.uint8, buffer=self._slot_buffer(slot))
+
+    def publish(self, slot):
+        self.header[slot, 0] = READY
+
+    def write_frame(self, slot, frame):
+        """
+        Convert a PyAV VideoFrame to bgr24 directly into the slot (downscaled
+        to fit the ring if needed) without an intermediate ndarray.
+        """
+        width, height = frame.width, frame.height
+        if width > self.max_width or height > self.max_height:
+            scale = min(self.max_width / width, self.max_height / height)
+            width, height = int(width * scale) // 2 * 2, int(height * scale) // 2 * 2
+        converted = frame.reformat(width=width, height=height, format="bgr24")
+        plane = converted.planes[0]
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(height, plane.line_size)
+        self.write_view(slot, height, width).reshape(height, width * 3)[:] = rows[:, :width * 3]
+        self.publish(slot)
+
+    # Detector side ------------------------------------------------------
+
+    def read_view(self, slot):
+        """Zero-copy view of a published slot; the caller must release() it."""
+        self.header[slot, 0] = READING
+        height, width = int(self.header[slot, 1]), int(self.header[slot, 2])
+        return np.ndarray((height, width, 3), dtype=np.uint8, buffer=self._slot_buffer(slot))
+
+    def release(self, slot):
+        header = self.header
+        if header is not None:  # No-op once the ring is closed.
+            header[slot, 0] = FREE
+
+    def close(self):
+        """
+        Unmap (and, for the owner, unlink) the ring. Raises BufferError, leaving
+        the ring usable, while the detector still holds a slot view.
+        """
+        if self.header is None:
+            return
+        # The header is itself a view into the buffer, so it has to go before the mapping can close.
+        self.header = None
+        try:
+            self.shm.close()
+        except BufferError:
+            self.header = np.ndarray((self.slots, _HEADER_FIELDS), dtype=np.int64, buffer=self.shm.buf)
+            raise
+        if self.owner:
+            self.shm.unlink()
@@ -1,3 +1,5 @@
+import gc
+import os
 import multiprocessing
 
 bind = "0.0.0.0:5000"
@@ -7,3 +9,45 @@ timeout = 60
 loglevel = "info"
 # accesslog = "/var/log/gunicorn/access.log"
 # errorlog = "/var/log/gunicorn/error.log"
+
+# Preload mode (PRELOAD_APP=1): the master imports the app once and freezes the heap, so forked
+# workers share the imported modules copy-on-write instead of each importing their own. Web workers
+# run no models (detection lives in supervisor.py, which loads them once for all its streams), so
+# only the app is preloaded. Check the effect with `python memory_report.py`.
+#
+# Only for the sync and gthread worker classes: with gevent the app would be imported before the
+# worker monkey-patches the stdlib, leaving every module-level threading.Lock a native lock that
+# blocks the whole hub. when_ready refuses to start in that combination.
+PRELOAD_APP = os.getenv("PRELOAD_APP", "0") == "1"
+preload_app = PRELOAD_APP
+
+if PRELOAD_APP:
+    # No collections in the master while the app loads: a collection writes to every tracked
+    # object's header, which would dirty (and copy) the pages the workers are meant to share.
+    gc.disable()
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before the first worker is forked.
+    if not PRELOAD_APP:
+        return
+    if "gevent" in server.cfg.worker_class_str:
+        server.log.error("PRELOAD_APP=1 is not supported with the gevent worker class; unset it or use gthread")
+        raise SystemExit(1)
+    gc.freeze()  # Move everything allocated so far to the permanent generation; workers never scan it.
+    server.log.info("App preloaded; %d objects frozen for copy-on-write sharing", gc.get_freeze_count())
+
+
+def post_worker_init(worker):
+    # Runs in each worker after fork.
+    if not PRELOAD_APP:
+        return
+    from config import app
+    from extensions import db
+    from main import start_background_tasks
+
+    gc.enable()
+    with app.app_context():
+        # Drop the master's pooled connections without closing them under the other processes.
+        db.engine.dispose(close=False)
+    start_background_tasks()
@@ -0,0 +1,58 @@
+"""
+Content-addressed store for detection images.
+
+Images are written once to DETECTION_IMAGES_FOLDER under their SHA-256 hash
+(sharded by the first two hex digits) and rows only keep the hash. Identical
+images are stored once, files are immutable so they can be cached forever,
+and serve_detection_image streams them from disk via send_file instead of
+pulling blobs through the database.
+"""
+import os
+import re
+import hashlib
+import tempfile
+
+from config import app
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _root():
+    return app.config["DETECTION_IMAGES_FOLDER"]
+
+
+def is_valid_hash(image_hash):
+    return bool(image_hash and HASH_PATTERN.match(image_hash))
+
+
+def image_path(image_hash):
+    return os.path.join(_root(), image_hash[:2], f"{image_hash}.jpg")
+
+
+def image_url(image_hash):
+    return f"/detection-images/{image_hash}.jpg" if image_hash else None
+
+
+def store_image(image_data):
+    """Write image_data (JPEG bytes) to the store if not already there and return its hash."""
+    image_hash = hashlib.sha256(image_data).hexdigest()
+    path = image_path(image_hash)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial image.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(image_data)
+        os.replace(tmp_path, path)
+    return image_hash
+
+
+def load_image(image_hash):
+    """Return the stored bytes for image_hash, or None if missing."""
+    if not is_valid_hash(image_hash):
+        return None
+    try:
+        with open(image_path(image_hash), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,157 @@
+"""
+Lease-based assignment of monitored streams to detection nodes.
+
+Every detection supervisor registers itself as a DetectionNode and heartbeats
+periodically. Streams requested for detection are rows in stream_leases; each
+node claims unowned or expired leases up to min(capacity, fair share), renews
+the ones it owns and releases any excess so that a newly started node picks
+them up. Leases of a node that stops heartbeating expire and are taken over
+by the remaining nodes.
+"""
+import math
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, and_
+
+from config import app
+from extensions import db
+from models import DetectionNode, StreamLease
+
+LEASE_TTL_SECONDS = 30
+
+
+def request_stream(stream_url):
+    """Mark stream_url as requested for detection. Returns False if it already was."""
+    with app.app_context():
+        if StreamLease.query.filter_by(stream_url=stream_url).first():
+            return False
+        db.session.add(StreamLease(stream_url=stream_url))
+        try:
+            db.session.commit()
+        except Exception:
+            # Another worker inserted the same stream concurrently.
+            db.session.rollback()
+            return False
+        return True
+
+
+def release_stream(stream_url):
+    """Remove stream_url from detection. Its owner stops the worker on its next sync."""
+    with app.app_context():
+        deleted = StreamLease.query.filter_by(stream_url=stream_url).delete()
+        db.session.commit()
+        return deleted > 0
+
+
+def lease_status(stream_url):
+    """Status of stream_url's lease ("active" or "queued"), or None if detection was not requested."""
+    with app.app_context():
+        lease = StreamLease.query.filter_by(stream_url=stream_url).first()
+        return lease.status if lease is not None else None
+
+
+class LeaseManager:
+    """Claims, renews and releases stream leases on behalf of one node."""
+
+    def __init__(self, node_id, capacity=10, cpu_budget=1.0, lease_ttl=LEASE_TTL_SECONDS):
+        self.node_id = node_id
+        self.capacity = capacity
+        self.cpu_budget = cpu_budget
+        self.lease_ttl = lease_ttl
+
+    def _now(self):
+        return datetime.now(timezone.utc)
+
+    def heartbeat(self, load=None):
+        now = self._now()
+        node = DetectionNode.query.filter_by(node_id=self.node_id).first()
+        if node is None:
+            node = DetectionNode(node_id=self.node_id)
+            db.session.add(node)
+        node.capacity = self.capacity
+        node.cpu_budget = self.cpu_budget
+        if load is not None:
+            node.load = load
+        node.last_heartbeat = now
+        db.session.commit()
+
+    def live_node_count(self):
+        cutoff = self._now() - timedelta(seconds=self.lease_ttl)
+        return max(DetectionNode.query.filter(DetectionNode.last_heartbeat >= cutoff).count(), 1)
+
+    def target_count(self):
+        """Number of streams this node should own: its fair share, bounded by capacity."""
+        total = StreamLease.query.filter_by(status="active").count()
+        fair_share = math.ceil(total / self.live_node_count())
+        return min(self.capacity, fair_share)
+
+    def _still_owned(self, lease):
+        return StreamLease.query.filter(StreamLease.id == lease.id, StreamLease.owner == self.node_id)
+
+    def sync(self, costs=None, load=None):
+        """
+        Heartbeat, renew owned leases, release any excess and claim orphaned
+        leases. `costs` maps owned stream URLs to their measured cost and `load`
+        is the node's total measured CPU use. Returns a dict of the stream URLs
+        this node owns afterwards, mapped to their detection mode.
+        """
+        costs = costs or {}
+        with app.app_context():
+            self.heartbeat(load)
+            now = self._now()
+            expires_at = now + timedelta(seconds=self.lease_ttl)
+            target = self.target_count()
+
+            owned = StreamLease.query.filter_by(owner=self.node_id).order_by(StreamLease.requested_at.asc()).all()
+            # Every write is conditional on still owning the lease: another node may have claimed
+            # it (after it expired) between the select above and the commit below.
+            for lease in owned[target:]:
+                self._still_owned(lease).update({"owner": None, "expires_at": None}, synchronize_session=False)
+                logging.info("Node %s released %s for rebalancing", self.node_id, lease.stream_url)
+            owned_urls = {}
+            for lease in owned[:target]:
+                values = {"expires_at": expires_at}
+                if lease.stream_url in costs:
+                    values["cost"] = costs[lease.stream_url]
+                if self._still_owned(lease).update(values, synchronize_session=False):
+                    owned_urls[lease.stream_url] = lease.mode
+                else:
+                    logging.warning("Node %s lost %s to another node", self.node_id, lease.stream_url)
+            db.session.commit()
+
+            available = target - len(owned_urls)
+            if available > 0:
+                candidates = StreamLease.query.filter(
+                    StreamLease.status == "active",
+                    or_(StreamLease.owner.is_(None), StreamLease.expires_at < now)
+                ).order_by(StreamLease.requested_at.asc()).limit(available).all()
+                for lease in candidates:
+                    # Conditional update so two nodes cannot claim the same lease.
+                    claimed = StreamLease.query.filter(
+                        StreamLease.id == lease.id,
+                        or_(StreamLease.owner.is_(None), StreamLease.expires_at < now)
+                    ).update({"owner": self.node_id, "expires_at": expires_at}, synchronize_session=False)
+                    db.session.commit()
+                    if claimed:
+                        owned_urls[lease.stream_url] = lease.mode
+                        logging.info("Node %s claimed %s", self.node_id, lease.stream_url)
+            return owned_urls
+
+    def release_all(self):
+        """Give up every lease held by this node, e.g. on shutdown."""
+        with app.app_context():
+            StreamLease.query.filter_by(owner=self.node_id).update(
+                {"owner": None, "expires_at": None}, synchronize_session=False
+            )
+            DetectionNode.query.filter_by(node_id=self.node_id).delete()
+            db.session.commit()
+
+    def drop_stale_nodes(self):
+        """Delete node rows that have not heartbeated for several lease periods."""
+        cutoff = self._now() - timedelta(seconds=self.lease_ttl * 10)
+        with app.app_context():
+            DetectionNode.query.filter(
+                and_(DetectionNode.last_heartbeat < cutoff, DetectionNode.node_id != self.node_id)
+            ).delete(synchronize_session=False)
+            db.session.commit()
@@ -3,13 +3,17 @@ from extensions import db
 from models import User
 from routes import *
 from cleanup import start_chat_cleanup_thread, start_detection_cleanup_thread
-from monitoring import start_notification_monitor
+from outbox import start_notification_dispatcher
+from messaging import socketio
+from events import start_listener
+from migrate import run_migrations
 import logging
 from flask_cors import CORS
 CORS(app, resources={r"/api/*": {"origins": "*"}}) 
 
 with app.app_context():
     # Create all database tables if they do not exist.
+    # Schema migrations run once per deploy (`python migrate.py`, an init container in k8s), not per worker.
     db.create_all()
 
     # Create default admin if none exists.
@@ -40,11 +44,21 @@ with app.app_context():
         db.session.add(agent)
         db.session.commit()
 
-# Start background tasks.
-start_notification_monitor()      # Monitors new detection logs and sends notifications
-start_chat_cleanup_thread()         # Cleans up old chat logs periodically
-start_detection_cleanup_thread()    # Cleans up old detection logs periodically
+def start_background_tasks():
+    start_listener()                    # Replays events from other processes to this worker's subscribers
+    start_notification_dispatcher()   # Delivers queued Telegram notifications (one active dispatcher per cluster)
+    start_chat_cleanup_thread()         # Cleans up old chat logs periodically
+    start_detection_cleanup_thread()    # Cleans up old detection logs periodically
+
+# Start background tasks. In preload mode this module is imported once by the gunicorn master, and
+# threads do not survive fork, so gunicorn.conf.py starts them in each worker instead.
+if not app.config["PRELOAD_APP"]:
+    start_background_tasks()
 
 if __name__ == "__main__":
+    with app.app_context():
+        run_migrations()
+    if app.config["PRELOAD_APP"]:
+        start_background_tasks()
     # Run the Flask application on all interfaces at port 5000.
-    app.run(host="0.0.0.0", port=5000, threaded=True, debug=False)
+    socketio.run(app, host="0.0.0.0", port=5000, debug=False)
@@ -0,0 +1,106 @@
+"""
+Memory report for a gunicorn master and its workers (Linux only).
+
+Reads /proc/<pid>/smaps_rollup for the master and each child and prints
+RSS, PSS, shared and private memory per process. RSS counts shared pages
+in full for every process, so the RSS column overstates the total. PSS
+divides each shared page between the processes that map it, so the PSS
+total is what the pod is actually charged. Compare runs with
+PRELOAD_APP=0 and PRELOAD_APP=1 (see gunicorn.conf.py). With preloading,
+the imported app should show up as shared memory rather than private
+memory in each worker. Pass the detection supervisor's pid to see the
+process that holds the models, together with its decode workers.
+
+    python memory_report.py [master_pid]
+
+Without a pid, the oldest running gunicorn process is taken as the master.
+The total is checked against MEMORY_LIMIT_MB (default 4096, the pod limit);
+the exit status is 1 when it is over.
+"""
+import os
+import sys
+
+MEMORY_LIMIT_MB = int(os.getenv("MEMORY_LIMIT_MB", "4096"))
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_rollup(pid):
+    """Return {field: kB} from /proc/<pid>/smaps_rollup."""
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts and parts[0].rstrip(":") in FIELDS:
+                usage[parts[0].rstrip(":")] = int(parts[1])
+    return usage
+
+
+def read_stat(pid):
+    """Return (ppid, start_time) for a pid."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return int(fields[1]), int(fields[19])
+
+
+def command(pid):
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        return f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+
+
+def pids():
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            yield int(name)
+
+
+def find_master():
+    candidates = []
+    for pid in pids():
+        try:
+            if "gunicorn" in command(pid):
+                candidates.append((read_stat(pid)[1], pid))
+        except OSError:
+            continue
+    if not candidates:
+        raise SystemExit("No gunicorn process found; pass the master pid.")
+    return min(candidates)[1]
+
+
+def children(master):
+    found = []
+    for pid in pids():
+        try:
+            if read_stat(pid)[0] == master:
+                found.append(pid)
+        except OSError:
+            continue
+    return sorted(found)
+
+
+def main():
+    master = int(sys.argv[1]) if len(sys.argv) > 1 else find_master()
+    rows = []
+    for role, pid in [("master", master)] + [("worker", pid) for pid in children(master)]:
+        try:
+            usage = read_rollup(pid)
+        except OSError as e:
+            print(f"skipping {pid}: {e}")
+            continue
+        shared = usage.get("Shared_Clean", 0) + usage.get("Shared_Dirty", 0)
+        private = usage.get("Private_Clean", 0) + usage.get("Private_Dirty", 0)
+        rows.append((role, pid, usage.get("Rss", 0), usage.get("Pss", 0), shared, private))
+
+    print(f"{'process':<8} {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'shared MB':>10} {'private MB':>11}")
+    for role, pid, rss, pss, shared, private in rows:
+        print(f"{role:<8} {pid:>8} {rss / 1024:>9.1f} {pss / 1024:>9.1f} {shared / 1024:>10.1f} {private / 1024:>11.1f}")
+    total_rss = sum(row[2] for row in rows) / 1024
+    total_pss = sum(row[3] for row in rows) / 1024
+    print(f"{'total':<8} {len(rows):>8} {total_rss:>9.1f} {total_pss:>9.1f}")
+    print(f"PSS total {total_pss:.0f} MB of the {MEMORY_LIMIT_MB} MB limit ({total_pss / MEMORY_LIMIT_MB:.0%})")
+    if total_pss > MEMORY_LIMIT_MB:
+        print("FAIL: over the memory limit")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
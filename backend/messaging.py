@@ -1,10 +1,14 @@
 import datetime
-from flask import session
+from flask import session, request
 from flask_socketio import SocketIO, emit, join_room
 from models import db, User, ChatMessage, DetectionLog
 from config import app
+from events import attach_socketio, agent_room, ADMIN_ROOM
 
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Clients connect with the websocket transport only, so a session never spans workers and needs no
+# sticky routing; emits from any worker reach every socket through the message queue.
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=app.config["SOCKETIO_MESSAGE_QUEUE"])
+attach_socketio(socketio)
 online_users = {}  # {user_id: {sid: string, role: string}}
 
 
@@ -15,9 +19,11 @@ def handle_connect():
         user = User.query.get(user_id)
         if user:
             user.online = True
-            user.last_active = datetime.now(timezone.utc)
+            user.last_active = datetime.datetime.now(datetime.timezone.utc)
             db.session.commit()
-            online_users[user_id] = request.sid
+            online_users[user_id] = {'sid': request.sid, 'role': user.role}
+            # Notification events are pushed to these rooms (see events.py).
+            join_room(ADMIN_ROOM if user.role == 'admin' else agent_room(user.username))
             emit('user_status', {'userId': user_id, 'online': True}, broadcast=True)
 
 @socketio.on('disconnect')
@@ -37,7 +43,7 @@ def handle_activity():
     if user_id:
         user = User.query.get(user_id)
         if user:
-            user.last_active = datetime.now(timezone.utc)
+            user.last_active = datetime.datetime.now(datetime.timezone.utc)
             db.session.commit()
 
 @socketio.on('forward_notification')
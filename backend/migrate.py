@@ -0,0 +1,162 @@
+"""
+Idempotent schema and data migrations for existing databases.
+
+db.create_all() only creates missing tables; it never adds columns or indexes
+to tables that already exist. Each migration here checks the live schema
+first, so running them again is harmless. They run once per deploy, before
+the web workers and the detection supervisor start (an init container in
+k8s), not on every worker import:
+
+    python migrate.py
+
+On Postgres the run holds an advisory lock, so pods starting together
+migrate one after another.
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import load_only
+
+from config import app
+from extensions import db
+from models import DetectionLog, ChatMessage, NotificationOutbox, notification_stream_key
+from image_store import store_image, image_url
+
+
+def column_exists(table, column):
+    return column in {c["name"] for c in inspect(db.engine).get_columns(table)}
+
+
+def add_column(table, column, ddl_type):
+    if not column_exists(table, column):
+        with db.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+        logging.info("Added column %s.%s", table, column)
+
+
+def timestamp_type():
+    """DDL type matching db.DateTime(timezone=True) on the current database."""
+    return "TIMESTAMP WITH TIME ZONE" if db.engine.dialect.name == "postgresql" else "TIMESTAMP"
+
+
+def ensure_timestamptz(table, column):
+    """Convert a naive Postgres TIMESTAMP column (stored as UTC) to TIMESTAMP WITH TIME ZONE."""
+    if db.engine.dialect.name != "postgresql":
+        return
+    columns = {c["name"]: c["type"] for c in inspect(db.engine).get_columns(table)}
+    if column in columns and not getattr(columns[column], "timezone", False):
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE TIMESTAMP WITH TIME ZONE "
+                f"USING {column} AT TIME ZONE 'UTC'"
+            ))
+        logging.info("Converted %s.%s to TIMESTAMP WITH TIME ZONE", table, column)
+
+
+def create_index(name, table, columns):
+    with db.engine.begin() as conn:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def move_detection_images_to_store(batch_size=200):
+    """
+    Move JPEG blobs out of detection_logs into the content-addressed image
+    store: keep only image_hash, and drop the base64 copy from details.
+    """
+    moved = 0
+    while True:
+        rows = DetectionLog.query.options(
+            load_only(DetectionLog.id, DetectionLog.detection_image, DetectionLog.details)
+        ).filter(DetectionLog.detection_image.isnot(None)).limit(batch_size).all()
+        if not rows:
+            break
+        for row in rows:
+            image_hash = store_image(row.detection_image)
+            details = dict(row.details or {})
+            details.pop("annotated_image", None)
+            details["image_url"] = image_url(image_hash)
+            row.image_hash = image_hash
+            row.details = details
+            row.detection_image = None
+            row.updated_at = DetectionLog.updated_at  # Not a change clients need to re-fetch
+        db.session.commit()
+        moved += len(rows)
+    if moved:
+        logging.info("Moved %d detection images to the image store", moved)
+    return moved
+
+
+def backfill_assigned_agent():
+    """Copy details.assigned_agent into the indexed assigned_agent column where it is missing."""
+    from_details = DetectionLog.details["assigned_agent"].as_string()
+    updated = DetectionLog.query.filter(
+        DetectionLog.assigned_agent.is_(None), from_details.isnot(None)
+    ).update(
+        # Keep updated_at as is: this is not a change clients need to re-fetch.
+        {"assigned_agent": from_details, "updated_at": DetectionLog.updated_at},
+        synchronize_session=False
+    )
+    db.session.commit()
+    if updated:
+        logging.info("Backfilled assigned_agent on %d detection logs", updated)
+
+
+def backfill_updated_at():
+    with db.engine.begin() as conn:
+        conn.execute(text("UPDATE detection_logs SET updated_at = timestamp WHERE updated_at IS NULL"))
+
+
+def backfill_outbox_stream_key():
+    """Key unsent outbox rows from before stream_key by their log's stream, as new rows are."""
+    rows = NotificationOutbox.query.filter(
+        NotificationOutbox.stream_key.is_(None), NotificationOutbox.status.in_(("pending", "sending"))
+    ).all()
+    for row in rows:
+        entry = row.detection_log or row.log
+        row.stream_key = notification_stream_key(entry) if entry is not None else row.room_url
+    db.session.commit()
+
+
+def run_migrations():
+    """Apply every pending migration. Must run inside an application context."""
+    # Columns first: the ORM backfills below select every mapped column, so a
+    # column the model has but the table lacks would fail the whole run.
+    add_column("detection_logs", "image_hash", "VARCHAR(64)")
+    add_column("detection_logs", "updated_at", timestamp_type())
+    ensure_timestamptz("detection_logs", "updated_at")
+    add_column("telegram_recipients", "event_types", "JSON")
+    add_column("telegram_recipients", "platforms", "JSON")
+    add_column("notification_outbox", "room_url", "VARCHAR(300)")
+    add_column("notification_outbox", "stream_key", "VARCHAR(300)")
+
+    backfill_updated_at()
+    move_detection_images_to_store()
+    backfill_assigned_agent()
+    backfill_outbox_stream_key()
+
+    create_index("ix_detection_logs_image_hash", "detection_logs", ["image_hash"])
+    for index in DetectionLog.__table__.indexes:
+        create_index(index.name, "detection_logs", [column.name for column in index.columns])
+    create_index("ix_notification_outbox_stream_key_status", "notification_outbox", ["stream_key", "status"])
+    create_index("ix_logs_timestamp_id", "logs", ["timestamp", "id"])
+    for index in ChatMessage.__table__.indexes:
+        create_index(index.name, "chat_messages", [column.name for column in index.columns])
+
+
+MIGRATION_LOCK_ID = 7245301  # Arbitrary key for pg_advisory_lock
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        lock = None
+        if db.engine.dialect.name == "postgresql":
+            lock = db.engine.connect()
+            lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            db.create_all()
+            run_migrations()
+        finally:
+            if lock is not None:
+                lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                lock.close()
@@ -171,6 +171,8 @@ class Log(db.Model):
     __table_args__ = (
         db.Index('idx_logs_room_event', 'room_url', 'event_type'),
         db.Index('idx_logs_timestamp_read', 'timestamp', 'read'),
+        # Keyset order of the merged /api/logs listing.
+        db.Index('ix_logs_timestamp_id', 'timestamp', 'id'),
     )
 
     def __repr__(self):
@@ -231,6 +233,9 @@ class TelegramRecipient(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     telegram_username = db.Column(db.String(50), unique=True, nullable=False, index=True)
     chat_id = db.Column(db.String(50), nullable=False, index=True)
+    # Subscription filters; None (or empty) means every event type / platform.
+    event_types = db.Column(db.JSON, nullable=True)
+    platforms = db.Column(db.JSON, nullable=True)
 
     def __repr__(self):
         return f"<TelegramRecipient {self.telegram_username}>"
@@ -240,6 +245,8 @@ class TelegramRecipient(db.Model):
             "id": self.id,
             "telegram_username": self.telegram_username,
             "chat_id": self.chat_id,
+            "event_types": self.event_types,
+            "platforms": self.platforms,
         }
 
 
@@ -253,16 +260,61 @@ class DetectionLog(db.Model):
     room_url = db.Column(db.String(255), nullable=False)
     event_type = db.Column(db.String(50), nullable=False)
     details = db.Column(db.JSON, nullable=True)
-    detection_image = db.Column(db.LargeBinary, nullable=True)  # JPEG image bytes
-    assigned_agent = db.Column(db.String(100), nullable=True)  # New field for assigned agent username (for redundancy)
+    detection_image = db.Column(db.LargeBinary, nullable=True)  # Legacy JPEG bytes; moved to the image store by migrate.py
+    image_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 key in the image store (image_store.py)
+    assigned_agent = db.Column(db.String(100), nullable=True)  # Denormalized from details so agent filters can use an index
     assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), nullable=True)
     timestamp = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # Bumped on every change (e.g. read state) so pollers can fetch only what changed since their last poll.
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
     sender_username = db.Column(db.String(100), nullable=True)
     read = db.Column(db.Boolean, default=False)
 
+    # Composite indexes for the notification feed: newest-first pages, optionally filtered by one column.
+    __table_args__ = (
+        db.Index("ix_detection_logs_timestamp_id", "timestamp", "id"),
+        db.Index("ix_detection_logs_event_type_timestamp", "event_type", "timestamp", "id"),
+        db.Index("ix_detection_logs_read_timestamp", "read", "timestamp", "id"),
+        db.Index("ix_detection_logs_assigned_agent_timestamp", "assigned_agent", "timestamp", "id"),
+        db.Index("ix_detection_logs_room_url_timestamp", "room_url", "timestamp"),
+        db.Index("ix_detection_logs_updated_at_id", "updated_at", "id"),
+    )
+
     # Relationship to Assignment (if this detection is associated with a stream assignment)
     assignment = db.relationship("Assignment", backref=db.backref("detection_logs", lazy="dynamic"))
 
+    # Inline base64 images some legacy rows keep in details; summary() replaces them with media URLs.
+    MEDIA_FIELDS = {"annotated_image": "annotated", "captured_image": "captured"}
+
+    @classmethod
+    def media_details(cls, notification_id, fields):
+        """details entries pointing at /api/notifications/<id>/media for the inline images in fields."""
+        return {
+            field if field == "captured_image" else "image_url":
+                f"/api/notifications/{notification_id}/media?kind={cls.MEDIA_FIELDS[field]}"
+            for field in fields
+        }
+
+    def summary(self):
+        """Blob-free representation used by the notifications API and pushed events."""
+        details = dict(self.details or {})
+        inline = [field for field in self.MEDIA_FIELDS if details.pop(field, None)]
+        details.update(self.media_details(self.id, inline))
+        if self.image_hash:
+            details["image_url"] = f"/detection-images/{self.image_hash}.jpg"
+        return {
+            "id": self.id,
+            "event_type": self.event_type,
+            "timestamp": self.timestamp.isoformat(),
+            "details": details,
+            "read": self.read,
+            "room_url": self.room_url,
+            "streamer": details.get('streamer_name', 'Unknown'),
+            "platform": details.get('platform', 'Unknown'),
+            "assigned_agent": self.assigned_agent or details.get('assigned_agent', 'Unassigned')
+        }
+
     def serialize(self):
         assigned = self.assigned_agent
         # If the assignment relationship exists, override with agent's username
@@ -274,6 +326,7 @@ class DetectionLog(db.Model):
             "event_type": self.event_type,
             "details": self.details,
             "assigned_agent": assigned,
+            "image_url": f"/detection-images/{self.image_hash}.jpg" if self.image_hash else None,
             "timestamp": self.timestamp.isoformat(),
             "read": self.read,
         }
@@ -294,6 +347,13 @@ class ChatMessage(db.Model):
     sender = db.relationship("User", foreign_keys=[sender_id])
     receiver = db.relationship("User", foreign_keys=[receiver_id])
 
+    __table_args__ = (
+        # Conversation pages: each direction of a conversation in (timestamp, id) order.
+        db.Index('ix_chat_messages_sender_receiver_timestamp', 'sender_id', 'receiver_id', 'timestamp', 'id'),
+        # Unread counts and bulk read receipts for one recipient.
+        db.Index('ix_chat_messages_receiver_read_sender', 'receiver_id', 'read', 'sender_id'),
+    )
+
     def serialize(self):
         return {
             "id": self.id,
@@ -306,4 +366,177 @@ class ChatMessage(db.Model):
             "details": self.details,
             "sender_username": self.sender.username if self.sender else None,
             "receiver_username": self.receiver.username if self.receiver else None
-        }
\ No newline at end of file
+        }
+
+class DetectionNode(db.Model):
+    """
+    DetectionNode records a running detection supervisor (one per pod) and its
+    heartbeat, so that stream leases can be spread across live nodes.
+    """
+    __tablename__ = "detection_nodes"
+    id = db.Column(db.Integer, primary_key=True)
+    node_id = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    capacity = db.Column(db.Integer, nullable=False, default=10)
+    cpu_budget = db.Column(db.Float, nullable=False, default=1.0)  # CPU cores available for detection
+    load = db.Column(db.Float, nullable=False, default=0.0)  # Measured CPU cores used by owned streams
+    last_heartbeat = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+
+    def __repr__(self):
+        return f"<DetectionNode {self.node_id}>"
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "node_id": self.node_id,
+            "capacity": self.capacity,
+            "cpu_budget": self.cpu_budget,
+            "load": self.load,
+            "last_heartbeat": self.last_heartbeat.isoformat() if self.last_heartbeat else None,
+        }
+
+
+class StreamLease(db.Model):
+    """
+    StreamLease marks a stream as requested for detection. The owning node
+    renews expires_at on every heartbeat; unowned or expired leases can be
+    claimed by any live node. Queued leases wait for admission (see admission.py).
+    """
+    __tablename__ = "stream_leases"
+    id = db.Column(db.Integer, primary_key=True)
+    stream_url = db.Column(db.String(300), unique=True, nullable=False, index=True)
+    owner = db.Column(db.String(100), nullable=True, index=True)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default="active", index=True)  # active / queued
+    mode = db.Column(db.String(20), nullable=False, default="full")  # full / reduced / video_only
+    cost = db.Column(db.JSON, nullable=True)  # Measured per-component CPU cost reported by the owner
+    priority = db.Column(db.Float, nullable=False, default=1.0)  # Admin-set inference weight
+    requested_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<StreamLease {self.stream_url} owner={self.owner}>"
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "stream_url": self.stream_url,
+            "owner": self.owner,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+            "status": self.status,
+            "mode": self.mode,
+            "cost": self.cost,
+            "priority": self.priority,
+            "requested_at": self.requested_at.isoformat() if self.requested_at else None,
+        }
+
+
+class NotificationOutbox(db.Model):
+    """
+    NotificationOutbox holds one pending Telegram alert per notifiable
+    DetectionLog or Log row. Rows are added in the same transaction as the
+    detection (see enqueue_notifications) and delivered by the outbox
+    dispatcher (outbox.py), which claims them in batches and retries failures.
+    """
+    __tablename__ = "notification_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    detection_log_id = db.Column(db.Integer, db.ForeignKey('detection_logs.id', ondelete="CASCADE"), nullable=True)
+    log_id = db.Column(db.Integer, db.ForeignKey('logs.id', ondelete="CASCADE"), nullable=True)
+    room_url = db.Column(db.String(300), nullable=True)
+    # "platform:streamer" of the alert's stream (see notification_stream_key); digests group on it
+    stream_key = db.Column(db.String(300), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending / sending / sent / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    claimed_by = db.Column(db.String(100), nullable=True)
+    claimed_until = db.Column(db.DateTime(timezone=True), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    detection_log = db.relationship("DetectionLog", backref=db.backref("outbox_entries", passive_deletes=True))
+    log = db.relationship("Log", backref=db.backref("outbox_entries", passive_deletes=True))
+
+    __table_args__ = (
+        db.Index("ix_notification_outbox_status_next_attempt", "status", "next_attempt_at"),
+        db.Index("ix_notification_outbox_stream_key_status", "stream_key", "status"),
+    )
+
+    def __repr__(self):
+        return f"<NotificationOutbox {self.id} {self.status}>"
+
+
+class NotificationDelivery(db.Model):
+    """
+    NotificationDelivery records the outcome of an outbox row for one chat:
+    "sent", or "failed" on a permanent Telegram error (chat not found, bot
+    blocked). Retries of the row skip every chat recorded here, so a failure
+    in one chat never re-sends the alert to the others.
+    """
+    __tablename__ = "notification_deliveries"
+    id = db.Column(db.Integer, primary_key=True)
+    outbox_id = db.Column(db.Integer, db.ForeignKey('notification_outbox.id', ondelete="CASCADE"), nullable=False,
+                          index=True)
+    chat_id = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # sent / failed
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    outbox = db.relationship(
+        "NotificationOutbox",
+        backref=db.backref("deliveries", lazy="selectin", passive_deletes=True)
+    )
+
+    def __repr__(self):
+        return f"<NotificationDelivery {self.outbox_id} {self.chat_id} {self.status}>"
+
+
+class ServiceLease(db.Model):
+    """
+    ServiceLease elects a single owner for a cluster-wide background service
+    (e.g. the notification dispatcher). The owner renews expires_at; once it
+    lapses any process may take the lease over.
+    """
+    __tablename__ = "service_leases"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    owner = db.Column(db.String(100), nullable=True)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ServiceLease {self.name} owner={self.owner}>"
+
+
+# Event types that are sent to Telegram recipients.
+NOTIFY_EVENT_TYPES = {"object_detection", "audio_detection", "chat_detection", "video_notification"}
+
+
+# Publish row changes on the event bus once their transaction commits.
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from events import track_model_changes
+track_model_changes(Session)
+
+
+def notification_stream_key(log_entry):
+    """
+    Identity of the stream an alert belongs to. Object and audio alerts carry the m3u8 URL and chat
+    alerts the room page URL, so the key is built from the platform and streamer name every detector
+    records in details, falling back to the URL.
+    """
+    details = log_entry.details or {}
+    platform = details.get("platform")
+    streamer = details.get("streamer_name") or details.get("streamer_username")
+    if platform and streamer:
+        return f"{platform.strip().lower()}:{streamer.strip().lower()}"
+    return log_entry.room_url
+
+
+@event.listens_for(Session, "before_flush")
+def enqueue_notifications(session, flush_context, instances):
+    """Add an outbox row for every new notifiable log, so it commits (or rolls back) with it."""
+    for obj in list(session.new):
+        if isinstance(obj, DetectionLog) and obj.event_type in NOTIFY_EVENT_TYPES:
+            session.add(NotificationOutbox(
+                detection_log=obj, room_url=obj.room_url, stream_key=notification_stream_key(obj)
+            ))
+        elif isinstance(obj, Log) and obj.event_type in NOTIFY_EVENT_TYPES:
+            session.add(NotificationOutbox(log=obj, room_url=obj.room_url, stream_key=notification_stream_key(obj)))
@@ -1,151 +1,294 @@
 import os
 import json
+import hashlib
 import logging
 import base64
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from config import app
 from models import Log, TelegramRecipient
 from extensions import db
-from telegram import Bot, InputFile
-from concurrent.futures import ThreadPoolExecutor
+from image_store import load_image
+from telegram_dispatcher import get_telegram_dispatcher
+from stream_cache import get_stream_info
 from dotenv import load_dotenv
-import asyncio
-from io import BytesIO
 
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-executor = ThreadPoolExecutor(max_workers=5)  # Adjust max_workers as needed
+FILE_ID_CACHE_SIZE = 1000
+TELEGRAM_MESSAGE_LIMIT = 4096
+TELEGRAM_CAPTION_LIMIT = 1024
 
-def get_bot(token=None):
-    """Return a Telegram Bot instance."""
-    if token is None:
-        token = TELEGRAM_TOKEN
-    return Bot(token=token)
+# Telegram file_id of each image already uploaded, keyed by image hash (LRU).
+_file_ids = OrderedDict()
+_file_ids_lock = threading.Lock()
 
-async def send_text_message_async(msg, chat_id, token=None):
-    """Send a text message asynchronously."""
-    try:
-        bot = get_bot(token)
-        await bot.send_message(chat_id=chat_id, text=msg)
-        logging.info(f"Telegram text message sent to chat_id {chat_id}.")
-        return True
-    except Exception as e:
-        logging.error(f"Failed to send Telegram message to chat_id {chat_id}: {e}")
-        return False
+def send_text_message(msg, chat_id, token=None):
+    """
+    Queue a text message on the shared Telegram dispatcher. Returns a Future
+    resolving to the sent Message, or None if sending failed.
+    """
+    return get_telegram_dispatcher().submit("send_message", chat_id, token, text=msg)
 
-async def send_telegram_image_async(photo_file, caption, chat_id, token=None):
+def send_telegram_image(photo_file, caption, chat_id, token=None):
     """
-    Send an image message asynchronously.
-    photo_file should be a file-like object (e.g. BytesIO).
+    Queue an image message on the shared Telegram dispatcher.
+    photo_file is the image bytes (or a file-like object), or the file_id of an image already on Telegram.
     """
-    try:
-        bot = get_bot(token)
-        await bot.send_photo(chat_id=chat_id, photo=photo_file, caption=caption)
-        logging.info(f"Telegram image sent to chat_id {chat_id}.")
-        return True
-    except Exception as e:
-        logging.error(f"Failed to send Telegram image to chat_id {chat_id}: {e}")
+    return get_telegram_dispatcher().submit("send_photo", chat_id, token, photo=photo_file, caption=caption)
+
+def cached_file_id(image_hash):
+    with _file_ids_lock:
+        file_id = _file_ids.get(image_hash)
+        if file_id:
+            _file_ids.move_to_end(image_hash)
+        return file_id
+
+def remember_file_id(image_hash, file_id):
+    with _file_ids_lock:
+        _file_ids[image_hash] = file_id
+        _file_ids.move_to_end(image_hash)
+        while len(_file_ids) > FILE_ID_CACHE_SIZE:
+            _file_ids.popitem(last=False)
+
+def _relay(source, target):
+    def copy(f):
+        if f.exception() is not None:
+            target.set_exception(f.exception())
+        else:
+            target.set_result(f.result())
+    source.add_done_callback(copy)
+
+def _upload_to_first(image_data, image_hash, caption, chat_ids, futures):
+    """
+    Upload the image to chat_ids[0] and send the rest the returned file_id. If
+    that upload fails (e.g. the bot is blocked there), the next chat takes over
+    the upload instead of every remaining chat uploading its own copy.
+    """
+    upload = send_telegram_image(image_data, caption, chat_ids[0])
+    _relay(upload, futures[0])
+
+    def on_uploaded(upload):
+        message = None if upload.exception() else upload.result()
+        uploaded_id = message.photo[-1].file_id if message is not None and message.photo else None
+        if uploaded_id:
+            remember_file_id(image_hash, uploaded_id)
+            for chat_id, future in zip(chat_ids[1:], futures[1:]):
+                _relay(send_telegram_image(uploaded_id, caption, chat_id), future)
+        elif len(chat_ids) > 1:
+            _upload_to_first(image_data, image_hash, caption, chat_ids[1:], futures[1:])
+
+    upload.add_done_callback(on_uploaded)
+
+def send_image_to_chats(image_data, image_hash, caption, chat_ids):
+    """
+    Send one image to several chats, uploading its bytes at most once per
+    successful upload: the first send uploads it and the rest reuse the
+    returned Telegram file_id, which is also cached per image hash for later
+    alerts and retries. Returns one future per chat.
+    """
+    image_hash = image_hash or hashlib.sha256(image_data).hexdigest()
+    file_id = cached_file_id(image_hash)
+    if file_id:
+        return [send_telegram_image(file_id, caption, chat_id) for chat_id in chat_ids]
+
+    futures = [Future() for _ in chat_ids]
+    # Raw bytes rather than a BytesIO, so a retried upload starts from the beginning.
+    _upload_to_first(image_data, image_hash, caption, list(chat_ids), futures)
+    return futures
+
+def recipient_wants(recipient, event_type, platform):
+    """Apply a recipient's subscription filters (None means every event type / platform)."""
+    if recipient.event_types and event_type not in recipient.event_types:
+        return False
+    if recipient.platforms and (platform or "").lower() not in [p.lower() for p in recipient.platforms]:
         return False
+    return True
 
-def send_text_message(msg, chat_id, token=None):
-    """Wrapper to run the async function in a synchronous context."""
-    return asyncio.run(send_text_message_async(msg, chat_id, token))
+def _top_confidence(details):
+    detections_list = details.get('detections') or []
+    if detections_list and isinstance(detections_list, list) and isinstance(detections_list[0], dict):
+        confidence = detections_list[0].get('confidence')
+        if isinstance(confidence, (int, float)):
+            return confidence
+    return None
 
-def send_telegram_image(photo_file, caption, chat_id, token=None):
-    """Wrapper to run the async function in a synchronous context."""
-    return asyncio.run(send_telegram_image_async(photo_file, caption, chat_id, token))
+def build_alert_message(log_entry, platform, streamer):
+    """Telegram text for a single alert."""
+    details = log_entry.details or {}
+    confidence = _top_confidence(details)
+    conf_str = f"{(confidence * 100):.1f}%" if confidence is not None else "N/A"
+
+    if log_entry.event_type == 'object_detection':
+        detections_list = details.get('detections') or []
+        detected_objects = ", ".join([d["class"] for d in detections_list]) if detections_list else "No details"
+        return (
+            f"🚨 **Object Detection Alert**\n"
+            f"🎥 Platform: {platform}\n"
+            f"📡 Streamer: {streamer}\n"
+            f"📌 Objects Detected: {detected_objects}\n"
+            f"🔍 Confidence: {conf_str}"
+        )
+    if log_entry.event_type == 'audio_detection':
+        keyword = details.get('keyword', 'N/A')
+        transcript = details.get('transcript', 'No transcript available.')
+        return (
+            f"🔊 **Audio Detection Alert**\n"
+            f"🎥 Platform: {platform}\n"
+            f"📡 Streamer: {streamer}\n"
+            f"🔑 Keyword: {keyword}\n"
+            f"📝 Transcript: {transcript[:300]}..."
+        )
+    if log_entry.event_type == 'chat_detection':
+        detections = details.get('detections', [{}])
+        first_detection = detections[0] if detections else {}
+        return (
+            f"💬 **Chat Detection Alert**\n"
+            f"🎥 Platform: {platform}\n"
+            f"📡 Streamer: {streamer}\n"
+            f"👤 Sender: {first_detection.get('sender', 'Unknown')}\n"
+            f"🔍 Keywords: {', '.join(first_detection.get('keywords', []))}\n"
+            f"📝 Message: {first_detection.get('message', '')[:300]}..."
+        )
+    if log_entry.event_type == 'video_notification':
+        msg_detail = details.get('message', 'No additional details.')
+        return (
+            f"🎥 **Video Notification**\n"
+            f"🎥 Platform: {platform}\n"
+            f"📡 Streamer: {streamer}\n"
+            f"📝 Message: {msg_detail}"
+        )
+    return (
+        f"🔔 **{log_entry.event_type.replace('_', ' ').title()}**\n"
+        f"🎥 Platform: {platform}\n"
+        f"📡 Streamer: {streamer}\n"
+        f"📌 Details: {json.dumps(details, indent=2)[:500]}..."
+    )
+
+def _digest_line(log_entry):
+    details = log_entry.details or {}
+    time_str = log_entry.timestamp.strftime('%H:%M:%S') if log_entry.timestamp else ''
+    if log_entry.event_type == 'object_detection':
+        objects = ", ".join(d.get("class", "?") for d in details.get('detections') or []) or "objects"
+        confidence = _top_confidence(details)
+        conf_str = f" ({confidence * 100:.0f}%)" if confidence is not None else ""
+        return f"{time_str} 🚨 {objects}{conf_str}"
+    if log_entry.event_type == 'audio_detection':
+        keywords = details.get('keyword') or ", ".join(details.get('keywords') or [])
+        return f"{time_str} 🔊 {keywords or 'audio keyword'}"
+    if log_entry.event_type == 'chat_detection':
+        detections = details.get('detections') or [{}]
+        first = detections[0] if isinstance(detections[0], dict) else {}
+        keywords = ", ".join(first.get('keywords') or details.get('keywords') or [])
+        return f"{time_str} 💬 {first.get('sender') or details.get('username', 'chat')}: {keywords}"
+    return f"{time_str} 🔔 {log_entry.event_type.replace('_', ' ')}"
+
+def _alert_image(log_entry):
+    """(image bytes, image hash) of an object alert, or (None, None)."""
+    if log_entry.event_type != 'object_detection':
+        return None, None
+    image_hash = getattr(log_entry, 'image_hash', None)
+    return load_image(image_hash) or getattr(log_entry, 'detection_image', None), image_hash
+
+def _send_to_chats(message, image_data, image_hash, chat_ids):
+    """Returns {chat_id: future}."""
+    if not chat_ids:
+        return {}
+    if image_data:
+        futures = send_image_to_chats(image_data, image_hash, message[:TELEGRAM_CAPTION_LIMIT], chat_ids)
+    else:
+        futures = [send_text_message(message[:TELEGRAM_MESSAGE_LIMIT], chat_id) for chat_id in chat_ids]
+    return dict(zip(chat_ids, futures))
 
-def send_notifications(log_entry, platform_name=None, streamer_name=None):
+def stream_labels(log_entry):
+    """
+    Platform and streamer name for an alert: from the log details when the detector recorded them,
+    otherwise from the stream metadata cache.
+    """
+    details = log_entry.details or {}
+    platform = details.get('platform')
+    streamer = details.get('streamer_name') or details.get('streamer_username')
+    if not platform or not streamer:
+        info = get_stream_info(log_entry.room_url)
+        if info:
+            platform = platform or info.platform
+            streamer = streamer or info.streamer_name
+    return platform or 'Unknown Platform', streamer or 'Unknown Streamer'
+
+def send_notifications(log_entry, platform_name=None, streamer_name=None, skip_chats=()):
     """
     Sends notifications based on the log_entry from the unified detection API.
     For object detection events, if a stored annotated image is available, it is sent as an image.
     For chat detection events, a Telegram text message is sent with details about the flagged chat message.
+    Only recipients whose filters match the event type and platform, and whose chat_id is not in
+    skip_chats, are messaged. Returns {chat_id: future} (each future resolving to None on failure),
+    or None on error.
     """
     try:
         with app.app_context():
-            details = log_entry.details or {}
-            platform = platform_name if platform_name is not None else details.get('platform', 'Unknown Platform')
-            streamer = streamer_name if streamer_name is not None else details.get('streamer_name', 'Unknown Streamer')
+            platform, streamer = stream_labels(log_entry)
+            platform = platform_name if platform_name is not None else platform
+            streamer = streamer_name if streamer_name is not None else streamer
 
-            # For object detection.
-            detections_list = details.get('detections') or []
-            confidence = None
-            if detections_list and isinstance(detections_list, list):
-                confidence = detections_list[0].get('confidence')
-            conf_str = f"{(confidence * 100):.1f}%" if isinstance(confidence, (int, float)) else "N/A"
+            recipients = TelegramRecipient.query.all()
+            if not recipients:
+                logging.warning("No Telegram recipients found; skipping notification.")
+                return {}
+            chat_ids = [
+                r.chat_id for r in recipients
+                if r.chat_id not in skip_chats and recipient_wants(r, log_entry.event_type, platform)
+            ]
+
+            message = build_alert_message(log_entry, platform, streamer)
+            image_data, image_hash = _alert_image(log_entry)
+            return _send_to_chats(message, image_data, image_hash, chat_ids)
+    except Exception as e:
+        logging.error(f"Notification error: {str(e)}")
+        return None
+
+def send_digest(log_entries):
+    """
+    Send several alerts of one stream as a single digest per recipient,
+    listing every alert the recipient subscribes to and attaching the image
+    of the highest-confidence object alert among them. Returns futures like
+    send_notifications.
+    """
+    try:
+        with app.app_context():
+            log_entries = sorted(log_entries, key=lambda e: e.id)
+            platform, streamer = stream_labels(log_entries[0])
 
             recipients = TelegramRecipient.query.all()
             if not recipients:
                 logging.warning("No Telegram recipients found; skipping notification.")
-                return
-
-            if log_entry.event_type == 'object_detection':
-                detected_objects = ", ".join([d["class"] for d in detections_list]) if detections_list else "No details"
-                message = (
-                    f"🚨 **Object Detection Alert**\n"
-                    f"🎥 Platform: {platform}\n"
-                    f"📡 Streamer: {streamer}\n"
-                    f"📌 Objects Detected: {detected_objects}\n"
-                    f"🔍 Confidence: {conf_str}"
-                )
-                if log_entry.detection_image:
-                    for recipient in recipients:
-                        photo_file = BytesIO(log_entry.detection_image)
-                        photo_file.seek(0)
-                        executor.submit(send_telegram_image, photo_file, message, recipient.chat_id, None)
+                return {}
+
+            # Recipients with the same subscriptions get the same digest.
+            groups = {}
+            for recipient in recipients:
+                wanted = tuple(e for e in log_entries if recipient_wants(recipient, e.event_type, platform))
+                if wanted:
+                    groups.setdefault(wanted, []).append(recipient.chat_id)
+
+            futures = {}
+            for wanted, chat_ids in groups.items():
+                if len(wanted) == 1:
+                    message = build_alert_message(wanted[0], platform, streamer)
+                    image_data, image_hash = _alert_image(wanted[0])
                 else:
-                    for recipient in recipients:
-                        executor.submit(send_text_message, message, recipient.chat_id, None)
-
-            elif log_entry.event_type == 'audio_detection':
-                keyword = details.get('keyword', 'N/A')
-                transcript = details.get('transcript', 'No transcript available.')
-                message = (
-                    f"🔊 **Audio Detection Alert**\n"
-                    f"🎥 Platform: {platform}\n"
-                    f"📡 Streamer: {streamer}\n"
-                    f"🔑 Keyword: {keyword}\n"
-                    f"📝 Transcript: {transcript[:300]}..."
-                )
-                for recipient in recipients:
-                    executor.submit(send_text_message, message, recipient.chat_id, None)
-
-            # Modify the chat detection notification message
-            elif log_entry.event_type == 'chat_detection':
-                detections = details.get('detections', [{}])
-                first_detection = detections[0] if detections else {}
-                
-                message = (
-                    f"💬 **Chat Detection Alert**\n"
-                    f"🎥 Platform: {platform}\n"
-                    f"📡 Streamer: {streamer}\n"
-                    f"👤 Sender: {first_detection.get('sender', 'Unknown')}\n"
-                    f"🔍 Keywords: {', '.join(first_detection.get('keywords', []))}\n"
-                    f"📝 Message: {first_detection.get('message', '')[:300]}..."
-                
-                )
-                for recipient in recipients:
-                    executor.submit(send_text_message, message, recipient.chat_id, None)
-
-            elif log_entry.event_type == 'video_notification':
-                msg_detail = details.get('message', 'No additional details.')
-                message = (
-                    f"🎥 **Video Notification**\n"
-                    f"🎥 Platform: {platform}\n"
-                    f"📡 Streamer: {streamer}\n"
-                    f"📝 Message: {msg_detail}"
-                )
-                for recipient in recipients:
-                    executor.submit(send_text_message, message, recipient.chat_id, None)
-
-            else:
-                message = (
-                    f"🔔 **{log_entry.event_type.replace('_', ' ').title()}**\n"
-                    f"🎥 Platform: {platform}\n"
-                    f"📡 Streamer: {streamer}\n"
-                    f"📌 Details: {json.dumps(details, indent=2)[:500]}..."
-                )
-                for recipient in recipients:
-                    executor.submit(send_text_message, message, recipient.chat_id, None)
+                    message = (
+                        f"📋 **Alert Digest: {len(wanted)} alerts**\n"
+                        f"🎥 Platform: {platform}\n"
+                        f"📡 Streamer: {streamer}\n"
+                        + "\n".join(_digest_line(e) for e in wanted)
+                    )
+                    objects = [e for e in wanted if e.event_type == 'object_detection']
+                    best = max(objects, key=lambda e: _top_confidence(e.details or {}) or 0, default=None)
+                    image_data, image_hash = _alert_image(best) if best is not None else (None, None)
+                futures.update(_send_to_chats(message, image_data, image_hash, chat_ids))
+            return futures
     except Exception as e:
-        logging.error(f"Notification error: {str(e)}")
+        logging.error(f"Digest notification error: {str(e)}")
+        return None
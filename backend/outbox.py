@@ -0,0 +1,250 @@
+"""
+Notification outbox dispatcher.
+
+Every notifiable DetectionLog/Log row gets a notification_outbox row in the
+same commit (models.enqueue_notifications). One dispatcher per cluster holds
+the "notification_dispatcher" ServiceLease; it claims due outbox rows in
+batches, sends them through notifications.send_notifications and records
+the outcome per chat (notification_deliveries). A row is sent once every
+recipient chat has it or failed permanently (chat not found, bot blocked);
+otherwise it is rescheduled with exponential backoff and the retry only goes
+to the chats that have not got it. Rows are claimed with a conditional
+update and a claim timeout, so a dispatcher that dies mid-batch only causes
+that batch to be retried (at-least-once, usually exactly once per chat).
+
+With NOTIFICATION_DIGEST_WINDOW_SECONDS set, an alert is held for that long
+and then sent together with every other pending alert of the same stream
+(object, audio and chat alerts alike, matched on models.notification_stream_key)
+as one digest message (notifications.send_digest).
+
+Every web worker starts a dispatcher; only the lease holder dispatches. It is
+woken by new-log events on the event bus and otherwise polls every few seconds.
+"""
+import os
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import wait
+
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+
+from config import app
+from extensions import db
+from models import NotificationOutbox, NotificationDelivery, ServiceLease
+from events import subscribe
+from db_writer import insert_behind
+from notifications import send_notifications, send_digest
+from telegram_dispatcher import PERMANENT_ERRORS
+
+DISPATCHER_LEASE = "notification_dispatcher"
+LEASE_TTL_SECONDS = 30
+POLL_SECONDS = 5
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 10
+SEND_TIMEOUT_SECONDS = 60
+DIGEST_WINDOW_SECONDS = float(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "0"))
+
+
+def _outcome(future):
+    """(status, error) for a finished send, or None if it failed transiently and should be retried."""
+    error = future.exception()
+    if error is not None:
+        return ("failed", str(error)) if isinstance(error, PERMANENT_ERRORS) else None
+    return ("sent", None) if future.result() is not None else None
+
+
+class OutboxDispatcher:
+    """Delivers notification_outbox rows while holding the dispatcher lease."""
+
+    def __init__(self, owner=None, batch_size=BATCH_SIZE, poll_seconds=POLL_SECONDS, lease_ttl=LEASE_TTL_SECONDS,
+                 digest_window=DIGEST_WINDOW_SECONDS):
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.digest_window = digest_window
+        self.poll_seconds = poll_seconds
+        self.lease_ttl = lease_ttl
+        self.wake = threading.Event()
+        self.in_flight = set()  # (outbox row id, chat_id) sends still running after SEND_TIMEOUT_SECONDS
+        self.in_flight_lock = threading.Lock()
+
+    def _now(self):
+        return datetime.now(timezone.utc)
+
+    def acquire_lease(self):
+        """Take or renew the dispatcher lease. Returns True if this process holds it."""
+        now = self._now()
+        expires_at = now + timedelta(seconds=self.lease_ttl)
+        if not ServiceLease.query.filter_by(name=DISPATCHER_LEASE).first():
+            db.session.add(ServiceLease(name=DISPATCHER_LEASE, owner=self.owner, expires_at=expires_at))
+            try:
+                db.session.commit()
+                return True
+            except IntegrityError:
+                # Another process created the lease concurrently.
+                db.session.rollback()
+        # Conditional update so two processes cannot both take an expired lease.
+        held = ServiceLease.query.filter(
+            ServiceLease.name == DISPATCHER_LEASE,
+            or_(ServiceLease.owner == self.owner, ServiceLease.expires_at < now)
+        ).update({"owner": self.owner, "expires_at": expires_at}, synchronize_session=False)
+        db.session.commit()
+        return held > 0
+
+    def claim_batch(self):
+        """
+        Mark up to batch_size due rows (or rows of a dead claimer) as sending by
+        this dispatcher. In digest mode a row is due once it has waited for the
+        window, and brings along every pending first-attempt row of its stream.
+        """
+        now = self._now()
+        due = or_(
+            and_(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now),
+            and_(NotificationOutbox.status == "sending", NotificationOutbox.claimed_until < now)
+        )
+        if self.digest_window:
+            due = and_(due, NotificationOutbox.created_at <= now - timedelta(seconds=self.digest_window))
+        rows = db.session.query(NotificationOutbox.id, NotificationOutbox.stream_key).filter(due).order_by(
+            NotificationOutbox.id
+        ).limit(self.batch_size).all()
+        if not rows:
+            return []
+        ids = [row_id for row_id, _ in rows]
+        if self.digest_window:
+            streams = {stream_key for _, stream_key in rows if stream_key}
+            companions = and_(
+                NotificationOutbox.status == "pending", NotificationOutbox.attempts == 0,
+                NotificationOutbox.stream_key.in_(streams)
+            )
+            ids += [row_id for (row_id,) in db.session.query(NotificationOutbox.id).filter(companions)]
+            due = or_(due, companions)
+        NotificationOutbox.query.filter(NotificationOutbox.id.in_(ids), due).update({
+            "status": "sending",
+            "claimed_by": self.owner,
+            "claimed_until": now + timedelta(seconds=self.lease_ttl + SEND_TIMEOUT_SECONDS),
+        }, synchronize_session=False)
+        db.session.commit()
+        return NotificationOutbox.query.filter(
+            NotificationOutbox.id.in_(ids), NotificationOutbox.claimed_by == self.owner,
+            NotificationOutbox.status == "sending"
+        ).all()
+
+    def deliver(self, rows):
+        """
+        Send one message (or one digest, for several first-attempt rows of a stream) and record the
+        outcome per chat. Chats that already have the alert, or are still being sent it, are skipped.
+        """
+        entries = [row.detection_log or row.log for row in rows]
+        entries = [entry for entry in entries if entry is not None]
+        if not entries:
+            # The logs were deleted before they could be sent.
+            for row in rows:
+                row.status = "sent"
+            return
+        row_ids = [row.id for row in rows]
+        if len(entries) == 1:
+            delivered = {delivery.chat_id for delivery in rows[0].deliveries}
+            with self.in_flight_lock:
+                sending = {chat_id for row_id, chat_id in self.in_flight if row_id == rows[0].id}
+            futures = send_notifications(entries[0], skip_chats=delivered | sending)
+        else:
+            sending = set()
+            futures = send_digest(entries)
+
+        error = None
+        if futures is None:
+            error = "Notification could not be built"
+        else:
+            wait(list(futures.values()), timeout=SEND_TIMEOUT_SECONDS)
+            undelivered = len(sending)
+            for chat_id, future in futures.items():
+                if not future.done():
+                    # Still queued in the Telegram dispatcher: record it when it finishes, and keep
+                    # retries away from this chat until then.
+                    undelivered += 1
+                    with self.in_flight_lock:
+                        self.in_flight.update((row_id, chat_id) for row_id in row_ids)
+                    future.add_done_callback(lambda f, chat_id=chat_id: self._record_late(row_ids, chat_id, f))
+                    continue
+                outcome = _outcome(future)
+                if outcome is None:
+                    undelivered += 1
+                    continue
+                status, chat_error = outcome
+                for row in rows:
+                    row.deliveries.append(NotificationDelivery(chat_id=chat_id, status=status, error=chat_error))
+            if undelivered:
+                error = f"{undelivered} of {len(futures) + len(sending)} chats not delivered"
+
+        for row in rows:
+            row.attempts += 1
+            row.claimed_by = None
+            row.claimed_until = None
+            if error is None:
+                row.status = "sent"
+                row.sent_at = self._now()
+            elif row.attempts >= MAX_ATTEMPTS:
+                row.status = "failed"
+                row.last_error = error
+                logging.error("Giving up on notification outbox row %s: %s", row.id, error)
+            else:
+                row.status = "pending"
+                row.last_error = error
+                row.next_attempt_at = self._now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (row.attempts - 1))
+
+    def _record_late(self, row_ids, chat_id, future):
+        """Done callback for a send that outlived deliver(); runs on the Telegram dispatcher thread."""
+        with self.in_flight_lock:
+            self.in_flight.difference_update((row_id, chat_id) for row_id in row_ids)
+        outcome = _outcome(future)
+        if outcome is None:
+            return
+        status, error = outcome
+        for row_id in row_ids:
+            insert_behind(NotificationDelivery(outbox_id=row_id, chat_id=chat_id, status=status, error=error))
+
+    def _groups(self, rows):
+        if not self.digest_window:
+            return [[row] for row in rows]
+        groups = {}
+        for row in rows:
+            # Retries go out on their own, to the chats that have not got them yet.
+            key = row.stream_key if row.stream_key and row.attempts == 0 else f"row:{row.id}"
+            groups.setdefault(key, []).append(row)
+        return list(groups.values())
+
+    def dispatch_once(self):
+        """Deliver claimed batches until none are due. Returns the number of rows handled."""
+        handled = 0
+        with app.app_context():
+            # Renew the lease before every batch; stop if another process has taken it over.
+            while self.acquire_lease():
+                rows = self.claim_batch()
+                if not rows:
+                    break
+                for group in self._groups(rows):
+                    self.deliver(group)
+                db.session.commit()
+                handled += len(rows)
+        return handled
+
+    def run(self):
+        subscribe("notification_created", lambda payload: self.wake.set())
+        subscribe("log_created", lambda payload: self.wake.set())
+        while True:
+            try:
+                self.dispatch_once()
+            except Exception as e:
+                logging.error("Notification dispatcher error: %s", e)
+                with app.app_context():
+                    db.session.rollback()
+            self.wake.wait(self.poll_seconds)
+            self.wake.clear()
+
+
+def start_notification_dispatcher():
+    dispatcher = OutboxDispatcher()
+    threading.Thread(target=dispatcher.run, name="notification-dispatcher", daemon=True).start()
+    return dispatcher
@@ -0,0 +1,160 @@
+"""
+Response cache for the polled dashboard endpoints.
+
+/api/dashboard, /api/streams, /api/agents and /api/agent/dashboard are
+polled by every open admin panel and rebuilt from joined queries each time.
+Their payloads are cached in Redis (the Flask-Caching `cache` from
+config.py) under a key built from the endpoint, the caller's role (and id,
+for agents) and the query string, so all workers share one copy.
+
+Each cached entry belongs to one or more scopes ("streams", "agents"). A
+scope has a generation counter stored next to the entries. Any commit that
+touches a Stream, Assignment or User row publishes streams_changed /
+agents_changed (events.track_model_changes), and every process bumps the
+generation on delivery. Entries of the old generation are never read again
+and age out through their TTL.
+
+When Redis cannot be reached, entries go to a small in-process LRU instead
+and Redis is retried every REDIS_RETRY_SECONDS. The LRU is per worker and
+keeps its own generations, bumped by the same events. stats() reports hits,
+misses and the hit rate per endpoint.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+
+from config import cache
+from events import subscribe
+
+RESPONSE_TTL_SECONDS = 30
+LOCAL_CACHE_SIZE = 256
+REDIS_RETRY_SECONDS = 30
+SCOPES = ("streams", "agents")
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=LOCAL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # Key: cache key, Value: (expires_at, value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+class ResponseCache:
+    def __init__(self, ttl=RESPONSE_TTL_SECONDS):
+        self.ttl = ttl
+        self.local = LRUCache()
+        self.redis_down_until = 0.0
+        self.lock = threading.Lock()
+        self.metrics = defaultdict(lambda: {"hits": 0, "misses": 0})  # Key: endpoint name
+        self.backend_errors = 0
+        self.invalidations = defaultdict(int)  # Key: scope; also the local generation
+
+    def _use_redis(self):
+        return time.monotonic() >= self.redis_down_until
+
+    def _redis_failed(self, e):
+        with self.lock:
+            self.backend_errors += 1
+            if self._use_redis():
+                logging.warning("Response cache falling back to in-process LRU: %s", e)
+            self.redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _versioned_key(self, key, scopes):
+        generations = cache.get_many(*[f"response_cache:gen:{scope}" for scope in scopes])
+        version = ".".join(str(generation or 0) for generation in generations)
+        return f"response_cache:{key}:{version}"
+
+    def get_or_compute(self, name, key, scopes, compute):
+        """
+        Return the cached payload for key, or compute(), cache and return it.
+        The payload must be JSON-serializable.
+        """
+        value = None
+        redis_key = None
+        if self._use_redis():
+            try:
+                redis_key = self._versioned_key(f"{name}:{key}", scopes)
+                value = cache.get(redis_key)
+            except Exception as e:
+                self._redis_failed(e)
+                redis_key = None
+        if redis_key is None:
+            with self.lock:
+                version = ".".join(str(self.invalidations[scope]) for scope in scopes)
+            local_key = f"{name}:{key}:{version}"
+            value = self.local.get(local_key)
+        with self.lock:
+            self.metrics[name]["hits" if value is not None else "misses"] += 1
+        if value is not None:
+            return value
+
+        value = compute()
+        if redis_key is not None:
+            try:
+                cache.set(redis_key, value, timeout=self.ttl)
+            except Exception as e:
+                self._redis_failed(e)
+        else:
+            # Keyed by the generation read before compute(), so a payload computed across an
+            # invalidation is stored under the old generation and never served.
+            self.local.set(local_key, value, self.ttl)
+        return value
+
+    def invalidate(self, scope):
+        with self.lock:
+            self.invalidations[scope] += 1
+        if self._use_redis():
+            try:
+                # Flask-Caching's Cache has no inc(); the cachelib backend's is an atomic INCR.
+                generation = cache.cache.inc(f"response_cache:gen:{scope}")
+                if generation is None:
+                    raise RuntimeError(f"generation for {scope} was not bumped")
+            except Exception as e:
+                self._redis_failed(e)
+
+    def stats(self):
+        with self.lock:
+            endpoints = {}
+            for name, counts in self.metrics.items():
+                total = counts["hits"] + counts["misses"]
+                endpoints[name] = {**counts, "hit_rate": counts["hits"] / total if total else 0.0}
+            hits = sum(counts["hits"] for counts in self.metrics.values())
+            total = hits + sum(counts["misses"] for counts in self.metrics.values())
+            return {
+                "backend": "redis" if self._use_redis() else "local",
+                "hit_rate": hits / total if total else 0.0,
+                "endpoints": endpoints,
+                "invalidations": dict(self.invalidations),
+                "backend_errors": self.backend_errors,
+            }
+
+
+response_cache = ResponseCache()
+for _scope in SCOPES:
+    subscribe(f"{_scope}_changed", lambda payload, scope=_scope: response_cache.invalidate(scope))
+
+
+def cached_response(name, key, scopes, compute):
+    """get_or_compute on the process-wide response cache."""
+    return response_cache.get_or_compute(name, key, scopes, compute)
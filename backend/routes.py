@@ -1,47 +1,43 @@
+# Web workers never run detection: ML and media libraries (ultralytics, whisper, cv2, av,
+# pytesseract, ...) are only imported by detection.py in the supervisor process. Keep it that
+# way; check_import_time.py checks the import time of this module against a budget.
+import os
 import time
-import cv2
 import re
 import threading
 import logging
-import numpy as np
 import json
 import base64
-import subprocess
-from datetime import datetime, timedelta
-import av  # PyAV for handling HLS streams
-from ultralytics import YOLO
+from datetime import datetime, timedelta, timezone
 from flask import Flask, request, jsonify, session, send_from_directory, current_app, Response
 import requests
-import whisper
-from PIL import Image
-import pytesseract
-from io import BytesIO
-from urllib.parse import urlparse
-from bs4 import BeautifulSoup
-from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, or_, select, union_all, literal, null, case
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import joinedload, defer
 from config import app
 from extensions import db
 from models import (
     User, Stream, Assignment, Log, ChatKeyword, FlaggedObject, 
-    TelegramRecipient, ChaturbateStream, StripchatStream, DetectionLog, ChatMessage
+    TelegramRecipient, ChaturbateStream, StripchatStream, DetectionLog, ChatMessage, StreamLease
 )
 from utils import allowed_file, login_required
-from notifications import send_notifications
+from image_store import is_valid_hash, image_path, image_url
+from events import publish, agent_room, ADMIN_ROOM
+from response_cache import cached_response, response_cache
+from stream_cache import get_stream_info, stream_cache
 from scraping import (
     scrape_stripchat_data, scrape_chaturbate_data, run_scrape_job, scrape_jobs,
-    stream_creation_jobs, run_stream_creation_job, refresh_chaturbate_stream, refresh_stripchat_stream
+    stream_creation_jobs, run_stream_creation_job, refresh_chaturbate_stream, refresh_stripchat_stream,
+    fetch_chaturbate_chat_history
 )
-from detection import chat_detection_loop, refresh_keywords
-import speech_recognition as sr
+from supervisor import request_start, request_stop, detection_status
 from werkzeug.utils import secure_filename
 from threading import Condition
 import queue
 import uuid
 from datetime import datetime
 
-# Global dictionary to store detection threads and their cancellation events keyed by stream_url.
-detection_threads = {}
-
 # --------------------------------------------------------------------
 # Authentication Endpoints
 # --------------------------------------------------------------------
@@ -79,8 +75,9 @@ def check_session():
 @app.route("/api/agents", methods=["GET"])
 @login_required(role="admin")
 def get_agents():
-    agents = User.query.filter_by(role="agent").all()
-    return jsonify([agent.serialize() for agent in agents])
+    def build():
+        return [agent.serialize() for agent in User.query.filter_by(role="agent").all()]
+    return jsonify(cached_response("agents", "admin", ("agents",), build))
 
 @app.route("/api/agents", methods=["POST"])
 @login_required(role="admin")
@@ -140,20 +137,25 @@ def delete_agent(agent_id):
 def get_streams():
     platform = request.args.get("platform", "").strip().lower()
     streamer = request.args.get("streamer", "").strip().lower()
-    if platform == "chaturbate":
-        streams = ChaturbateStream.query.options(
-            joinedload(ChaturbateStream.assignments).joinedload(Assignment.agent)
-        ).filter(ChaturbateStream.streamer_username.ilike(f"%{streamer}%")).all()
-    elif platform == "stripchat":
-        streams = StripchatStream.query.options(
-            joinedload(StripchatStream.assignments).joinedload(Assignment.agent)
-        ).filter(StripchatStream.streamer_username.ilike(f"%{streamer}%")).all()
-    else:
-        # Updated with eager loading
-        streams = Stream.query.options(
-            joinedload(Stream.assignments).joinedload(Assignment.agent)
-        ).all()
-    return jsonify([stream.serialize() for stream in streams])
+
+    def build():
+        if platform == "chaturbate":
+            streams = ChaturbateStream.query.options(
+                joinedload(ChaturbateStream.assignments).joinedload(Assignment.agent)
+            ).filter(ChaturbateStream.streamer_username.ilike(f"%{streamer}%")).all()
+        elif platform == "stripchat":
+            streams = StripchatStream.query.options(
+                joinedload(StripchatStream.assignments).joinedload(Assignment.agent)
+            ).filter(StripchatStream.streamer_username.ilike(f"%{streamer}%")).all()
+        else:
+            # Updated with eager loading
+            streams = Stream.query.options(
+                joinedload(Stream.assignments).joinedload(Assignment.agent)
+            ).all()
+        return [stream.serialize() for stream in streams]
+
+    key = f"admin:{platform}:{streamer}" if platform in ("chaturbate", "stripchat") else "admin"
+    return jsonify(cached_response("streams", key, ("streams", "agents"), build))
 
 @app.route("/api/streams", methods=["POST"])
 @login_required(role="admin")
@@ -218,7 +220,7 @@ def create_stream():
     try:
         from models import TelegramRecipient
         from notifications import send_text_message
-        # Using the executor already configured in notifications module.
+        # Queued on the shared Telegram dispatcher; this does not wait for delivery.
         with app.app_context():
             recipients = TelegramRecipient.query.all()
             alert_message = (
@@ -228,7 +230,7 @@ def create_stream():
                 f"Room URL: {room_url}"
             )
             for recipient in recipients:
-                executor.submit(send_text_message, alert_message, recipient.chat_id, None)
+                send_text_message(alert_message, recipient.chat_id)
     except Exception as e:
         logging.error("Error sending Telegram alert for stream creation: %s", e)
 
@@ -495,7 +497,6 @@ def create_keyword():
     kw = ChatKeyword(keyword=keyword)
     db.session.add(kw)
     db.session.commit()
-    refresh_keywords()
     return jsonify({"message": "Keyword added", "keyword": kw.serialize()}), 201
 
 @app.route("/api/keywords/<int:keyword_id>", methods=["PUT"])
@@ -510,7 +511,6 @@ def update_keyword(keyword_id):
         return jsonify({"message": "New keyword required"}), 400
     kw.keyword = new_kw
     db.session.commit()
-    refresh_keywords()
     return jsonify({"message": "Keyword updated", "keyword": kw.serialize()})
 
 @app.route("/api/keywords/<int:keyword_id>", methods=["DELETE"])
@@ -521,7 +521,6 @@ def delete_keyword(keyword_id):
         return jsonify({"message": "Keyword not found"}), 404
     db.session.delete(kw)
     db.session.commit()
-    refresh_keywords()
     return jsonify({"message": "Keyword deleted"})
 
 @app.route("/api/objects", methods=["GET"])
@@ -584,11 +583,41 @@ def create_telegram_recipient():
         return jsonify({"message": "Telegram username and chat_id required"}), 400
     if TelegramRecipient.query.filter_by(telegram_username=username).first():
         return jsonify({"message": "Recipient exists"}), 400
-    recipient = TelegramRecipient(telegram_username=username, chat_id=chat_id)
+    filters, error = parse_recipient_filters(data)
+    if error:
+        return jsonify({"message": error}), 400
+    recipient = TelegramRecipient(telegram_username=username, chat_id=chat_id, **filters)
     db.session.add(recipient)
     db.session.commit()
     return jsonify({"message": "Recipient added", "recipient": recipient.serialize()}), 201
 
+
+def parse_recipient_filters(data):
+    """Read the optional event_types / platforms subscription lists from a request body."""
+    filters = {}
+    for field in ("event_types", "platforms"):
+        if field in data:
+            value = data[field]
+            if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+                return None, f"{field} must be a list of strings or null"
+            filters[field] = value or None
+    return filters, None
+
+
+@app.route("/api/telegram_recipients/<int:recipient_id>", methods=["PUT"])
+@login_required(role="admin")
+def update_telegram_recipient(recipient_id):
+    recipient = TelegramRecipient.query.get(recipient_id)
+    if not recipient:
+        return jsonify({"message": "Recipient not found"}), 404
+    filters, error = parse_recipient_filters(request.get_json() or {})
+    if error:
+        return jsonify({"message": error}), 400
+    for field, value in filters.items():
+        setattr(recipient, field, value)
+    db.session.commit()
+    return jsonify({"message": "Recipient updated", "recipient": recipient.serialize()})
+
 @app.route("/api/telegram_recipients/<int:recipient_id>", methods=["DELETE"])
 @login_required(role="admin")
 def delete_telegram_recipient(recipient_id):
@@ -599,13 +628,26 @@ def delete_telegram_recipient(recipient_id):
     db.session.commit()
     return jsonify({"message": "Recipient deleted"})
 
+@app.route("/api/telegram_stats", methods=["GET"])
+@login_required(role="admin")
+def get_telegram_stats():
+    """Queue and delivery counters of this worker's Telegram dispatcher."""
+    from telegram_dispatcher import get_telegram_dispatcher
+    return jsonify(get_telegram_dispatcher().stats())
+
+@app.route("/api/cache_stats", methods=["GET"])
+@login_required(role="admin")
+def get_cache_stats():
+    """Hit rates of this worker's dashboard response cache and stream metadata cache."""
+    return jsonify({**response_cache.stats(), "stream_metadata": stream_cache.stats()})
+
 # --------------------------------------------------------------------
 # Dashboard Endpoints
 # --------------------------------------------------------------------
 @app.route("/api/dashboard", methods=["GET"])
 @login_required(role="admin")
 def get_dashboard():
-    try:
+    def build():
         streams = Stream.query.options(joinedload(Stream.assignments).joinedload(Assignment.agent)).all()
         data = []
         for stream in streams:
@@ -616,10 +658,13 @@ def get_dashboard():
                 "confidence": 0.8
             }
             data.append(stream_data)
-        return jsonify({
+        return {
             "ongoing_streams": len(data),
             "streams": data
-        }), 200
+        }
+
+    try:
+        return jsonify(cached_response("dashboard", "admin", ("streams", "agents"), build)), 200
     except Exception as e:
         app.logger.error("Error in /api/dashboard: %s", e)
         return jsonify({"message": "Error fetching dashboard data", "error": str(e)}), 500
@@ -628,17 +673,28 @@ def get_dashboard():
 @login_required(role="agent")
 def get_agent_dashboard():
     agent_id = session["user_id"]
-    assignments = Assignment.query.filter_by(agent_id=agent_id).all()
-    return jsonify({
-        "ongoing_streams": len(assignments),
-        "assignments": [a.stream.serialize() for a in assignments if a.stream]
-    })
+
+    def build():
+        assignments = Assignment.query.filter_by(agent_id=agent_id).all()
+        return {
+            "ongoing_streams": len(assignments),
+            "assignments": [a.stream.serialize() for a in assignments if a.stream]
+        }
+
+    return jsonify(cached_response("agent_dashboard", f"agent:{agent_id}", ("streams", "agents"), build))
 
 # --------------------------------------------------------------------
 # Detection and Notification Endpoints
 # --------------------------------------------------------------------
 @app.route("/detection-images/<filename>")
 def serve_detection_image(filename):
+    image_hash = filename.rsplit(".", 1)[0]
+    if is_valid_hash(image_hash):
+        # Content-addressed files never change: stream straight from disk and let clients cache forever.
+        return send_from_directory(
+            os.path.dirname(image_path(image_hash)), f"{image_hash}.jpg",
+            mimetype="image/jpeg", conditional=True, max_age=31536000
+        )
     return send_from_directory("detections", filename)
 
 @app.route("/api/detect", methods=["POST"])
@@ -649,6 +705,7 @@ def unified_detect():
     audio_flag = None
     visual_results = []
     if visual_frame:
+        import numpy as np
         visual_results = detect_frame(np.array(visual_frame))
     chat_results = detect_chat(text)
     return jsonify({
@@ -695,50 +752,38 @@ def trigger_detection():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    # Detection workers live in the supervisor process (supervisor.py), shared by all web workers.
+    # Admission control decides whether the stream runs at full rate, degraded, or waits in a queue.
     try:
-        from detection import process_combined_detection, chat_detection_loop
-    except ImportError as e:
-        return jsonify({"error": f"Detection module not available: {str(e)}"}), 500
-
-    if stream_url in detection_threads:
-        return jsonify({"message": "Detection already running for this stream"}), 200
-
-    cancel_event = threading.Event()
-    unified_thread = threading.Thread(
-        target=process_combined_detection,
-        args=(stream_url, cancel_event),
-        daemon=True
-    )
-    unified_thread.start()
-    chat_thread = threading.Thread(
-        target=chat_detection_loop,
-        args=(stream_url, cancel_event, 60),
-        daemon=True
-    )
-    chat_thread.start()
-    detection_threads[stream_url] = (unified_thread, chat_thread, cancel_event)
-
-    return jsonify({"message": "Detection started"}), 200
+        status = detection_status(stream_url)
+        if status == "active":
+            return jsonify({"message": "Detection already running for this stream", "status": status}), 200
+        if status == "queued":
+            return jsonify({"message": "Detection already queued until capacity is available", "status": status}), 202
+        admission = request_start(stream_url)
+    except Exception as e:
+        logging.error("Error contacting detection supervisor: %s", e)
+        return jsonify({"error": "Detection supervisor unavailable"}), 503
+
+    if admission["decision"] == "existing":
+        if admission["status"] == "queued":
+            return jsonify({"message": "Detection already queued until capacity is available", **admission}), 202
+        return jsonify({"message": "Detection already running for this stream", **admission}), 200
+    if admission["decision"] == "queued":
+        return jsonify({"message": "Detection queued until capacity is available", **admission}), 202
+    if admission["decision"] == "degraded":
+        return jsonify({"message": f"Detection started in {admission['mode']} mode due to load", **admission}), 200
+    return jsonify({"message": "Detection started", **admission}), 200
 
 @app.route("/api/detect-advanced", methods=["POST"])
 def advanced_detect():
     try:
         if "detections" in data:
-            # Updated stream query with eager loading
-            stream = Stream.query.options(
-                joinedload(Stream.assignments).joinedload(Assignment.agent)
-            ).filter_by(room_url=stream_url).first()
-            
-            platform = stream.type if stream else "unknown"
-            streamer_name = stream.streamer_username if stream else "unknown"
-            
-            # Get first valid assigned agent
-            assigned_agent = "Unassigned"
-            if stream and stream.assignments:
-                for assignment in stream.assignments:
-                    if assignment.agent:
-                        assigned_agent = assignment.agent.username
-                        break  # Use first valid assignment
+            # Stream, platform and first valid assigned agent from the stream metadata cache
+            stream = get_stream_info(stream_url)
+            platform = stream.platform if stream else "unknown"
+            streamer_name = stream.streamer_name if stream else "unknown"
+            assigned_agent = stream.agent if stream and stream.agent else "Unassigned"
 
             log_entry = Log(
                 room_url=stream_url,
@@ -788,14 +833,14 @@ def advanced_detect():
                         })
 
                 if detected:
-                    stream = Stream.query.filter_by(room_url=room_url).first()
+                    stream = get_stream_info(room_url)
                     log_entry = DetectionLog(
                         room_url=room_url,
                         event_type="chat_detection",
                         details={
                             "detections": detected,
                             "platform": "Chaturbate",
-                            "streamer_name": stream.streamer_username if stream else "Unknown"
+                            "streamer_name": stream.streamer_name if stream else "Unknown"
                         }
                     )
                     db.session.add(log_entry)
@@ -835,7 +880,6 @@ def advanced_detect():
                 return jsonify({"error": "Invalid event type"}), 400
             db.session.add(log_entry)
             db.session.commit()
-            send_notifications(log_entry)
             return jsonify({"message": "JSON-based detection logged"}), 201
         if "keyword" in data:
             keyword = data.get("keyword")
@@ -853,7 +897,6 @@ def advanced_detect():
             )
             db.session.add(log_entry)
             db.session.commit()
-            send_notifications(log_entry, {"keyword": keyword})
             return jsonify({"message": "Keyword detection logged successfully"}), 201
         if "detections" in data:
             stream_url = data.get("stream_url")
@@ -863,12 +906,10 @@ def advanced_detect():
             timestamp = data.get("timestamp")
             if not stream_url or not detections:
                 return jsonify({"message": "Missing required fields"}), 400
-            stream = Stream.query.filter_by(room_url=stream_url).first()
-            platform = stream.type if stream else "unknown"
-            streamer_name = stream.streamer_username if stream else "unknown"
-            assigned_agent = "Unassigned"
-            if stream and stream.assignments and len(stream.assignments) > 0 and stream.assignments[0].agent:
-                assigned_agent = stream.assignments[0].agent.username
+            stream = get_stream_info(stream_url)
+            platform = stream.platform if stream else "unknown"
+            streamer_name = stream.streamer_name if stream else "unknown"
+            assigned_agent = stream.agent if stream and stream.agent else "Unassigned"
             log_entry = Log(
                 room_url=stream_url,
                 event_type="object_detection",
@@ -884,7 +925,6 @@ def advanced_detect():
             )
             db.session.add(log_entry)
             db.session.commit()
-            send_notifications(log_entry)
             return jsonify({
                 "message": "Object detection logged",
                 "detections": detections
@@ -899,14 +939,33 @@ def stop_detection_route():
     stream_url = data.get("stream_url")
     if not stream_url:
         return jsonify({"error": "Missing stream_url"}), 400
-    if stream_url not in detection_threads:
-        return jsonify({"message": "No detection running for this stream"}), 404
-    threads, chat_thread, cancel_event = detection_threads.pop(stream_url)
-    cancel_event.set()
-    threads.join(timeout=5)
-    chat_thread.join(timeout=5)
+    try:
+        if detection_status(stream_url) is None:
+            return jsonify({"message": "No detection running for this stream"}), 404
+        request_stop(stream_url)
+    except Exception as e:
+        logging.error("Error contacting detection supervisor: %s", e)
+        return jsonify({"error": "Detection supervisor unavailable"}), 503
     return jsonify({"message": "Detection stopped"}), 200
 
+@app.route("/api/detection/priority", methods=["PUT"])
+@login_required(role="admin")
+def set_detection_priority():
+    data = request.get_json() or {}
+    stream_url = data.get("stream_url")
+    try:
+        weight = float(data.get("weight", 1.0))
+    except (TypeError, ValueError):
+        return jsonify({"message": "Weight must be a number"}), 400
+    if not stream_url or weight <= 0:
+        return jsonify({"message": "stream_url and a positive weight are required"}), 400
+    lease = StreamLease.query.filter_by(stream_url=stream_url).first()
+    if not lease:
+        return jsonify({"message": "No detection requested for this stream"}), 404
+    lease.priority = weight
+    db.session.commit()
+    return jsonify({"message": "Priority updated", "lease": lease.serialize()}), 200
+
 # --------------------------------------------------------------------
 # Health Check
 # --------------------------------------------------------------------
@@ -914,50 +973,289 @@ def stop_detection_route():
 def health():
     return "OK", 200
 
+LOG_PAGE_SIZE = 100
+LOG_PAGE_SIZE_MAX = 500
+# Rows of both tables are merged newest first; on equal timestamps detections sort before logs.
+LOG_SOURCES = {"log": (0, Log), "detection": (1, DetectionLog)}
+
+
+class without_media(FunctionElement):
+    """details JSON minus the inline base64 images some rows carry (DetectionLog.MEDIA_FIELDS)."""
+    type = db.JSON()
+    inherit_cache = True
+
+
+@compiles(without_media)
+def _compile_without_media(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(without_media, "sqlite")
+def _compile_without_media_sqlite(element, compiler, **kw):
+    paths = ", ".join(f"'$.{field}'" for field in DetectionLog.MEDIA_FIELDS)
+    return f"json_remove({compiler.process(element.clauses, **kw)}, {paths})"
+
+
+@compiles(without_media, "postgresql")
+def _compile_without_media_postgresql(element, compiler, **kw):
+    fields = " - ".join(f"'{field}'" for field in DetectionLog.MEDIA_FIELDS)
+    return f"(CAST({compiler.process(element.clauses, **kw)} AS JSONB) - {fields})"
+
+
+def encode_log_cursor(timestamp, source, row_id):
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{source}|{row_id}".encode()).decode()
+
+
+def decode_log_cursor(cursor):
+    timestamp, source, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    if source not in LOG_SOURCES:
+        raise ValueError(f"Unknown log source {source}")
+    return datetime.fromisoformat(timestamp), source, int(row_id)
+
+
+def log_branch(source, args, cursor, limit):
+    """
+    One side of the /api/logs UNION ALL: the newest `limit` rows of one table
+    after the cursor, as (source, id, timestamp, ...) without image data;
+    has_<field> flags which inline images were stripped from details.
+    Ordered and limited on its own so each side is a short index scan.
+    """
+    rank, model = LOG_SOURCES[source]
+    query = select(
+        literal(source).label("source"),
+        model.id.label("id"),
+        model.timestamp.label("timestamp"),
+        model.room_url.label("room_url"),
+        model.event_type.label("event_type"),
+        model.read.label("read"),
+        without_media(model.details).label("details"),
+        (model.image_hash if model is DetectionLog else null()).label("image_hash"),
+        *[
+            (model.details[field].as_string().isnot(None) if model is DetectionLog else null()).label(f"has_{field}")
+            for field in DetectionLog.MEDIA_FIELDS
+        ],
+    )
+    if args.get("event_type"):
+        query = query.where(model.event_type == args["event_type"])
+    if args.get("read") in ("true", "false"):
+        query = query.where(model.read.is_(args["read"] == "true"))
+    if args.get("room_url"):
+        query = query.where(model.room_url == args["room_url"])
+    if cursor:
+        timestamp, cursor_source, row_id = cursor
+        cursor_rank = LOG_SOURCES[cursor_source][0]
+        if rank < cursor_rank:
+            query = query.where(model.timestamp <= timestamp)
+        elif rank == cursor_rank:
+            query = query.where(or_(model.timestamp < timestamp, and_(model.timestamp == timestamp, model.id < row_id)))
+        else:
+            query = query.where(model.timestamp < timestamp)
+    return query.order_by(model.timestamp.desc(), model.id.desc()).limit(limit).subquery()
+
+
+def log_row_details(row):
+    """details of a merged log row, with media URLs for the inline images the query stripped."""
+    details = dict(row.details or {})
+    details.update(DetectionLog.media_details(
+        row.id, [field for field in DetectionLog.MEDIA_FIELDS if getattr(row, f"has_{field}")]
+    ))
+    return details
+
+
 @app.route("/api/logs", methods=["GET"])
 @login_required(role="admin")
 def get_logs():
+    """
+    Newest-first page of Log and DetectionLog rows merged by one UNION ALL
+    query, keyset-paginated on (timestamp, source, id). Optional filters:
+    source (log or detection), event_type, read, room_url. Pass the
+    X-Next-Cursor response header back as ?cursor= for the next page.
+    """
     try:
-        # Retrieve logs from both Log and DetectionLog tables.
-        logs1 = Log.query.order_by(Log.timestamp.desc()).limit(100).all()
-        logs2 = DetectionLog.query.order_by(DetectionLog.timestamp.desc()).limit(100).all()
-        all_logs = logs1 + logs2
-        # Sort combined logs by timestamp descending.
-        all_logs.sort(key=lambda x: x.timestamp, reverse=True)
-        # Limit to 100 most recent entries.
-        recent_logs = all_logs[:100]
-        return jsonify([{
-            "id": log.id,
-            "event_type": log.event_type,
-            "timestamp": log.timestamp.isoformat(),
-            "details": log.details,
-            "read": log.read
-        } for log in recent_logs])
+        limit = max(1, min(request.args.get("limit", LOG_PAGE_SIZE, type=int), LOG_PAGE_SIZE_MAX))
+        cursor = None
+        if request.args.get("cursor"):
+            try:
+                cursor = decode_log_cursor(request.args["cursor"])
+            except ValueError:
+                return jsonify({"message": "Invalid cursor"}), 400
+        sources = [request.args["source"]] if request.args.get("source") in LOG_SOURCES else list(LOG_SOURCES)
+        branches = [select(log_branch(source, request.args, cursor, limit + 1)) for source in sources]
+        merged = (union_all(*branches) if len(branches) > 1 else branches[0]).subquery()
+        rank = case({source: rank for source, (rank, _) in LOG_SOURCES.items()}, value=merged.c.source)
+        rows = db.session.execute(
+            select(merged).order_by(merged.c.timestamp.desc(), rank.desc(), merged.c.id.desc()).limit(limit + 1)
+        ).all()
+        page = []
+        for row in rows[:limit]:
+            details = log_row_details(row)
+            page.append({
+                "id": row.id,
+                "source": row.source,
+                "event_type": row.event_type,
+                "timestamp": row.timestamp.isoformat(),
+                "room_url": row.room_url,
+                "details": details,
+                "image_url": image_url(row.image_hash) or details.get("image_url"),
+                "read": row.read
+            })
+        response = jsonify(page)
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            response.headers["X-Next-Cursor"] = encode_log_cursor(last.timestamp, last.source, last.id)
+        return response
     except Exception as e:
         app.logger.error("Error in /api/logs: %s", e)
         return jsonify({"message": "Error fetching dashboard data", "error": str(e)}), 500
 
 
 # Add these endpoints for notifications
+NOTIFICATION_PAGE_SIZE = 50
+NOTIFICATION_PAGE_SIZE_MAX = 200
+# The change feed trails the clock by this much. updated_at is stamped before commit, so a
+# transaction can commit a stamp older than one a poll already returned; waiting out the lag
+# before handing out a stamp means such late commits are still ahead of every cursor.
+CHANGES_LAG_SECONDS = 5
+
+
+def encode_cursor(timestamp, row_id):
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(timestamp), int(row_id)
+
+
+def changes_horizon():
+    """Newest updated_at the change feed may return (see CHANGES_LAG_SECONDS)."""
+    return datetime.now(timezone.utc) - timedelta(seconds=CHANGES_LAG_SECONDS)
+
+
+def current_changes_cursor():
+    latest = db.session.query(DetectionLog.updated_at, DetectionLog.id).filter(
+        DetectionLog.updated_at <= changes_horizon()
+    ).order_by(
+        DetectionLog.updated_at.desc(), DetectionLog.id.desc()
+    ).first()
+    return encode_cursor(*latest) if latest and latest[0] else None
+
+
+def filter_notifications(query, args):
+    if args.get("event_type"):
+        query = query.filter(DetectionLog.event_type == args["event_type"])
+    if args.get("read") in ("true", "false"):
+        query = query.filter(DetectionLog.read.is_(args["read"] == "true"))
+    if args.get("room_url"):
+        query = query.filter(DetectionLog.room_url == args["room_url"])
+    if args.get("agent"):
+        query = query.filter(DetectionLog.assigned_agent == args["agent"])
+    return query
+
+
 @app.route("/api/notifications", methods=["GET"])
 @login_required()
 def get_all_notifications():
+    """
+    Newest-first page of notifications, keyset-paginated on (timestamp, id).
+    Optional filters: event_type, read, room_url, agent. Pass the
+    X-Next-Cursor response header back as ?cursor= to fetch the next page.
+    """
     try:
-        notifications = DetectionLog.query.order_by(DetectionLog.timestamp.desc()).all()
-        return jsonify([{
-            "id": n.id,
-            "event_type": n.event_type,
-            "timestamp": n.timestamp.isoformat(),
-            "details": n.details,
-            "read": n.read,
-            "room_url": n.room_url,
-            "streamer": n.details.get('streamer_name', 'Unknown'),
-            "platform": n.details.get('platform', 'Unknown'),
-            "assigned_agent": n.details.get('assigned_agent', 'Unassigned')
-        } for n in notifications]), 200
+        limit = max(1, min(request.args.get("limit", NOTIFICATION_PAGE_SIZE, type=int), NOTIFICATION_PAGE_SIZE_MAX))
+        # Taken before the page is read so nothing changed in between is missed by the delta endpoint.
+        changes_cursor = current_changes_cursor()
+        query = filter_notifications(DetectionLog.query.options(defer(DetectionLog.detection_image)), request.args)
+        if request.args.get("cursor"):
+            try:
+                timestamp, row_id = decode_cursor(request.args["cursor"])
+            except ValueError:
+                return jsonify({"message": "Invalid cursor"}), 400
+            query = query.filter(or_(
+                DetectionLog.timestamp < timestamp,
+                and_(DetectionLog.timestamp == timestamp, DetectionLog.id < row_id)
+            ))
+        rows = query.order_by(DetectionLog.timestamp.desc(), DetectionLog.id.desc()).limit(limit + 1).all()
+        response = jsonify([n.summary() for n in rows[:limit]])
+        if len(rows) > limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[limit - 1].timestamp, rows[limit - 1].id)
+        if changes_cursor:
+            response.headers["X-Changes-Cursor"] = changes_cursor
+        return response, 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+@app.route("/api/notifications/changes", methods=["GET"])
+@login_required()
+def get_notification_changes():
+    """
+    Notifications created or changed (e.g. marked read) after ?since=, a
+    cursor on (updated_at, id) taken from X-Changes-Cursor or a previous
+    response. Takes the same filters as the list. The response carries the
+    cursor for the next poll, and a weak ETag so an unchanged poll is a 304.
+    Changes show up CHANGES_LAG_SECONDS after they are made; live updates
+    come over the socket.
+    """
+    since = request.args.get("since")
+    if not since:
+        return jsonify({"notifications": [], "cursor": current_changes_cursor()}), 200
+    try:
+        updated_at, row_id = decode_cursor(since)
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+    etag = f'W/"{since}"'
+    query = DetectionLog.query.options(defer(DetectionLog.detection_image)).filter(or_(
+        DetectionLog.updated_at > updated_at,
+        and_(DetectionLog.updated_at == updated_at, DetectionLog.id > row_id)
+    ), DetectionLog.updated_at <= changes_horizon())
+    rows = filter_notifications(query, request.args).order_by(
+        DetectionLog.updated_at, DetectionLog.id
+    ).limit(NOTIFICATION_PAGE_SIZE_MAX).all()
+    if not rows and etag in request.headers.get("If-None-Match", ""):
+        return "", 304
+    cursor = encode_cursor(rows[-1].updated_at, rows[-1].id) if rows else since
+    response = jsonify({"notifications": [n.summary() for n in rows], "cursor": cursor})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response, 200
+
+
+@app.route("/api/notifications/<int:notification_id>", methods=["GET"])
+@login_required()
+def get_notification(notification_id):
+    notification = DetectionLog.query.options(defer(DetectionLog.detection_image)).get(notification_id)
+    if not notification:
+        return jsonify({"message": "Notification not found"}), 404
+    return jsonify(notification.summary()), 200
+
+
+@app.route("/api/notifications/<int:notification_id>/media", methods=["GET"])
+@login_required()
+def get_notification_media(notification_id):
+    """Image of one notification: ?kind=annotated (default) or captured."""
+    notification = DetectionLog.query.get(notification_id)
+    if not notification:
+        return jsonify({"message": "Notification not found"}), 404
+    kind = request.args.get("kind", "annotated")
+    if kind == "annotated" and notification.image_hash:
+        return serve_detection_image(f"{notification.image_hash}.jpg")
+    if kind == "annotated" and notification.detection_image:
+        return Response(notification.detection_image, mimetype="image/jpeg")
+    field = {value: key for key, value in DetectionLog.MEDIA_FIELDS.items()}.get(kind)
+    encoded = (notification.details or {}).get(field) if field else None
+    if not encoded:
+        return jsonify({"message": "No media for this notification"}), 404
+    mimetype = "image/png"
+    if encoded.startswith("data:"):
+        header, encoded = encoded.split(",", 1)
+        mimetype = header[5:].split(";")[0]
+    try:
+        return Response(base64.b64decode(encoded), mimetype=mimetype)
+    except ValueError:
+        return jsonify({"message": "Stored media is corrupt"}), 500
+
+
 @app.route("/api/notifications/<int:notification_id>/read", methods=["PUT"])
 @login_required()
 def mark_notification_read(notification_id):
@@ -988,8 +1286,14 @@ def delete_notification(notification_id):
 @login_required()
 def mark_all_notifications_read():
     try:
-        DetectionLog.query.update({"read": True})
+        # Only touch unread rows so updated_at (and the change feed) moves just for real changes.
+        DetectionLog.query.filter(DetectionLog.read.is_(False)).update(
+            {"read": True, "updated_at": datetime.now(timezone.utc)}, synchronize_session=False
+        )
         db.session.commit()
+        # Bulk updates bypass the ORM change tracking in events.py, so announce this one explicitly.
+        agents = [username for (username,) in db.session.query(User.username).filter_by(role="agent")]
+        publish("notifications_read_all", {}, [ADMIN_ROOM] + [agent_room(username) for username in agents])
         return jsonify({"message": "All notifications marked as read"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1000,14 +1304,14 @@ def mark_all_notifications_read():
 @login_required(role="admin")
 def get_forwarded_notifications():
     try:
-        forwarded = DetectionLog.query.filter(
-            DetectionLog.details['assigned_agent'].isnot(None)
+        forwarded = DetectionLog.query.options(defer(DetectionLog.detection_image)).filter(
+            DetectionLog.assigned_agent.isnot(None)
         ).order_by(DetectionLog.timestamp.desc()).limit(100).all()
         
         return jsonify([{
             'id': n.id,
             'timestamp': n.timestamp.isoformat(),
-            'assigned_agent': n.details.get('assigned_agent'),
+            'assigned_agent': n.assigned_agent,
             'platform': n.details.get('platform'),
             'streamer': n.details.get('streamer_name'),
             'status': 'acknowledged' if n.read else 'pending'
@@ -1043,8 +1347,7 @@ def forward_notification(notification_id):
     if notification.event_type == 'object_detection':
         details.update({
             "detections": notification.details.get('detections', []),
-            "annotated_image": base64.b64encode(notification.detection_image).decode('utf-8') 
-                if notification.detection_image else None
+            "annotated_image_url": image_url(notification.image_hash)
         })
     elif notification.event_type == 'chat_detection':
         details.update({
@@ -1120,15 +1423,74 @@ def send_message():
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_PAGE_SIZE_MAX = 200
+
+
+def message_page(query, args):
+    """
+    One page of a ChatMessage query, oldest first, with sender and receiver
+    usernames loaded in the same query. Without a cursor it is the newest
+    `limit` messages; ?before= pages back through history (X-Next-Cursor)
+    and ?after= returns only messages newer than the last one seen
+    (X-Latest-Cursor; a full page means more are waiting for the next poll),
+    so polling costs one page, not the whole conversation.
+    """
+    limit = max(1, min(args.get("limit", MESSAGE_PAGE_SIZE, type=int), MESSAGE_PAGE_SIZE_MAX))
+    query = query.options(
+        joinedload(ChatMessage.sender).load_only(User.id, User.username),
+        joinedload(ChatMessage.receiver).load_only(User.id, User.username),
+    )
+    try:
+        before = decode_cursor(args["before"]) if args.get("before") else None
+        after = decode_cursor(args["after"]) if args.get("after") else None
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+    if after:
+        timestamp, row_id = after
+        rows = query.filter(or_(
+            ChatMessage.timestamp > timestamp, and_(ChatMessage.timestamp == timestamp, ChatMessage.id > row_id)
+        )).order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc()).limit(limit + 1).all()
+        more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        if before:
+            timestamp, row_id = before
+            query = query.filter(or_(
+                ChatMessage.timestamp < timestamp, and_(ChatMessage.timestamp == timestamp, ChatMessage.id < row_id)
+            ))
+        rows = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(limit + 1).all()
+        more = len(rows) > limit
+        rows = rows[:limit][::-1]
+    response = jsonify([message.serialize() for message in rows])
+    if rows:
+        if more and not after:
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[0].timestamp, rows[0].id)
+        response.headers["X-Latest-Cursor"] = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    elif after:
+        response.headers["X-Latest-Cursor"] = args["after"]
+    return response
+
+
 @app.route("/api/messages/<int:receiver_id>", methods=["GET"])
 @login_required()
 def get_messages(receiver_id):
+    """Paged conversation between the current user and receiver_id (see message_page)."""
     user_id = session["user_id"]
-    messages = ChatMessage.query.filter(
+    query = ChatMessage.query.filter(
         ((ChatMessage.sender_id == user_id) & (ChatMessage.receiver_id == receiver_id)) |
         ((ChatMessage.sender_id == receiver_id) & (ChatMessage.receiver_id == user_id))
-    ).order_by(ChatMessage.timestamp.asc()).all()
-    return jsonify([msg.serialize() for msg in messages])
+    )
+    return message_page(query, request.args)
+
+@app.route("/api/messages/unread-counts", methods=["GET"])
+@login_required()
+def get_unread_message_counts():
+    """Unread messages addressed to the current user, per sender: {sender_id: count}."""
+    counts = db.session.query(ChatMessage.sender_id, db.func.count(ChatMessage.id)).filter(
+        ChatMessage.receiver_id == session["user_id"], ChatMessage.read.is_(False)
+    ).group_by(ChatMessage.sender_id).all()
+    return jsonify({str(sender_id): count for sender_id, count in counts})
 
 @app.route("/api/online-users", methods=["GET"])
 @login_required()
@@ -1146,12 +1508,24 @@ def get_online_users():
 @app.route("/api/messages/mark-read", methods=["PUT"])
 @login_required()
 def mark_messages_read():
-    data = request.get_json()
-    message_ids = data.get("messageIds", [])
-    
-    ChatMessage.query.filter(ChatMessage.id.in_(message_ids)).update({"read": True})
+    """
+    Bulk read receipt for messages addressed to the current user, as one
+    UPDATE: either the listed messageIds, or everything from sender_id
+    (optionally only up to and including message up_to_id).
+    """
+    data = request.get_json() or {}
+    query = ChatMessage.query.filter(ChatMessage.receiver_id == session["user_id"], ChatMessage.read.is_(False))
+    if data.get("sender_id"):
+        query = query.filter(ChatMessage.sender_id == data["sender_id"])
+        if data.get("up_to_id"):
+            query = query.filter(ChatMessage.id <= data["up_to_id"])
+    elif data.get("messageIds"):
+        query = query.filter(ChatMessage.id.in_(data["messageIds"]))
+    else:
+        return jsonify({"message": "messageIds or sender_id required"}), 400
+    updated = query.update({"read": True}, synchronize_session=False)
     db.session.commit()
-    return jsonify({"message": f"Marked {len(message_ids)} messages as read"})
+    return jsonify({"message": f"Marked {updated} messages as read", "updated": updated})
 
 @app.route("/api/messages/<int:agent_id>", methods=["GET"])
 @login_required()
@@ -1165,11 +1539,10 @@ def get_agent_messages(agent_id):
         return jsonify({"error": "Forbidden"}), 403
 
     try:
-        messages = ChatMessage.query.filter(
+        query = ChatMessage.query.filter(
             (ChatMessage.receiver_id == agent_id) |
             (ChatMessage.sender_id == agent_id)
-        ).order_by(ChatMessage.timestamp.asc()).all()
-        
-        return jsonify([message.serialize() for message in messages])
+        )
+        return message_page(query, request.args)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
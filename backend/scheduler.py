@@ -0,0 +1,170 @@
+"""
+Weighted-fair scheduling of object-detection inference across streams.
+
+Stream threads submit their latest sampled frame instead of running YOLO
+themselves. Each stream has a single pending slot: when inference falls
+behind, a newer frame replaces the one still waiting, so a stream is
+downsampled rather than queued. Inference workers serve streams in
+start-time fair queueing order, so under load every stream gets inference
+time in proportion to its weight and low-priority streams lose frames first.
+The inference threads only run the model: each result is handed to a small
+callback pool for alerting (annotation, logging, image storage), so one
+stream's alert I/O never holds up inference for the others.
+"""
+import time
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from config import app
+from models import DetectionLog, StreamLease, Stream, ChaturbateStream, StripchatStream
+
+ASSIGNED_STREAM_BOOST = 2.0
+RECENT_DETECTION_WINDOW = timedelta(minutes=10)
+RECENT_DETECTION_CAP = 10
+CALLBACK_WORKERS = 4
+
+
+def compute_stream_priority(stream_url):
+    """
+    Weight of a stream: the admin-set lease priority, doubled when an agent is
+    assigned, and raised by up to 3x for streams with recent detections.
+    """
+    with app.app_context():
+        lease = StreamLease.query.filter_by(stream_url=stream_url).first()
+        weight = lease.priority if lease and lease.priority else 1.0
+
+        stream = (
+            ChaturbateStream.query.filter_by(chaturbate_m3u8_url=stream_url).first()
+            or StripchatStream.query.filter_by(stripchat_m3u8_url=stream_url).first()
+            or Stream.query.filter_by(room_url=stream_url).first()
+        )
+        if stream and any(assignment.agent_id for assignment in stream.assignments):
+            weight *= ASSIGNED_STREAM_BOOST
+
+        since = datetime.now(timezone.utc) - RECENT_DETECTION_WINDOW
+        recent = DetectionLog.query.filter(
+            DetectionLog.room_url == stream_url,
+            DetectionLog.timestamp >= since
+        ).limit(RECENT_DETECTION_CAP).count()
+        weight *= 1 + 2 * recent / RECENT_DETECTION_CAP
+    return weight
+
+
+def _release(stream_url, release):
+    """Call a frame's release hook; a failure must never take down the inference thread."""
+    if release is None:
+        return
+    try:
+        release()
+    except Exception as e:
+        logging.error("Frame release error for %s: %s", stream_url, e)
+
+
+class InferenceScheduler:
+    """
+    Runs detect_fn on submitted frames with start-time fair queueing. For a
+    stream with weight w, serving a frame that took c seconds advances its
+    finish tag by c / w; the stream with the smallest start tag runs next.
+    """
+
+    def __init__(self, detect_fn, workers=1, callback_workers=CALLBACK_WORKERS):
+        self.detect_fn = detect_fn
+        self.workers = workers
+        self.callbacks = ThreadPoolExecutor(max_workers=callback_workers, thread_name_prefix="detection-callback")
+        self.cond = threading.Condition()
+        self.pending = {}  # Key: stream_url, Value: (frame, callback, release)
+        self.weights = defaultdict(lambda: 1.0)
+        self.finish_tags = defaultdict(float)
+        self.virtual_time = 0.0
+        self.served = defaultdict(int)
+        self.dropped = defaultdict(int)
+        self.threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"inference-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def set_weight(self, stream_url, weight):
+        with self.cond:
+            self.weights[stream_url] = max(weight, 0.01)
+
+    def remove_stream(self, stream_url):
+        with self.cond:
+            pending = self.pending.pop(stream_url, None)
+            self.weights.pop(stream_url, None)
+            self.finish_tags.pop(stream_url, None)
+        if pending:
+            _release(stream_url, pending[2])
+
+    def submit(self, stream_url, frame, callback, release=None):
+        """
+        Queue frame for inference; callback(detections, seconds) runs on the
+        callback pool afterwards. Replaces (drops) a frame still waiting for this stream.
+        release(), if given, is called once the frame is no longer needed, e.g.
+        to hand a shared-memory ring slot back to the decoder.
+        """
+        with self.cond:
+            replaced = self.pending.get(stream_url)
+            if replaced:
+                self.dropped[stream_url] += 1
+            self.pending[stream_url] = (frame, callback, release)
+            self.cond.notify()
+        if replaced:
+            _release(stream_url, replaced[2])
+
+    def _start_tag(self, stream_url):
+        return max(self.virtual_time, self.finish_tags[stream_url])
+
+    def _next(self):
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            stream_url = min(self.pending, key=self._start_tag)
+            frame, callback, release = self.pending.pop(stream_url)
+            start_tag = self._start_tag(stream_url)
+            self.virtual_time = start_tag
+            return stream_url, frame, callback, release, start_tag
+
+    def _run(self):
+        while True:
+            stream_url, frame, callback, release, start_tag = self._next()
+            started = time.monotonic()
+            try:
+                detections = self.detect_fn(frame)
+            except Exception as e:
+                logging.error("Inference error for %s: %s", stream_url, e)
+                detections = []
+            elapsed = time.monotonic() - started
+            with self.cond:
+                self.finish_tags[stream_url] = start_tag + elapsed / self.weights[stream_url]
+                self.served[stream_url] += 1
+            try:
+                self.callbacks.submit(self._finish, stream_url, callback, release, detections, elapsed)
+            except Exception as e:
+                logging.error("Could not queue detection callback for %s: %s", stream_url, e)
+                _release(stream_url, release)
+
+    def _finish(self, stream_url, callback, release, detections, elapsed):
+        try:
+            callback(detections, elapsed)
+        except Exception as e:
+            logging.error("Detection callback error for %s: %s", stream_url, e)
+        finally:
+            _release(stream_url, release)
+
+    def stats(self):
+        with self.cond:
+            return {
+                url: {
+                    "weight": self.weights[url],
+                    "served": self.served[url],
+                    "dropped": self.dropped[url],
+                }
+                for url in set(self.served) | set(self.dropped) | set(self.weights)
+            }
@@ -6,9 +6,6 @@ This module provides scraping functions for Chaturbate (and Stripchat) streams.
 The updated Chaturbate scraper uses a POST request to retrieve the HLS URL 
 via free proxies. SSL verification is disabled due to known proxy issues.
 """
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
 import sys
 import types
 import tempfile  # For generating unique user-data directories
@@ -41,8 +38,6 @@ if 'blinker._saferef' not in sys.modules:
 from requests.exceptions import RequestException, SSLError
 from urllib.parse import urlparse
 from concurrent.futures import ThreadPoolExecutor
-from seleniumwire import webdriver
-from selenium.webdriver.chrome.options import Options
 from flask import jsonify
 
 # Disable insecure request warnings due to disabled SSL certificate verification.
@@ -59,6 +54,15 @@ scrape_jobs = {}
 stream_creation_jobs = {}
 executor = ThreadPoolExecutor(max_workers=5)  # Thread pool for parallel scraping
 
+def load_selenium():
+    """
+    Import Selenium Wire on first use. It pulls in a browser driver stack and
+    an intercepting proxy that web workers only need when a scrape runs.
+    """
+    from seleniumwire import webdriver
+    from selenium.webdriver.chrome.options import Options
+    return webdriver, Options
+
 # --- Helper Functions for Job Progress ---
 def update_job_progress(job_id, percent, message):
     """Update the progress of a scraping job"""
@@ -398,6 +402,7 @@ def fetch_page_content(url, use_selenium=False):
         Exception: If the request fails.
     """
     if use_selenium:
+        webdriver, Options = load_selenium()
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--disable-gpu")
@@ -451,6 +456,7 @@ def extract_m3u8_urls(html_content):
 
 def fetch_m3u8_from_page(url, timeout=90):
     """Fetch the M3U8 URL from the given page using Selenium."""
+    webdriver, Options = load_selenium()
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--disable-gpu")
@@ -507,6 +513,7 @@ def scrape_stripchat_data(url, progress_callback=None):
         update_progress(10, "Initializing browser")
 
         # Configure modern Chrome options
+        webdriver, Options = load_selenium()
         chrome_options = Options()
         chrome_options.add_argument("--headless=new")
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
@@ -766,11 +773,7 @@ def send_telegram_notifications(platform, streamer, room_url):
         
         for recipient in recipients:
             try:
-                executor.submit(
-                    send_text_message,
-                    message=message,
-                    chat_id=recipient.chat_id
-                )
+                send_text_message(message, recipient.chat_id)
             except Exception as e:
                 logging.error("Failed to notify %s: %s", 
                             recipient.chat_id, str(e))
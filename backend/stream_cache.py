@@ -0,0 +1,128 @@
+"""
+In-process cache of stream metadata for detection and notifications.
+
+Detection used to query the streams tables when a stream thread started
+(up to three queries to resolve an m3u8 URL) and again, with assignments
+and agents, for every alert. This cache loads every stream with its first
+assignment and agent in one query and indexes it by room URL and by m3u8
+URL. After that a lookup is a dict read, so creating an alert needs no
+read queries.
+
+The cache is marked stale when a streams_changed or agents_changed event
+arrives (see events.track_model_changes), whether from this process or
+another one through the event bus. The next lookup then reloads it in one
+bulk query. A lookup that misses (a stream added moments ago) triggers at
+most one reload per MISS_RELOAD_SECONDS. Entries older than MAX_AGE_SECONDS
+are reloaded in case an event was lost. Events only cross pods when every
+pod uses the same EVENT_BUS_REDIS_URL (the shared Redis in the k8s manifest).
+"""
+import time
+import logging
+import threading
+from collections import namedtuple
+
+from sqlalchemy.orm import with_polymorphic
+
+from config import app
+from extensions import db
+from events import subscribe
+from models import Stream, ChaturbateStream, StripchatStream
+
+MAX_AGE_SECONDS = 300
+MISS_RELOAD_SECONDS = 10
+
+StreamInfo = namedtuple("StreamInfo", [
+    "id", "room_url", "m3u8_url", "platform", "streamer_name", "assignment_id", "agent_id", "agent"
+])
+
+
+class StreamMetadataCache:
+    def __init__(self):
+        self.by_url = {}  # Key: room_url or m3u8 URL, Value: StreamInfo
+        self.loaded_at = None
+        self.last_miss_reload = 0.0
+        self.stale = True
+        self.generation = 0  # Bumped on every invalidation
+        self.lock = threading.Lock()
+        self.reload_lock = threading.Lock()  # One thread reloads; the others wait for its result.
+        self.metrics = {"hits": 0, "misses": 0, "reloads": 0}
+
+    def _load(self):
+        streams = with_polymorphic(Stream, [ChaturbateStream, StripchatStream])
+        by_url = {}
+        with app.app_context():
+            # Stream.assignments is selectin-loaded and Assignment.agent joined, so this is one bulk load.
+            for stream in db.session.query(streams).all():
+                assignment = next((a for a in stream.assignments if a.agent), None)
+                m3u8_url = getattr(stream, "chaturbate_m3u8_url", None) or getattr(stream, "stripchat_m3u8_url", None)
+                info = StreamInfo(
+                    id=stream.id,
+                    room_url=stream.room_url,
+                    m3u8_url=m3u8_url,
+                    platform=stream.type,
+                    streamer_name=stream.streamer_username,
+                    assignment_id=assignment.id if assignment else None,
+                    agent_id=assignment.agent.id if assignment else None,
+                    agent=assignment.agent.username if assignment else None,
+                )
+                by_url[stream.room_url] = info
+                if m3u8_url:
+                    by_url[m3u8_url] = info
+        return by_url
+
+    def reload(self):
+        with self.lock:
+            generation = self.generation
+        by_url = self._load()
+        with self.lock:
+            self.by_url = by_url
+            self.loaded_at = time.monotonic()
+            # Stay stale if a change was committed while loading.
+            self.stale = self.generation != generation
+            self.metrics["reloads"] += 1
+        logging.info("Stream metadata cache loaded %d URLs", len(by_url))
+
+    def invalidate(self):
+        with self.lock:
+            self.stale = True
+            self.generation += 1
+
+    def _expired(self):
+        with self.lock:
+            return self.stale or time.monotonic() - self.loaded_at > MAX_AGE_SECONDS
+
+    def get(self, url):
+        """Return the StreamInfo for a room or m3u8 URL, or None if no stream uses it."""
+        if self._expired():
+            with self.reload_lock:
+                if self._expired():
+                    self.reload()
+        with self.lock:
+            info = self.by_url.get(url)
+        if info is None:
+            with self.reload_lock:
+                with self.lock:
+                    info = self.by_url.get(url)
+                    retry = info is None and time.monotonic() - self.last_miss_reload > MISS_RELOAD_SECONDS
+                    if retry:
+                        self.last_miss_reload = time.monotonic()
+                if retry:
+                    self.reload()
+                    with self.lock:
+                        info = self.by_url.get(url)
+        with self.lock:
+            self.metrics["hits" if info is not None else "misses"] += 1
+        return info
+
+    def stats(self):
+        with self.lock:
+            return {**self.metrics, "urls": len(self.by_url), "stale": self.stale}
+
+
+stream_cache = StreamMetadataCache()
+subscribe("streams_changed", lambda payload: stream_cache.invalidate())
+subscribe("agents_changed", lambda payload: stream_cache.invalidate())
+
+
+def get_stream_info(url):
+    return stream_cache.get(url)
@@ -0,0 +1,251 @@
+"""
+Standalone detection supervisor.
+
+Owns every stream detection worker on the node so that gunicorn web workers
+never start detection threads or load YOLO/Whisper themselves. Web workers
+record requested streams as leases (see leasing.py) and nudge the local
+supervisor over a Redis list; each supervisor runs the streams its node has
+leased. This module is run as its own process:
+
+    python supervisor.py
+"""
+import os
+import json
+import time
+import signal
+import socket
+import logging
+import threading
+
+import redis
+
+from config import app
+from leasing import LeaseManager, release_stream, lease_status
+from admission import MODES, admit, mode_cost, promote_queued
+from scheduler import compute_stream_priority
+
+COMMAND_QUEUE = "detection:commands"
+
+_redis_client = None
+
+
+def get_redis():
+    """Return the shared Redis client used for the command channel."""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(app.config["DETECTION_REDIS_URL"], decode_responses=True)
+    return _redis_client
+
+
+def _send_command(action, stream_url):
+    """Wake the local supervisor so it syncs leases now instead of on its next heartbeat."""
+    try:
+        get_redis().rpush(COMMAND_QUEUE, json.dumps({"action": action, "stream_url": stream_url}))
+    except redis.exceptions.RedisError as e:
+        logging.warning("Could not nudge detection supervisor: %s", e)
+
+
+def request_start(stream_url):
+    """
+    Request detection for stream_url on whichever node leases it. Returns the
+    admission decision (admitted, degraded, queued or existing).
+    """
+    decision = admit(stream_url)
+    if decision["decision"] != "existing":
+        _send_command("start", stream_url)
+    return decision
+
+
+def request_stop(stream_url):
+    """Stop detection for stream_url on whichever node owns it."""
+    release_stream(stream_url)
+    _send_command("stop", stream_url)
+
+
+def detection_status(stream_url):
+    """
+    "active" if stream_url is admitted (running or about to start on its owner),
+    "queued" if it waits for capacity, or None if detection was not requested.
+    """
+    return lease_status(stream_url)
+
+
+def default_node_id():
+    return os.getenv("POD_NAME") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class DetectionSupervisor:
+    """
+    Runs the combined (video/audio) and chat detection threads for each stream
+    leased to this node and reconciles them with the lease table on every sync.
+    """
+
+    def __init__(self, node_id=None, capacity=None, poll_timeout=10):
+        self.poll_timeout = poll_timeout
+        self.workers = {}  # Key: stream_url, Value: (unified_thread, chat_thread, cancel_event)
+        self.modes = {}  # Key: stream_url, Value: detection mode the worker was started with
+        self.stopping = {}  # Key: stream_url, Value: (unified_thread, chat_thread) cancelled but not yet exited
+        self.lock = threading.Lock()
+        self.leases = LeaseManager(
+            node_id or default_node_id(),
+            capacity=capacity or int(os.getenv("DETECTION_CAPACITY", "10")),
+            cpu_budget=float(os.getenv("DETECTION_CPU_BUDGET", os.cpu_count() or 1)),
+        )
+
+    def start_stream(self, stream_url, mode="full"):
+        from detection import process_combined_detection, process_pooled_detection, chat_detection_loop
+        from decode_pool import EXECUTION_MODE
+
+        with self.lock:
+            if stream_url in self.workers:
+                logging.info("Detection already running for %s", stream_url)
+                return
+            if stream_url in self.stopping:
+                # The next reconcile starts it once the previous threads have exited.
+                logging.info("Detection for %s still stopping; start deferred", stream_url)
+                return
+            settings = MODES[mode]
+            cancel_event = threading.Event()
+            unified_thread = threading.Thread(
+                target=process_pooled_detection if EXECUTION_MODE == "processes" else process_combined_detection,
+                args=(stream_url, cancel_event, settings["sample_every"], settings["audio"]),
+                daemon=True
+            )
+            chat_thread = threading.Thread(
+                target=chat_detection_loop,
+                args=(stream_url, cancel_event, 60),
+                daemon=True
+            )
+            unified_thread.start()
+            chat_thread.start()
+            self.workers[stream_url] = (unified_thread, chat_thread, cancel_event)
+            self.modes[stream_url] = mode
+        logging.info("Detection started for %s (mode=%s)", stream_url, mode)
+
+    def stop_stream(self, stream_url):
+        with self.lock:
+            worker = self.workers.pop(stream_url, None)
+            self.modes.pop(stream_url, None)
+            if worker is not None:
+                self.stopping[stream_url] = worker[:2]
+        if worker is None:
+            logging.info("No detection running for %s", stream_url)
+            return
+        # Only signal here: joining would hold up every other command; reap_finished collects the threads.
+        worker[2].set()
+        logging.info("Detection stopping for %s", stream_url)
+
+    def reap_finished(self):
+        """
+        Collect stopped streams whose threads have exited, and drop streams whose
+        threads have exited on their own (e.g. stream went offline).
+        """
+        with self.lock:
+            for url, (unified_thread, chat_thread) in list(self.stopping.items()):
+                if not unified_thread.is_alive() and not chat_thread.is_alive():
+                    del self.stopping[url]
+                    logging.info("Detection stopped for %s", url)
+            finished = [
+                url for url, (unified_thread, chat_thread, _) in self.workers.items()
+                if not unified_thread.is_alive() and not chat_thread.is_alive()
+            ]
+        for stream_url in finished:
+            self.stop_stream(stream_url)
+            release_stream(stream_url)
+
+    def measured_costs(self):
+        """Latest cost measurement of each local stream and the node's total load."""
+        from detection import stream_costs
+
+        costs = {}
+        for stream_url, tracker in list(stream_costs.items()):
+            snapshot = tracker.snapshot()
+            if snapshot:
+                costs[stream_url] = snapshot
+        with self.lock:
+            load = sum(mode_cost(cost, self.modes.get(url, "full")) for url, cost in costs.items())
+        return costs, load
+
+    def reconcile(self):
+        """Start workers for newly leased streams and stop those no longer leased here."""
+        costs, load = self.measured_costs()
+        owned = self.leases.sync(costs, load)
+        with self.lock:
+            running = set(self.workers)
+        for stream_url in running - set(owned):
+            self.stop_stream(stream_url)
+        for stream_url in set(owned) - running:
+            self.start_stream(stream_url, owned[stream_url])
+        self.refresh_priorities(owned)
+        promote_queued()
+
+    def refresh_priorities(self, stream_urls):
+        """Recompute inference weights from assignments, recent detections and admin weights."""
+        from detection import get_inference_scheduler
+
+        scheduler = get_inference_scheduler()
+        for stream_url in stream_urls:
+            scheduler.set_weight(stream_url, compute_stream_priority(stream_url))
+
+    def shutdown(self, *args):
+        logging.info("Detection supervisor %s shutting down", self.leases.node_id)
+        with self.lock:
+            running = list(self.workers)
+        for stream_url in running:
+            self.stop_stream(stream_url)
+        deadline = time.monotonic() + 5
+        with self.lock:
+            stopping = list(self.stopping.values())
+        for threads in stopping:
+            for thread in threads:
+                thread.join(timeout=max(deadline - time.monotonic(), 0))
+        self.leases.release_all()
+        raise SystemExit(0)
+
+    def check_shared_memory(self):
+        """In process mode, lease no more streams than /dev/shm has frame rings for."""
+        from decode_pool import EXECUTION_MODE
+        from frame_ring import SHM_PATH, rings_that_fit
+
+        fits = rings_that_fit() if EXECUTION_MODE == "processes" else None
+        if fits is not None and fits < self.leases.capacity:
+            logging.error(
+                "%s only fits %d frame rings; lowering capacity from %d (mount a larger /dev/shm)",
+                SHM_PATH, fits, self.leases.capacity
+            )
+            self.leases.capacity = fits
+
+    def run(self):
+        from detection import preload_models
+        from events import start_listener
+        from stream_cache import stream_cache
+
+        client = get_redis()
+        signal.signal(signal.SIGTERM, self.shutdown)
+        self.check_shared_memory()
+        # Every model this process will run, loaded once and shared by all stream threads.
+        preload_models()
+        # Stream metadata is cached for the detection threads and invalidated by stream/assignment events.
+        start_listener()
+        stream_cache.reload()
+        logging.info("Detection supervisor %s listening on %s", self.leases.node_id, COMMAND_QUEUE)
+        while True:
+            try:
+                self.reap_finished()
+                self.reconcile()
+                self.leases.drop_stale_nodes()
+            except Exception as e:
+                logging.error("Supervisor sync error: %s", e)
+            try:
+                # Commands only wake the loop early; the lease table is the source of truth.
+                item = client.blpop(COMMAND_QUEUE, timeout=self.poll_timeout)
+                if item:
+                    logging.info("Supervisor woken by command: %s", item[1])
+            except redis.exceptions.ConnectionError as e:
+                logging.error("Supervisor lost Redis connection: %s", e)
+                time.sleep(self.poll_timeout)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    DetectionSupervisor().run()
@@ -0,0 +1,200 @@
+"""
+Long-lived Telegram sender.
+
+One background thread runs a single asyncio loop with one Bot (and so one
+pooled HTTPS client) per token. Messages are submitted from any thread and
+return a concurrent.futures.Future resolving to the sent Message, or to None
+when sending failed. Permanent errors (chat not found, bot blocked, chat
+migrated) are not retried; their future fails with the Telegram error so
+callers can tell them apart. Sending honours Telegram's limits with token
+buckets (about 30 messages/s overall, 1/s per private chat, 20/min per
+group), retries flood-control and network errors with backoff, and rejects
+new work once the bounded queue is full instead of piling up. stats() exposes queue depth, throughput and latency counters.
+
+TELEGRAM_API_BASE_URL points the client at another server (e.g. the fake
+server in fake_telegram_server.py).
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+from telegram import Bot
+from telegram.error import RetryAfter, TimedOut, NetworkError, TelegramError, BadRequest, Forbidden, ChatMigrated
+from telegram.request import HTTPXRequest
+
+GLOBAL_RATE = 30.0  # Messages per second across all chats
+PRIVATE_CHAT_RATE = 1.0  # Messages per second to one private chat
+GROUP_CHAT_RATE = 20 / 60.0  # Messages per second to one group chat
+QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "1000"))
+SENDERS = 8
+CONNECTION_POOL_SIZE = 16
+MAX_ATTEMPTS = 4
+RETRY_BASE_SECONDS = 1.0
+# Retrying these cannot succeed. BadRequest subclasses NetworkError, so they must be caught first.
+PERMANENT_ERRORS = (BadRequest, Forbidden, ChatMigrated)
+
+
+class RateLimiter:
+    """Async token bucket: `rate` tokens per second, bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class TelegramDispatcher:
+    def __init__(self, token=None, base_url=None, queue_size=QUEUE_SIZE, senders=SENDERS):
+        self.default_token = token or os.getenv("TELEGRAM_TOKEN")
+        self.base_url = base_url or os.getenv("TELEGRAM_API_BASE_URL")
+        self.queue_size = queue_size
+        self.senders = senders
+        self.loop = None
+        self.queue = None
+        self.bots = {}  # Key: token, Value: initialized Bot
+        self.global_limiter = None
+        self.chat_limiters = {}  # Key: chat_id, Value: RateLimiter
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.metrics = {
+            "submitted": 0, "sent": 0, "failed": 0, "retried": 0, "rejected": 0,
+            "latency_total_s": 0.0, "latency_max_s": 0.0,
+        }
+        self.started = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run_loop, name="telegram-dispatcher", daemon=True).start()
+        self.started.wait()
+        return self
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.queue = asyncio.Queue()
+        self.global_limiter = RateLimiter(GLOBAL_RATE, burst=int(GLOBAL_RATE))
+        for _ in range(self.senders):
+            self.loop.create_task(self._sender())
+        self.started.set()
+        self.loop.run_forever()
+
+    def submit(self, method, chat_id, token=None, **kwargs):
+        """
+        Queue bot.<method>(chat_id=chat_id, **kwargs), e.g. "send_message" with
+        text=... Returns a Future resolving to the Telegram result (a Message),
+        or to None if sending failed or the queue was full. On a permanent error
+        (see PERMANENT_ERRORS) the future fails with that error instead.
+        """
+        future = Future()
+        with self.lock:
+            self.metrics["submitted"] += 1
+            if self.pending >= self.queue_size:
+                self.metrics["rejected"] += 1
+                logging.error("Telegram queue full (%d); dropping message to %s", self.pending, chat_id)
+                future.set_result(None)
+                return future
+            self.pending += 1
+        job = (method, chat_id, token or self.default_token, kwargs, future, time.monotonic())
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, job)
+        return future
+
+    async def _bot(self, token):
+        bot = self.bots.get(token)
+        if bot is None:
+            request = HTTPXRequest(connection_pool_size=CONNECTION_POOL_SIZE)
+            if self.base_url:
+                bot = Bot(token, base_url=f"{self.base_url}/bot", base_file_url=f"{self.base_url}/file/bot",
+                          request=request)
+            else:
+                bot = Bot(token, request=request)
+            await bot.initialize()
+            self.bots[token] = bot
+        return bot
+
+    def _chat_limiter(self, chat_id):
+        limiter = self.chat_limiters.get(chat_id)
+        if limiter is None:
+            # Negative chat ids are groups and channels, which have a lower per-chat limit.
+            rate = GROUP_CHAT_RATE if str(chat_id).startswith("-") else PRIVATE_CHAT_RATE
+            limiter = self.chat_limiters[chat_id] = RateLimiter(rate)
+        return limiter
+
+    async def _sender(self):
+        while True:
+            method, chat_id, token, kwargs, future, queued_at = await self.queue.get()
+            result = None
+            error = None
+            try:
+                result = await self._send(method, chat_id, token, kwargs)
+            except PERMANENT_ERRORS as e:
+                logging.error("Telegram %s to chat_id %s failed permanently: %s", method, chat_id, e)
+                error = e
+            except Exception as e:
+                logging.error("Telegram %s to chat_id %s failed: %s", method, chat_id, e)
+            latency = time.monotonic() - queued_at
+            with self.lock:
+                self.pending -= 1
+                self.metrics["sent" if result is not None else "failed"] += 1
+                self.metrics["latency_total_s"] += latency
+                self.metrics["latency_max_s"] = max(self.metrics["latency_max_s"], latency)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def _send(self, method, chat_id, token, kwargs):
+        bot = await self._bot(token)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await self._chat_limiter(chat_id).acquire()
+            await self.global_limiter.acquire()
+            try:
+                return await getattr(bot, method)(chat_id=chat_id, **kwargs)
+            except RetryAfter as e:
+                delay = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            except PERMANENT_ERRORS:
+                raise
+            except (TimedOut, NetworkError) as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                delay = RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+                logging.warning("Telegram %s to chat_id %s failed (%s); retrying in %.0fs", method, chat_id, e, delay)
+            with self.lock:
+                self.metrics["retried"] += 1
+            await asyncio.sleep(delay)
+        raise TelegramError(f"Gave up after {MAX_ATTEMPTS} attempts")
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.metrics)
+            stats["queue_depth"] = self.pending
+        done = stats["sent"] + stats["failed"]
+        stats["latency_avg_s"] = stats["latency_total_s"] / done if done else 0.0
+        return stats
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_telegram_dispatcher():
+    """Return the process-wide dispatcher, starting its loop on first use."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = TelegramDispatcher().start()
+    return _dispatcher
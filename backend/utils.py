@@ -1,16 +1,50 @@
 import os
+import time
+import threading
 from functools import wraps
 from flask import session, jsonify
 from config import app
 from models import User
 from extensions import db
+from events import subscribe
 
 ALLOWED_EXTENSIONS = {"mp4", "avi", "mov"}
+# Seconds a user's (id, role) is trusted without re-reading it; 0 disables the cache.
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+
+# Key: user id, Value: (expires_at, (id, role) or None for a deleted user)
+_principals = {}
+_principals_lock = threading.Lock()
 
 def allowed_file(filename):
     """Return True if the filename extension is allowed."""
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def clear_principal_cache(payload=None):
+    with _principals_lock:
+        _principals.clear()
+
+# Agent create/update/delete (in any worker) publishes agents_changed.
+subscribe("agents_changed", clear_principal_cache)
+
+def get_principal(user_id):
+    """
+    Return (id, role) of a user, or None if it no longer exists. Cached for
+    PRINCIPAL_CACHE_TTL seconds so authenticated requests skip the database.
+    """
+    now = time.monotonic()
+    if PRINCIPAL_CACHE_TTL:
+        with _principals_lock:
+            cached = _principals.get(user_id)
+        if cached and cached[0] > now:
+            return cached[1]
+    row = db.session.query(User.id, User.role).filter(User.id == user_id).first()
+    principal = (row.id, row.role) if row else None
+    if PRINCIPAL_CACHE_TTL:
+        with _principals_lock:
+            _principals[user_id] = (now + PRINCIPAL_CACHE_TTL, principal)
+    return principal
+
 def login_required(role=None):
     """
     Decorator to require a logged-in user.
@@ -21,8 +55,8 @@ def login_required(role=None):
         def decorated_function(*args, **kwargs):
             if "user_id" not in session:
                 return jsonify({"message": "Authentication required"}), 401
-            user = db.session.get(User, session["user_id"])
-            if role and (user is None or user.role != role):
+            principal = get_principal(session["user_id"])
+            if role and (principal is None or principal[1] != role):
                 return jsonify({"message": "Unauthorized"}), 403
             return f(*args, **kwargs)
         return decorated_function
@@ -220,7 +220,7 @@ function AppContent() {
   useEffect(() => {
     const fetchNotificationsData = async () => {
       try {
-        const res = await axios.get('/api/notifications', { timeout: 10000 });
+        const res = await axios.get('/api/notifications', { params: { read: false, limit: 200 }, timeout: 10000 });
         let notifications = res.data;
         // Agents now see all alerts instead of filtering by assigned_agent.
         const unread = notifications.filter(n => !n.read);
@@ -245,9 +245,9 @@ function AppContent() {
   // Helper function to get a proper thumbnail image from a notification.
   const getThumbnail = (notif) => {
     if (notif.event_type === 'object_detection') {
-      let image = notif.details?.annotated_image;
+      let image = notif.details?.image_url || notif.details?.annotated_image;
       if (image) {
-        if (!image.startsWith("data:")) {
+        if (!image.startsWith("data:") && !image.startsWith("/")) {
           image = "data:image/png;base64," + image;
         }
         return image;
@@ -1,8 +1,11 @@
 import React, { useState, useEffect, useRef, useCallback } from 'react';
 import axios from 'axios';
 import Hls from 'hls.js';
+import io from 'socket.io-client';
 import './AgentDashboard.css';
 
+const SOCKET_SERVER_URL = 'http://54.86.99.85:5000';
+
 // Error Boundary Component to catch runtime errors and display fallback UI.
 class ErrorBoundary extends React.Component {
   constructor(props) {
@@ -45,24 +48,55 @@ const AgentDashboard = () => {
   const hlsInstances = useRef({});
   const [streamStates, setStreamStates] = useState({});
 
-  // Fetch all notifications from the unified endpoint.
+  // High-water mark of the notification change feed; null until the first full fetch.
+  const changesCursor = useRef(null);
+
+  // Fetch the latest notifications from the unified endpoint.
   const fetchAllNotifications = async () => {
     try {
-      const res = await axios.get('/api/notifications');
+      const res = await axios.get('/api/notifications', { params: { limit: 200 } });
       setAllNotifications(res.data);
-      // Count unread notifications per stream (room_url).
-      const counts = {};
-      res.data.forEach(notification => {
-        if (!notification.read) {
-          counts[notification.room_url] = (counts[notification.room_url] || 0) + 1;
-        }
-      });
-      setNotificationCounts(counts);
+      changesCursor.current = res.headers['x-changes-cursor'] || null;
     } catch (err) {
       console.error('Error fetching notifications:', err);
     }
   };
 
+  // Merge created/changed notifications into the list, newest first.
+  const mergeNotifications = (changed) => {
+    setAllNotifications(prev => {
+      const byId = new Map(prev.map(n => [n.id, n]));
+      changed.forEach(n => byId.set(n.id, n));
+      return [...byId.values()].sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+    });
+  };
+
+  // Poll only for notifications created or changed since the last poll and merge them in.
+  const fetchNotificationChanges = async () => {
+    if (!changesCursor.current) {
+      await fetchAllNotifications();
+      return;
+    }
+    try {
+      const res = await axios.get('/api/notifications/changes', { params: { since: changesCursor.current } });
+      changesCursor.current = res.data.cursor;
+      if (res.data.notifications.length > 0) mergeNotifications(res.data.notifications);
+    } catch (err) {
+      console.error('Error fetching notification changes:', err);
+    }
+  };
+
+  // Count unread notifications per stream (room_url).
+  useEffect(() => {
+    const counts = {};
+    allNotifications.forEach(notification => {
+      if (!notification.read) {
+        counts[notification.room_url] = (counts[notification.room_url] || 0) + 1;
+      }
+    });
+    setNotificationCounts(counts);
+  }, [allNotifications]);
+
   // Mark a notification as read.
   const markNotificationRead = async (notificationId) => {
     try {
@@ -117,8 +151,13 @@ const AgentDashboard = () => {
 
     fetchInitialData();
 
-    // Set up polling for notifications every 10 seconds.
-    const notificationInterval = setInterval(fetchAllNotifications, 10000);
+    // Notifications are pushed over Socket.IO; the change feed poll only covers missed events.
+    const socket = io(SOCKET_SERVER_URL, { withCredentials: true, transports: ['websocket'] });
+    socket.on('notification_created', n => mergeNotifications([n]));
+    socket.on('notification_updated', n => mergeNotifications([n]));
+    socket.on('notifications_read_all', () => setAllNotifications(prev => prev.map(n => ({ ...n, read: true }))));
+    socket.on('connect', fetchNotificationChanges);
+    const notificationInterval = setInterval(fetchNotificationChanges, 60000);
     
     return () => {
       // Clean up HLS instances.
@@ -126,6 +165,7 @@ const AgentDashboard = () => {
         if (hls) hls.destroy();
       });
       clearInterval(notificationInterval);
+      socket.disconnect();
     };
   }, []);
 
@@ -116,7 +116,12 @@ const NotificationModal = ({ notificationDetails, closeModal }) => {
         return (
           <>
             <div className="image-preview">
-              {notificationDetails.annotated_image && (
+              {notificationDetails.annotated_image_url ? (
+                <img 
+                  src={notificationDetails.annotated_image_url} 
+                  alt="Annotated detection"
+                />
+              ) : notificationDetails.annotated_image && (
                 <img 
                   src={`data:image/jpeg;base64,${notificationDetails.annotated_image}`} 
                   alt="Annotated detection"
@@ -190,19 +195,62 @@ const MessageComponent = ({ user }) => {
   const [selectedUser, setSelectedUser] = useState(null);
   const [unreadCounts, setUnreadCounts] = useState({});
   const [notificationDetails, setNotificationDetails] = useState(null);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const latestCursor = useRef(null);
   const pollingInterval = useRef();
 
+  // Latest page of the conversation; older pages are loaded on demand.
   const fetchMessages = async (receiverId) => {
     try {
       const res = await axios.get(`/api/messages/${receiverId}`);
       if (res.data) {
         setMessages(res.data);
+        setOlderCursor(res.headers['x-next-cursor'] || null);
+        latestCursor.current = res.headers['x-latest-cursor'] || null;
       }
     } catch (error) {
       console.error('Error fetching messages:', error);
     }
   };
 
+  // Only messages newer than the last one seen.
+  const fetchNewMessages = async (receiverId) => {
+    if (!latestCursor.current) return fetchMessages(receiverId);
+    try {
+      const res = await axios.get(`/api/messages/${receiverId}`, { params: { after: latestCursor.current } });
+      latestCursor.current = res.headers['x-latest-cursor'] || latestCursor.current;
+      if (res.data?.length) {
+        // A send and the poll can fetch the same new messages concurrently; keep one copy of each.
+        setMessages(prev => {
+          const seen = new Set(prev.map(msg => msg.id));
+          return [...prev, ...res.data.filter(msg => !seen.has(msg.id))];
+        });
+      }
+    } catch (error) {
+      console.error('Error fetching new messages:', error);
+    }
+  };
+
+  const fetchOlderMessages = async () => {
+    if (!selectedUser || !olderCursor) return;
+    try {
+      const res = await axios.get(`/api/messages/${selectedUser.id}`, { params: { before: olderCursor } });
+      setMessages(prev => [...res.data, ...prev]);
+      setOlderCursor(res.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching older messages:', error);
+    }
+  };
+
+  const fetchUnreadCounts = async () => {
+    try {
+      const res = await axios.get('/api/messages/unread-counts');
+      setUnreadCounts(res.data);
+    } catch (error) {
+      console.error('Error fetching unread counts:', error);
+    }
+  };
+
   const fetchOnlineUsers = async () => {
     try {
       const res = await axios.get('/api/online-users');
@@ -222,15 +270,16 @@ const MessageComponent = ({ user }) => {
         message: content
       });
       setInputMessage('');
-      fetchMessages(selectedUser.id);
+      fetchNewMessages(selectedUser.id);
     } catch (error) {
       console.error('Message send error:', error);
     }
   };
 
-  const markMessagesAsRead = async (messageIds) => {
+  // One bulk read receipt for everything the sender sent up to upToId.
+  const markMessagesAsRead = async (senderId, upToId) => {
     try {
-      await axios.put('/api/messages/mark-read', { messageIds });
+      await axios.put('/api/messages/mark-read', { sender_id: senderId, up_to_id: upToId });
     } catch (error) {
       console.error('Error marking messages as read:', error);
     }
@@ -239,10 +288,15 @@ const MessageComponent = ({ user }) => {
   useEffect(() => {
     const startPolling = () => {
       fetchOnlineUsers();
-      if (selectedUser) fetchMessages(selectedUser.id);
+      fetchUnreadCounts();
+      if (selectedUser) {
+        latestCursor.current = null;
+        fetchMessages(selectedUser.id);
+      }
       pollingInterval.current = setInterval(() => {
         fetchOnlineUsers();
-        if (selectedUser) fetchMessages(selectedUser.id);
+        fetchUnreadCounts();
+        if (selectedUser) fetchNewMessages(selectedUser.id);
       }, 10000); // Poll every 10 seconds
     };
 
@@ -250,28 +304,16 @@ const MessageComponent = ({ user }) => {
     return () => clearInterval(pollingInterval.current);
   }, [selectedUser]);
 
-  useEffect(() => {
-    const calculateUnreads = () => {
-      const counts = {};
-      messages.forEach(msg => {
-        if (!msg.read && msg.sender_id !== user.id) {
-          counts[msg.sender_id] = (counts[msg.sender_id] || 0) + 1;
-        }
-      });
-      setUnreadCounts(counts);
-    };
-    calculateUnreads();
-  }, [messages, user.id]);
-
   useEffect(() => {
     const markAsRead = async () => {
-      const unreadIds = messages
-        .filter(msg => !msg.read && msg.sender_id === selectedUser?.id)
-        .map(msg => msg.id);
-
-      if (unreadIds.length > 0) {
-        await markMessagesAsRead(unreadIds);
-        fetchMessages(selectedUser.id);
+      const unread = messages.filter(msg => !msg.read && msg.sender_id === selectedUser?.id);
+      if (unread.length > 0) {
+        const upToId = Math.max(...unread.map(msg => msg.id));
+        await markMessagesAsRead(selectedUser.id, upToId);
+        setMessages(prev => prev.map(msg => (
+          msg.sender_id === selectedUser.id && msg.id <= upToId ? { ...msg, read: true } : msg
+        )));
+        fetchUnreadCounts();
       }
     };
 
@@ -304,6 +346,9 @@ const MessageComponent = ({ user }) => {
             </div>
             
             <div className="messages-window">
+              {olderCursor && (
+                <button className="load-older" onClick={fetchOlderMessages}>Load older messages</button>
+              )}
               {messages.map(message => (
                 <MessageBubble 
                   key={message.id}
@@ -10,6 +10,7 @@ const NotificationsPage = ({ user, ongoingStreams = [] }) => {
   const [notifications, setNotifications] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [mainFilter, setMainFilter] = useState('All');
   const [detectionSubFilter, setDetectionSubFilter] = useState('Visual');
   const [selectedNotification, setSelectedNotification] = useState(null);
@@ -32,7 +33,8 @@ const NotificationsPage = ({ user, ongoingStreams = [] }) => {
   }, []);
 
   const formatImage = useCallback((image) => {
-    if (image && !image.startsWith("data:")) {
+    // Stored detection images are served by URL; older rows may still carry base64 data.
+    if (image && !image.startsWith("data:") && !image.startsWith("/")) {
       return "data:image/png;base64," + image;
     }
     return image;
@@ -54,7 +56,7 @@ const NotificationsPage = ({ user, ongoingStreams = [] }) => {
             bbox: d.bbox || []
           })),
           images: notification.details?.images || {
-            annotated: notification.details?.annotated_image,
+            annotated: notification.details?.image_url || notification.details?.annotated_image,
             original: notification.details?.captured_image
           },
           stream: notification.details?.stream || {
@@ -116,29 +118,29 @@ const NotificationsPage = ({ user, ongoingStreams = [] }) => {
     return "Unassigned";
   }, [dashboardStreams, selectedNotification, agents]);
 
-  const fetchNotifications = useCallback(async () => {
+  const fetchNotifications = useCallback(async (cursor = null) => {
     try {
       setLoading(true);
       setError(null);
-      const res = await axios.get('/api/notifications', { timeout: 10000 });
+      // Filtering and paging happen server-side; pass the previous page's cursor to load older alerts.
+      const params = { limit: 100 };
+      if (cursor) params.cursor = cursor;
+      if (user && user.role === 'agent') params.agent = user.username;
+      if (mainFilter === 'Unread') {
+        params.read = false;
+      } else if (mainFilter === 'Detections') {
+        const typeMap = {
+          Visual: 'object_detection',
+          Audio: 'audio_detection',
+          Chat: 'chat_detection',
+        };
+        params.event_type = typeMap[detectionSubFilter];
+      }
+      const res = await axios.get('/api/notifications', { params, timeout: 10000 });
       if (res.status === 200 && Array.isArray(res.data)) {
-        let processed = processNotifications(res.data);
-        if (user && user.role === 'agent') {
-          processed = processed.filter(n =>
-            (n.assigned_agent || "").toLowerCase() === user.username.toLowerCase()
-          );
-        }
-        if (mainFilter === 'Unread') {
-          processed = processed.filter(n => !n.read);
-        } else if (mainFilter === 'Detections') {
-          const typeMap = {
-            Visual: 'object_detection',
-            Audio: 'audio_detection',
-            Chat: 'chat_detection',
-          };
-          processed = processed.filter(n => n.event_type === typeMap[detectionSubFilter]);
-        }
-        setNotifications(processed);
+        const processed = processNotifications(res.data);
+        setNotifications(prev => (cursor ? [...prev, ...processed] : processed));
+        setNextCursor(res.headers['x-next-cursor'] || null);
       } else {
         setError('Unexpected response from server.');
       }
@@ -162,17 +164,37 @@ const NotificationsPage = ({ user, ongoingStreams = [] }) => {
       }
     };
 
-    socketRef.current = io(SOCKET_SERVER_URL, { withCredentials: true });
-    socketRef.current.on('notification_forwarded', fetchNotifications);
+    socketRef.current = io(SOCKET_SERVER_URL, { withCredentials: true, transports: ['websocket'] });
+    socketRef.current.on('notification_forwarded', () => fetchNotifications());
+    // New and changed notifications are pushed; the timed refetch is only a fallback.
+    socketRef.current.on('notification_created', (created) => {
+      // Prepend the pushed alert when it matches the current filter; paging stays where it is.
+      if (mainFilter === 'Unread' && created.read) return;
+      if (mainFilter === 'Detections') {
+        const typeMap = { Visual: 'object_detection', Audio: 'audio_detection', Chat: 'chat_detection' };
+        if (created.event_type !== typeMap[detectionSubFilter]) return;
+      }
+      const [processed] = processNotifications([created]);
+      setNotifications(prev => (prev.some(n => n.id === processed.id) ? prev : [processed, ...prev]));
+    });
+    socketRef.current.on('notification_updated', (changed) => {
+      setNotifications(prev => prev.map(n => (n.id === changed.id ? { ...n, read: changed.read } : n)));
+    });
+    socketRef.current.on('notification_deleted', ({ id }) => {
+      setNotifications(prev => prev.filter(n => n.id !== id));
+    });
+    socketRef.current.on('notifications_read_all', () => {
+      setNotifications(prev => prev.map(n => ({ ...n, read: true })));
+    });
 
     fetchAgents();
     fetchNotifications();
-    const interval = setInterval(fetchNotifications, 60000);
+    const interval = setInterval(() => fetchNotifications(), 300000);
     return () => {
       clearInterval(interval);
       socketRef.current.disconnect();
     };
-  }, [fetchNotifications, user]);
+  }, [fetchNotifications, processNotifications, mainFilter, detectionSubFilter, user]);
 
   useEffect(() => {
     const listContainer = document.querySelector('.notifications-list');
@@ -364,10 +386,10 @@ const forwardNotification = useCallback(async (agentId) => {
             {commonTimestamp}
             <div className="detection-content">
               <div className="image-gallery">
-                {selectedNotification.details?.annotated_image && (
+                {(selectedNotification.details?.image_url || selectedNotification.details?.annotated_image) && (
                   <div className="image-card">
                     <img
-                      src={formatImage(selectedNotification.details.annotated_image)}
+                      src={formatImage(selectedNotification.details.image_url || selectedNotification.details.annotated_image)}
                       alt="Annotated Detection"
                       className="detection-image"
                     />
@@ -504,7 +526,7 @@ const forwardNotification = useCallback(async (agentId) => {
           >
             Delete All
           </button>
-          <button className="refresh-notifications" onClick={fetchNotifications}>
+          <button className="refresh-notifications" onClick={() => fetchNotifications()}>
             Refresh Notifications
           </button>
         </div>
@@ -569,6 +591,11 @@ const forwardNotification = useCallback(async (agentId) => {
                   </div>
                 </div>
               ))}
+              {nextCursor && (
+                <button className="refresh-notifications" onClick={() => fetchNotifications(nextCursor)}>
+                  Load Older
+                </button>
+              )}
             </div>
           )}
         </div>